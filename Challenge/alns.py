@@ -0,0 +1,414 @@
+import os
+import math
+import time
+import heapq
+import random
+import argparse
+
+from bundles import find_bundles
+from feasibility_checker import Route, load_instance, get_route_cost, is_feasible, write_routes_to_csv, \
+    MAX_ROUTE_DURATION
+from neighbourhood_index import NeighbourhoodIndex, load_neighbourhood_index
+from route_evaluator import RouteInsertionEvaluator
+from traveltime_provider import load_oracle_factory
+
+# An unserved delivery costs more than serving it can add to any route, so the search only leaves a
+# delivery out if it fits nowhere
+UNASSIGNED_PENALTY = 10 * MAX_ROUTE_DURATION
+DEFAULT_CANDIDATE_COURIERS = 20
+DEFAULT_NEIGHBOURS = 10
+
+
+# Define the AlnsSolution class, one route per courier with its insertion evaluator, the courier serving
+# each delivery and the deliveries that are not served. Evaluators are replaced rather than changed, so
+# copies of a solution can share them.
+class AlnsSolution:
+    def __init__(self, instance):
+        self.instance = instance
+        self.evaluators = {courier.courier_id: RouteInsertionEvaluator(instance, Route(courier.courier_id, []))
+                           for courier in instance.couriers}
+        self.courier_of = {}
+        self.unassigned = {delivery.delivery_id for delivery in instance.deliveries}
+        self.cost = 0
+
+    def copy(self):
+        solution = AlnsSolution.__new__(AlnsSolution)
+        solution.instance = self.instance
+        solution.evaluators = dict(self.evaluators)
+        solution.courier_of = dict(self.courier_of)
+        solution.unassigned = set(self.unassigned)
+        solution.cost = self.cost
+        return solution
+
+    # Function to get the cost of the routes plus the penalty of the unserved deliveries
+    def objective(self):
+        return self.cost + UNASSIGNED_PENALTY * len(self.unassigned)
+
+    # Function to replace the route of a courier, the deliveries it no longer serves become unassigned
+    def set_route(self, route):
+        evaluator = self.evaluators[route.rider_id]
+        for delivery_id in set(evaluator.route.stops):
+            del self.courier_of[delivery_id]
+            self.unassigned.add(delivery_id)
+        new_evaluator = RouteInsertionEvaluator(self.instance, route)
+        for delivery_id in set(route.stops):
+            self.courier_of[delivery_id] = route.rider_id
+            self.unassigned.discard(delivery_id)
+        self.cost = self.cost + new_evaluator.cost - evaluator.cost
+        self.evaluators[route.rider_id] = new_evaluator
+
+    # Function to insert the pickup of a delivery before stop i and its dropoff before stop j of a route
+    def insert(self, delivery_id, courier_id, i, j):
+        self.set_route(self.evaluators[courier_id].insert(delivery_id, i, j))
+
+    # Function to take deliveries out of their routes. The travel times need not satisfy the triangle
+    # inequality, so a shortened route can exceed the duration limit and then loses all of its deliveries.
+    def remove(self, delivery_ids):
+        removed_by_courier = {}
+        for delivery_id in delivery_ids:
+            removed_by_courier.setdefault(self.courier_of[delivery_id], set()).add(delivery_id)
+        for courier_id, removed in removed_by_courier.items():
+            stops = [stop for stop in self.evaluators[courier_id].route.stops if stop not in removed]
+            self.set_route(Route(courier_id, stops))
+            if not self.evaluators[courier_id].feasible:
+                self.set_route(Route(courier_id, []))
+
+    # Function to get the route of every courier, empty routes included as the checker expects
+    def routes(self):
+        return [evaluator.route for evaluator in self.evaluators.values()]
+
+
+# Define the InsertionCandidates class, restricting the routes a delivery is tried in: the routes of the
+# couriers with room for it that can reach its pickup earliest, and the routes serving one of its
+# neighbouring deliveries (the deliveries that can be picked up soon after it, or soon before it). The
+# lookups go through a NeighbourhoodIndex, which is built unless one is given.
+class InsertionCandidates:
+    def __init__(self, instance, n_couriers=DEFAULT_CANDIDATE_COURIERS, n_neighbours=DEFAULT_NEIGHBOURS, index=None):
+        if index is None:
+            index = NeighbourhoodIndex.build(instance, max(n_couriers, n_neighbours))
+        self.couriers = {}
+        self.neighbours = {}
+        for delivery in instance.deliveries:
+            delivery_id = delivery.delivery_id
+            self.couriers[delivery_id] = index.delivery_couriers(delivery_id, n_couriers)
+            self.neighbours[delivery_id] = set(index.delivery_neighbours(delivery_id, n_neighbours))
+            self.neighbours[delivery_id].update(index.delivery_predecessors(delivery_id, n_neighbours))
+
+    # Function to get the couriers whose routes a delivery is tried in
+    def routes(self, solution, delivery_id):
+        couriers = set(self.couriers[delivery_id])
+        for other_id in self.neighbours[delivery_id]:
+            courier_id = solution.courier_of.get(other_id)
+            if courier_id is not None:
+                couriers.add(courier_id)
+        return couriers
+
+
+# Function to pick index floor(y^power * n) of a sorted list, y uniform in [0, 1): the higher the power,
+# the more the choice leans towards the front of the list
+def biased_index(rng, n, power):
+    return int(rng.random() ** power * n)
+
+
+# Function to choose n_remove served deliveries uniformly at random
+def random_removal(solution, n_remove, rng, candidates):
+    return rng.sample(sorted(solution.courier_of), min(n_remove, len(solution.courier_of)))
+
+
+# Function to choose the served deliveries whose removal saves the most cost, randomized towards the
+# most expensive ones. The savings are computed once, with get_route_cost on the shortened routes.
+def worst_removal(solution, n_remove, rng, candidates, power=3):
+    instance = solution.instance
+    savings = []
+    for courier_id, evaluator in solution.evaluators.items():
+        stops = evaluator.route.stops
+        for delivery_id in set(stops):
+            shortened = Route(courier_id, [stop for stop in stops if stop != delivery_id])
+            savings.append((evaluator.cost - get_route_cost(shortened, instance), delivery_id))
+    savings.sort(reverse=True)
+
+    removed = []
+    while savings and len(removed) < n_remove:
+        removed.append(savings.pop(biased_index(rng, len(savings), power))[1])
+    return removed
+
+
+# Function to choose a random served delivery and then deliveries related to the removed ones: close
+# pickups, close dropoffs and close time window starts. Only the neighbours and route mates of the removed
+# deliveries are scored, which keeps the removal local on large instances.
+def related_removal(solution, n_remove, rng, candidates, power=6):
+    instance = solution.instance
+    travel_time = instance.get_travel_time
+    n_remove = min(n_remove, len(solution.courier_of))
+    if n_remove == 0:
+        return []
+
+    removed = [rng.choice(sorted(solution.courier_of))]
+    while len(removed) < n_remove:
+        delivery = instance.get_delivery(rng.choice(removed))
+        pool = set(candidates.neighbours[delivery.delivery_id])
+        pool.update(solution.evaluators[solution.courier_of[delivery.delivery_id]].route.stops)
+        pool = [other_id for other_id in pool if other_id in solution.courier_of and other_id not in removed]
+        if not pool:
+            pool = [other_id for other_id in solution.courier_of if other_id not in removed]
+
+        relatedness = []
+        for other_id in pool:
+            other = instance.get_delivery(other_id)
+            relatedness.append((travel_time(delivery.pickup_loc, other.pickup_loc) +
+                                travel_time(delivery.dropoff_loc, other.dropoff_loc) +
+                                abs(delivery.time_window_start - other.time_window_start), other_id))
+        relatedness.sort()
+        removed.append(relatedness[biased_index(rng, len(relatedness), power)][1])
+    return removed
+
+
+# Define the BundleRemoval class, a removal operator taking out the served deliveries of random bundles of
+# co-located pickups (see bundles.find_bundles), so that the insertion can stack them into one route
+class BundleRemoval:
+    def __init__(self, bundles):
+        self.bundles = bundles
+
+    def __call__(self, solution, n_remove, rng, candidates):
+        removed = []
+        for _ in range(4 * n_remove):
+            if len(removed) >= n_remove or not self.bundles:
+                break
+            for delivery_id in rng.choice(self.bundles).delivery_ids:
+                if delivery_id in solution.courier_of and delivery_id not in removed:
+                    removed.append(delivery_id)
+        return removed
+
+
+# Function to insert the unassigned deliveries by regret: the delivery whose cheapest insertion is most
+# ahead of the cheapest insertions into its next k - 1 best routes goes first, so that deliveries with few
+# good options are not crowded out (k=1 is greedy, the cheapest insertion goes first). A missing option
+# counts as the unassigned penalty. After every insertion only the route that changed is reevaluated.
+def regret_insertion(solution, candidates, k):
+    insertions = {}
+    candidate_routes = {}
+    for delivery_id in solution.unassigned:
+        candidate_routes[delivery_id] = candidates.routes(solution, delivery_id)
+        options = {}
+        for courier_id in candidate_routes[delivery_id]:
+            best = solution.evaluators[courier_id].best_insertion(delivery_id)
+            if best is not None:
+                options[courier_id] = best
+        insertions[delivery_id] = options
+
+    while insertions:
+        best_key = None
+        for delivery_id, options in insertions.items():
+            if not options:
+                continue
+            costs = heapq.nsmallest(k, (option[0] for option in options.values()))
+            regret = sum((costs[h] if h < len(costs) else UNASSIGNED_PENALTY) - costs[0] for h in range(1, k))
+            key = (-regret, costs[0], delivery_id)
+            if best_key is None or key < best_key:
+                best_key = key
+        if best_key is None:
+            break
+
+        delivery_id = best_key[2]
+        options = insertions.pop(delivery_id)
+        courier_id = min(options, key=lambda courier_id: (options[courier_id][0], courier_id))
+        _, i, j = options[courier_id]
+        solution.insert(delivery_id, courier_id, i, j)
+
+        evaluator = solution.evaluators[courier_id]
+        for other_id, other_options in insertions.items():
+            if delivery_id in candidates.neighbours[other_id]:
+                candidate_routes[other_id].add(courier_id)
+            if courier_id not in candidate_routes[other_id]:
+                continue
+            best = evaluator.best_insertion(other_id)
+            if best is not None:
+                other_options[courier_id] = best
+            else:
+                other_options.pop(courier_id, None)
+
+
+# Function to build a first solution by inserting the deliveries by time window start, each at its
+# cheapest position among its candidate routes
+def sequential_insertion(solution, candidates):
+    instance = solution.instance
+    for delivery in sorted((instance.get_delivery(delivery_id) for delivery_id in solution.unassigned),
+                           key=lambda delivery: (delivery.time_window_start, delivery.delivery_id)):
+        best = None
+        for courier_id in sorted(candidates.routes(solution, delivery.delivery_id)):
+            insertion = solution.evaluators[courier_id].best_insertion(delivery.delivery_id)
+            if insertion is not None and (best is None or insertion[0] < best[0]):
+                best = (insertion[0], courier_id, insertion[1], insertion[2])
+        if best is not None:
+            solution.insert(delivery.delivery_id, best[1], best[2], best[3])
+
+
+# Function to write a solution atomically, a reader of the file never sees a partial dump
+def write_solution(solution, csv_file):
+    temporary_file = csv_file + ".tmp"
+    write_routes_to_csv(solution.routes(), temporary_file)
+    os.replace(temporary_file, csv_file)
+
+
+# Function to score routes exactly like the checker: the total get_route_cost, and whether every route
+# passes is_feasible and every delivery is served
+def check_routes(instance, routes):
+    served = [stop for route in routes for stop in route.stops]
+    feasible = all(is_feasible(route, instance) for route in routes) and \
+        len(served) == 2 * len(instance.deliveries) and len(set(served)) == len(instance.deliveries)
+    return sum(get_route_cost(route, instance) for route in routes), feasible
+
+
+# Define the Alns class, an adaptive large neighbourhood search: every iteration removes some deliveries
+# and reinserts them with a removal and an insertion operator drawn by their adaptive weights. The
+# weights follow the scores of the operators over segments of segment_length iterations (a new best
+# solution, an improvement of the current solution, an accepted worse solution). Worse solutions are
+# accepted by simulated annealing, the temperature falls geometrically from start_temperature (relative
+# to the first objective) to end_temperature over the time limit, or over max_iterations if that ends
+# first. With bundles, a BundleRemoval operator joins the removals.
+class Alns:
+    def __init__(self, instance, candidates=None, seed=0, min_removed=4, max_removed=30, segment_length=100,
+                 reaction=0.1, scores=(33, 9, 13), start_temperature=0.01, end_temperature=0.0001, bundles=None):
+        self.instance = instance
+        self.candidates = candidates if candidates is not None else InsertionCandidates(instance)
+        self.rng = random.Random(seed)
+        self.min_removed = min_removed
+        self.max_removed = max_removed
+        self.segment_length = segment_length
+        self.reaction = reaction
+        self.scores = scores
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+
+        self.removals = {'random': random_removal, 'worst': worst_removal, 'related': related_removal}
+        if bundles:
+            self.removals['bundle'] = BundleRemoval(bundles)
+        self.insertions = {'greedy': 1, 'regret2': 2, 'regret3': 3}
+        self.weights = {name: 1.0 for name in list(self.removals) + list(self.insertions)}
+        self.stats = {'iterations': 0, 'improvements': 0, 'accepted': 0,
+                      'uses': {name: 0 for name in self.weights}}
+
+    # Function to search for the given time, starting from initial_routes or from a sequential insertion.
+    # With a solution_file the best solution serving every delivery is dumped whenever it improves, at most
+    # every dump_interval seconds, and once more at the end. Returns the best solution found.
+    def solve(self, time_limit, max_iterations=None, initial_routes=None, solution_file=None, dump_interval=10.0):
+        start_time = time.perf_counter()
+        current = AlnsSolution(self.instance)
+        for route in initial_routes or []:
+            if RouteInsertionEvaluator(self.instance, route).feasible:
+                current.set_route(route)
+        sequential_insertion(current, self.candidates)
+        best = current.copy()
+
+        last_dump = None
+        dumped = True
+        if solution_file is not None and not best.unassigned:
+            write_solution(best, solution_file)
+            last_dump = time.perf_counter()
+
+        temperature = self.start_temperature * max(current.objective(), 1) / math.log(2)
+        cooling = self.end_temperature / self.start_temperature
+        segment_scores = {name: 0.0 for name in self.weights}
+        segment_uses = {name: 0 for name in self.weights}
+        while True:
+            # the search cools down over the time limit, or over max_iterations if that comes first
+            progress = (time.perf_counter() - start_time) / time_limit
+            if max_iterations is not None:
+                progress = max(progress, self.stats['iterations'] / max_iterations)
+            if progress >= 1:
+                break
+            self.stats['iterations'] += 1
+
+            removal = self.rng.choices(list(self.removals), [self.weights[name] for name in self.removals])[0]
+            insertion = self.rng.choices(list(self.insertions), [self.weights[name] for name in self.insertions])[0]
+            n_remove = self.rng.randint(min(self.min_removed, self.max_removed),
+                                        min(self.max_removed, max(self.min_removed, len(current.courier_of) // 10)))
+
+            candidate = current.copy()
+            candidate.remove(self.removals[removal](candidate, n_remove, self.rng, self.candidates))
+            regret_insertion(candidate, self.candidates, self.insertions[insertion])
+
+            score = 0
+            delta = candidate.objective() - current.objective()
+            if candidate.objective() < best.objective():
+                best = candidate.copy()
+                dumped = False
+                self.stats['improvements'] += 1
+                score = self.scores[0]
+            elif delta < 0:
+                score = self.scores[1]
+            elif delta > 0 and self.rng.random() < math.exp(-delta / (temperature * cooling ** progress)):
+                score = self.scores[2]
+            if score or delta == 0:
+                current = candidate
+                self.stats['accepted'] += 1
+
+            for name in (removal, insertion):
+                segment_scores[name] += score
+                segment_uses[name] += 1
+                self.stats['uses'][name] += 1
+            if self.stats['iterations'] % self.segment_length == 0:
+                for name in self.weights:
+                    if segment_uses[name]:
+                        self.weights[name] = (1 - self.reaction) * self.weights[name] + \
+                            self.reaction * segment_scores[name] / segment_uses[name]
+                    segment_scores[name] = 0.0
+                    segment_uses[name] = 0
+
+            if solution_file is not None and not dumped and not best.unassigned and \
+                    (last_dump is None or time.perf_counter() - last_dump >= dump_interval):
+                write_solution(best, solution_file)
+                last_dump = time.perf_counter()
+                dumped = True
+
+        if solution_file is not None and not dumped and not best.unassigned:
+            write_solution(best, solution_file)
+        return best
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(description="Solve courier routing instances by adaptive large neighbourhood search.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('solution_folder', type=str, help='Path to the folder the solution files are written to')
+    parser.add_argument('--time-limit', type=float, default=60, help='Time limit per instance in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the search')
+    parser.add_argument('--dump-interval', type=float, default=10,
+                        help='Minimum number of seconds between two dumps of the best solution')
+    parser.add_argument('--bundles', action='store_true',
+                        help='Also remove the deliveries of bundles of co-located pickups together')
+    parser.add_argument('--travel-time-oracle', type=str, default=None,
+                        help="Factory 'module:function' returning the travel time oracle of an instance folder without traveltimes.csv")
+
+    args = parser.parse_args()
+
+    oracle_factory = load_oracle_factory(args.travel_time_oracle) if args.travel_time_oracle else None
+    os.makedirs(args.solution_folder, exist_ok=True)
+    for instance_folder in sorted(os.listdir(args.parent_folder)):
+        instance_folder_path = os.path.join(args.parent_folder, instance_folder)
+        if not os.path.isdir(instance_folder_path):
+            continue
+        try:
+            instance = load_instance(instance_folder_path, oracle_factory)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+
+        start_time = time.perf_counter()
+        index = load_neighbourhood_index(instance, instance_folder_path,
+                                         max(DEFAULT_CANDIDATE_COURIERS, DEFAULT_NEIGHBOURS), args.travel_time_oracle)
+        alns = Alns(instance, InsertionCandidates(instance, index=index), seed=args.seed,
+                    bundles=find_bundles(instance) if args.bundles else None)
+        best = alns.solve(args.time_limit, solution_file=os.path.join(args.solution_folder, instance.name + ".csv"),
+                          dump_interval=args.dump_interval)
+        if best.unassigned:
+            print(f"{instance.name}: {len(best.unassigned)} deliveries could not be served, no solution written")
+            continue
+        cost, feasible = check_routes(instance, best.routes())
+        print(f"{instance.name}: cost {cost}, feasible {feasible}, {alns.stats['iterations']} iterations, "
+              f"{time.perf_counter() - start_time:.2f}s")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
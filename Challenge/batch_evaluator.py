@@ -0,0 +1,108 @@
+import numpy as np
+
+from feasibility_checker import MAX_ROUTE_STOPS, MAX_ROUTE_DURATION
+
+
+# Define the BatchRouteEvaluator class, scoring many routes of one instance at once with the
+# cost and feasibility semantics of get_route_cost and is_feasible. The travel times are gathered
+# from the dense matrix when the instance has one, and asked from the instance otherwise (a lazy
+# travel time oracle), so that only the legs of the routes are ever requested.
+class BatchRouteEvaluator:
+    def __init__(self, instance):
+        self.instance = instance
+        self.travel_time = instance.travel_time if isinstance(instance.travel_time, np.ndarray) else None
+
+        # dense per-id arrays, id 0 is used as padding and maps to an empty stop
+        n_ids = max([courier.courier_id for courier in instance.couriers] +
+                    [delivery.delivery_id for delivery in instance.deliveries]) + 1
+        self.courier_location = np.zeros(n_ids, dtype=np.int64)
+        self.courier_capacity = np.zeros(n_ids, dtype=np.int64)
+        for courier in instance.couriers:
+            self.courier_location[courier.courier_id] = courier.location
+            self.courier_capacity[courier.courier_id] = courier.capacity
+
+        self.delivery_capacity = np.zeros(n_ids, dtype=np.int64)
+        self.pickup_loc = np.zeros(n_ids, dtype=np.int64)
+        self.dropoff_loc = np.zeros(n_ids, dtype=np.int64)
+        self.time_window_start = np.zeros(n_ids, dtype=np.int64)
+        for delivery in instance.deliveries:
+            self.delivery_capacity[delivery.delivery_id] = delivery.capacity
+            self.pickup_loc[delivery.delivery_id] = delivery.pickup_loc
+            self.dropoff_loc[delivery.delivery_id] = delivery.dropoff_loc
+            self.time_window_start[delivery.delivery_id] = delivery.time_window_start
+
+    # Function to pack routes into a rider id vector and a zero-padded stop matrix
+    def pack(self, routes):
+        routes = list(routes)
+        max_length = max([len(route.stops) for route in routes], default=0)
+        rider_ids = np.fromiter((route.rider_id for route in routes), dtype=np.int64, count=len(routes))
+        stops = np.zeros((len(routes), max_length), dtype=np.int64)
+        for r, route in enumerate(routes):
+            stops[r, :len(route.stops)] = route.stops
+        return rider_ids, stops
+
+    # Function to evaluate a list of Route objects
+    def evaluate(self, routes):
+        rider_ids, stops = self.pack(routes)
+        return self.evaluate_packed(rider_ids, stops)
+
+    # Function to evaluate packed routes, returning a dictionary of per-route arrays
+    def evaluate_packed(self, rider_ids, stops):
+        rider_ids = np.asarray(rider_ids, dtype=np.int64)
+        stops = np.asarray(stops, dtype=np.int64)
+        # an explicit row length, -1 cannot be inferred for an empty batch
+        stops = stops.reshape(len(rider_ids), stops.size // len(rider_ids) if len(rider_ids) else 0)
+        n_routes, max_length = stops.shape
+
+        is_stop = stops > 0
+        lengths = is_stop.sum(axis=1)
+
+        # the k-th visit of a delivery is a dropoff if it was visited an odd number of times before
+        same = stops[:, :, None] == stops[:, None, :]
+        earlier = np.tril(np.ones((max_length, max_length), dtype=bool), -1)
+        previous_visits = (same & earlier).sum(axis=2)
+        is_dropoff = is_stop & (previous_visits % 2 == 1)
+        is_pickup = is_stop & ~is_dropoff
+
+        location = np.where(is_dropoff, self.dropoff_loc[stops], self.pickup_loc[stops])
+        previous_location = np.empty_like(location)
+        if max_length > 0:
+            previous_location[:, 0] = self.courier_location[rider_ids]
+            previous_location[:, 1:] = location[:, :-1]
+        if self.travel_time is not None:
+            travel = np.where(is_stop, self.travel_time[previous_location - 1, location - 1], 0)
+        else:
+            travel = np.zeros_like(location)
+            legs = np.nonzero(is_stop)
+            travel[legs] = [self.instance.get_travel_time(from_location, to_location) for from_location, to_location
+                            in zip(previous_location[legs].tolist(), location[legs].tolist())]
+        ready = self.time_window_start[stops]
+
+        # the arrival times depend on each other only along a route, so sweep over the stop positions
+        current_time = np.zeros(n_routes, dtype=np.int64)
+        cost = np.zeros(n_routes, dtype=np.int64)
+        for k in range(max_length):
+            arrival = current_time + travel[:, k]
+            arrival = np.where(is_pickup[:, k], np.maximum(arrival, ready[:, k]), arrival)
+            current_time = np.where(is_stop[:, k], arrival, current_time)
+            cost += np.where(is_dropoff[:, k], current_time, 0)
+
+        load = np.cumsum(np.where(is_pickup, 1, -1) * np.where(is_stop, self.delivery_capacity[stops], 0),
+                         axis=1)
+        peak_load = np.maximum(load.max(axis=1, initial=0), 0)
+
+        capacity_ok = peak_load <= self.courier_capacity[rider_ids]
+        all_dropped = is_pickup.sum(axis=1) == is_dropoff.sum(axis=1)
+        length_ok = lengths <= MAX_ROUTE_STOPS
+        duration_ok = current_time <= MAX_ROUTE_DURATION
+
+        return {
+            'cost': cost,
+            'duration': current_time,
+            'peak_load': peak_load,
+            'capacity_ok': capacity_ok,
+            'all_dropped': all_dropped,
+            'length_ok': length_ok,
+            'duration_ok': duration_ok,
+            'feasible': capacity_ok & all_dropped & length_ok & duration_ok,
+        }
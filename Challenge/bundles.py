@@ -0,0 +1,191 @@
+import os
+import time
+import argparse
+from itertools import combinations, permutations
+
+from feasibility_checker import Route, load_instance, MAX_ROUTE_STOPS, MAX_ROUTE_DURATION
+from neighbourhood_index import load_neighbourhood_index
+from route_evaluator import IDENTITY_SHIFT, apply_shift, compose_shift
+
+MAX_BUNDLE_DELIVERIES = MAX_ROUTE_STOPS // 2
+DEFAULT_MAX_WAIT = 10  # minutes between the earliest and the latest time window start of a bundle
+DEFAULT_WINDOW = 6  # bundles are formed among this many deliveries of a group consecutive by time window start
+DEFAULT_BUNDLE_COURIERS = 5
+
+
+# Define the Bundle class, deliveries that are picked up one after the other and then dropped off in the
+# cheapest order, which solvers can treat as one stop. Its timing is precomputed for any arrival time at
+# the first pickup: the last pickup is done at apply_shift(pickup_map, arrival) (a map of the form
+# s -> max(a, s + b), see route_evaluator), and dropoff k follows dropoff_offsets[k] minutes later.
+class Bundle:
+    __slots__ = ('delivery_ids', 'pickup_loc', 'load', 'pickup_map', 'dropoff_order', 'dropoff_offsets')
+
+    def __init__(self, instance, delivery_ids):
+        deliveries = [instance.get_delivery(delivery_id) for delivery_id in delivery_ids]
+        self.delivery_ids = tuple(delivery_ids)
+        self.pickup_loc = deliveries[0].pickup_loc
+        self.load = sum(delivery.capacity for delivery in deliveries)
+
+        self.pickup_map = IDENTITY_SHIFT
+        location = None
+        for delivery in deliveries:
+            travel_time = 0 if location is None else instance.get_travel_time(location, delivery.pickup_loc)
+            self.pickup_map = compose_shift(self.pickup_map, (delivery.time_window_start, travel_time))
+            location = delivery.pickup_loc
+
+        # the dropoff times all move with the time of the last pickup, so the cheapest order does not
+        # depend on the arrival and minimizes the sum of the offsets
+        best = None
+        for order in permutations(deliveries):
+            offsets = []
+            offset = 0
+            previous_location = location
+            for delivery in order:
+                offset = offset + instance.get_travel_time(previous_location, delivery.dropoff_loc)
+                offsets.append(offset)
+                previous_location = delivery.dropoff_loc
+            if best is None or sum(offsets) < sum(best[1]):
+                best = (order, offsets)
+        self.dropoff_order = tuple(delivery.delivery_id for delivery in best[0])
+        self.dropoff_offsets = tuple(best[1])
+
+    def __len__(self):
+        return len(self.delivery_ids)
+
+    def __repr__(self):
+        return f"Bundle(Deliveries={list(self.delivery_ids)}, Pickup Loc={self.pickup_loc}, Load={self.load})"
+
+    # Function to get the stops of the bundle: all pickups, then all dropoffs
+    def stops(self):
+        return list(self.delivery_ids) + list(self.dropoff_order)
+
+    # Function to get the time of the last pickup for an arrival at the first pickup
+    def pickup_time(self, arrival):
+        return apply_shift(self.pickup_map, arrival)
+
+    # Function to get the cost (the sum of the dropoff times) and the time of the last dropoff for an
+    # arrival at the first pickup, matching get_route_cost on the stops of the bundle
+    def timing(self, arrival):
+        pickup_time = self.pickup_time(arrival)
+        return len(self.dropoff_offsets) * pickup_time + sum(self.dropoff_offsets), \
+            pickup_time + self.dropoff_offsets[-1]
+
+    # Function to build the route of a courier serving only the bundle, returning (Route, cost) or None if
+    # the courier is too small or the route takes too long
+    def courier_route(self, instance, courier):
+        if self.load > courier.capacity:
+            return None
+        cost, end_time = self.timing(instance.get_travel_time(courier.location, self.pickup_loc))
+        if end_time > MAX_ROUTE_DURATION:
+            return None
+        return Route(courier.courier_id, self.stops()), cost
+
+
+# Function to group the deliveries that share a pickup stacking id or a pickup location, returning the
+# groups with more than one delivery as lists of deliveries
+def group_deliveries(instance):
+    parent = {}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for delivery in instance.deliveries:
+        keys = [('delivery', delivery.delivery_id), ('stacking', delivery.pickup_stacking_id),
+                ('location', delivery.pickup_loc)]
+        for key in keys:
+            parent.setdefault(key, key)
+        root = find(keys[0])
+        for key in keys[1:]:
+            parent[find(key)] = root
+
+    groups = {}
+    for delivery in instance.deliveries:
+        groups.setdefault(find(('delivery', delivery.delivery_id)), []).append(delivery)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+# Function to find the candidate bundles of an instance. Within every group of deliveries sharing a stacking
+# id or pickup location, ordered by time window start, a bundle starts with one delivery and adds up to
+# max_deliveries - 1 of the next window - 1 deliveries. Its time window starts must lie within max_wait
+# minutes, so that no courier waits long at the pickup, and its load must fit the largest courier.
+def find_bundles(instance, max_wait=DEFAULT_MAX_WAIT, window=DEFAULT_WINDOW, max_deliveries=MAX_BUNDLE_DELIVERIES):
+    max_capacity = max(courier.capacity for courier in instance.couriers)
+    bundles = []
+    for group in group_deliveries(instance):
+        group.sort(key=lambda delivery: (delivery.time_window_start, delivery.delivery_id))
+        for start, first in enumerate(group):
+            following = [delivery for delivery in group[start + 1:start + window]
+                         if delivery.time_window_start - first.time_window_start <= max_wait]
+            for size in range(1, min(max_deliveries, len(following) + 1)):
+                for others in combinations(following, size):
+                    if first.capacity + sum(delivery.capacity for delivery in others) <= max_capacity:
+                        bundles.append(Bundle(instance, [first.delivery_id] +
+                                              [delivery.delivery_id for delivery in others]))
+    return bundles
+
+
+# Function to build the single-bundle routes of every bundle for the n_couriers couriers with room for its
+# first delivery that can pick it up earliest, as taken from the neighbourhood index. Returns a list of
+# (Route, cost) pairs, like enumerate_routes.
+def bundle_routes(instance, bundles, index, n_couriers=DEFAULT_BUNDLE_COURIERS):
+    routes = []
+    for bundle in bundles:
+        for courier_id in index.delivery_couriers(bundle.delivery_ids[0], n_couriers):
+            route = bundle.courier_route(instance, instance.get_courier(courier_id))
+            if route is not None:
+                routes.append(route)
+    return routes
+
+
+# Function to pick disjoint bundle routes to start a solution from: by increasing cost per delivery, a
+# route is taken if its courier is free and none of its deliveries is served yet
+def bundle_seed_routes(instance, bundles, index, n_couriers=DEFAULT_BUNDLE_COURIERS):
+    routes = sorted(bundle_routes(instance, bundles, index, n_couriers),
+                    key=lambda route: (route[1] / (len(route[0].stops) // 2), route[0].rider_id))
+    used_couriers = set()
+    served = set()
+    seed = []
+    for route, _ in routes:
+        deliveries = set(route.stops)
+        if route.rider_id in used_couriers or not served.isdisjoint(deliveries):
+            continue
+        used_couriers.add(route.rider_id)
+        served.update(deliveries)
+        seed.append(route)
+    return seed
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(description="Find the pickup bundles of courier routing instances.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('--max-wait', type=int, default=DEFAULT_MAX_WAIT,
+                        help='Maximum difference of the time window starts within a bundle in minutes')
+
+    args = parser.parse_args()
+
+    for instance_folder in sorted(os.listdir(args.parent_folder)):
+        instance_folder_path = os.path.join(args.parent_folder, instance_folder)
+        if not os.path.isdir(instance_folder_path):
+            continue
+        try:
+            instance = load_instance(instance_folder_path)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+
+        start_time = time.perf_counter()
+        bundles = find_bundles(instance, args.max_wait)
+        index = load_neighbourhood_index(instance, instance_folder_path)
+        seed = bundle_seed_routes(instance, bundles, index)
+        print(f"{instance.name}: {len(group_deliveries(instance))} groups, {len(bundles)} bundles, "
+              f"{sum(len(route.stops) // 2 for route in seed)} deliveries in {len(seed)} seed routes, "
+              f"{time.perf_counter() - start_time:.2f}s")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+import os
+import sys
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pyscipopt import Model, Pricer, SCIP_RESULT, SCIP_PARAMSETTING, quicksum
+
+from feasibility_checker import Route, load_instance, get_route_cost, write_routes_to_csv, MAX_ROUTE_DURATION
+from bundles import bundle_routes, find_bundles
+from neighbourhood_index import load_neighbourhood_index
+from route_evaluator import RouteInsertionEvaluator
+from route_enumeration import add_label, enumerate_routes, MAX_ROUTE_DELIVERIES
+
+# The Ryan-Foster branching rule of the bin packing branch-and-price works on any set-partitioning
+# master whose columns are registered with the rows they cover, so it is reused as is.
+# The rows of the courier master are the couriers (0..n_couriers-1) followed by the deliveries.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Day3', 'scipack-solved'))
+from branching_eventhdlr import RyanFosterBranchingEventhdlr  # noqa: E402
+from column_registry import ColumnRegistry  # noqa: E402
+from ryan_foster import RyanFoster  # noqa: E402
+
+EPS = 1e-6
+
+
+class MasterRows:
+    """
+    The rows of the master problem: the couriers (0..n_couriers-1) followed by the deliveries
+    """
+
+    def __init__(self, instance):
+        self.n_couriers = len(instance.couriers)
+        self.courier_rows = {courier.courier_id: row for row, courier in enumerate(instance.couriers)}
+        self.delivery_rows = {delivery.delivery_id: self.n_couriers + row
+                              for row, delivery in enumerate(instance.deliveries)}
+        self.courier_ids = {row: courier_id for courier_id, row in self.courier_rows.items()}
+        self.delivery_ids = {row: delivery_id for delivery_id, row in self.delivery_rows.items()}
+
+    def __len__(self):
+        return len(self.courier_rows) + len(self.delivery_rows)
+
+    def route_rows(self, route):
+        """
+        The sorted rows covered by a route: its courier and its deliveries
+        """
+        return tuple([self.courier_rows[route.rider_id]] + sorted({self.delivery_rows[stop] for stop in route.stops}))
+
+
+def singleton_routes(instance):
+    """
+    One single-delivery route per delivery, each served by the courier for which it is cheapest
+
+    Returns:
+    List[Route] - the routes, used to seed the master problem
+    """
+
+    routes = []
+    for delivery in instance.deliveries:
+        best = None
+        for courier in instance.couriers:
+            if delivery.capacity > courier.capacity:
+                continue
+            pickup_time = max(delivery.time_window_start,
+                              instance.get_travel_time(courier.location, delivery.pickup_loc))
+            cost = pickup_time + instance.get_travel_time(delivery.pickup_loc, delivery.dropoff_loc)
+            if cost <= MAX_ROUTE_DURATION and (best is None or cost < best[0]):
+                best = (cost, courier.courier_id)
+        if best is None:
+            raise ValueError(f"Delivery {delivery.delivery_id} cannot be served by any courier")
+        routes.append(Route(best[1], [delivery.delivery_id, delivery.delivery_id]))
+    return routes
+
+
+def greedy_routes(instance):
+    """
+    Insert the deliveries by time window start, each at its cheapest feasible position over all couriers
+
+    Returns:
+    List[Route] - the non-empty routes built, deliveries that fit nowhere are left out
+    """
+
+    evaluators = {courier.courier_id: RouteInsertionEvaluator(instance, Route(courier.courier_id, []))
+                  for courier in instance.couriers}
+    for delivery in sorted(instance.deliveries, key=lambda delivery: delivery.time_window_start):
+        best = None
+        for courier_id, evaluator in evaluators.items():
+            insertion = evaluator.best_insertion(delivery.delivery_id)
+            if insertion is not None and (best is None or insertion[0] < best[0]):
+                best = (insertion[0], courier_id, insertion[1], insertion[2])
+        if best is not None:
+            _, courier_id, i, j = best
+            evaluators[courier_id] = RouteInsertionEvaluator(
+                instance, evaluators[courier_id].insert(delivery.delivery_id, i, j))
+    return [evaluator.route for evaluator in evaluators.values() if evaluator.route.stops]
+
+
+def price_courier(instance, rows, courier, duals, together, apart, farkas, max_columns):
+    """
+    Find the routes of one courier with the most negative reduced cost by labelling over all stop
+    sequences with at most four deliveries that respect capacity, the route duration and the branching
+    decisions
+
+    Parameters:
+    instance: Instance - the instance
+    rows: MasterRows - the rows of the master problem
+    courier: Courier - the courier to price routes for
+    duals: dict[int, float] - the dual value of every master row
+    together: set[tuple[int, int]] - the pairs of rows that must be covered by the same route
+    apart: set[tuple[int, int]] - the pairs of rows that must not be covered by the same route
+    farkas: bool - whether to price with Farkas duals (the route costs are then ignored)
+    max_columns: int - the maximum number of routes returned, the search stops after the first stage that
+    reaches it
+
+    Returns:
+    List[tuple[float, int, tuple[int], List[int]]] - (reduced cost, cost, rows, stops) of the best
+    routes, at most one per set of deliveries
+    """
+
+    courier_row = rows.courier_rows[courier.courier_id]
+    courier_dual = duals[courier_row]
+    n_couriers = rows.n_couriers
+
+    # translate the branching decisions into allowed, required and paired deliveries
+    forbidden = set()
+    required = set()
+    together_partners = {}
+    apart_partners = {}
+    for pairs, partners in ((together, together_partners), (apart, apart_partners)):
+        for i, j in pairs:
+            if i < n_couriers and j < n_couriers:
+                continue
+            if i < n_couriers or j < n_couriers:
+                row_courier, row_delivery = (i, j) if i < n_couriers else (j, i)
+                delivery_id = rows.delivery_ids[row_delivery]
+                if pairs is together and row_courier == courier_row:
+                    required.add(delivery_id)
+                elif pairs is together or row_courier == courier_row:
+                    forbidden.add(delivery_id)
+                continue
+            first = rows.delivery_ids[i]
+            second = rows.delivery_ids[j]
+            partners.setdefault(first, set()).add(second)
+            partners.setdefault(second, set()).add(first)
+
+    candidates = [delivery for delivery in instance.deliveries
+                  if delivery.delivery_id not in forbidden and delivery.capacity <= courier.capacity]
+    delivery_duals = {delivery.delivery_id: duals[rows.delivery_rows[delivery.delivery_id]]
+                      for delivery in candidates}
+
+    # best_gain[k] bounds how much k more deliveries can lower the reduced cost: a delivery is dropped off
+    # no earlier than the start of its time window, so it adds at least that much to the route cost
+    gains = sorted((delivery_duals[delivery.delivery_id] - (0 if farkas else delivery.time_window_start)
+                    for delivery in candidates), reverse=True)
+    gains = [gain for gain in gains if gain > 0]
+    best_gain = [sum(gains[:k]) for k in range(MAX_ROUTE_DELIVERIES + 1)]
+
+    best_routes = {}
+
+    # partial routes with the same deliveries served, the same deliveries in the bag and the same last
+    # location have the same completions, so among them only the non-dominated (time, cost) labels are kept
+    labels = {(frozenset(), frozenset(), courier.location): [(0, 0, (), 0, 0.0)]}
+    while labels:
+        extended_labels = {}
+        for (served, bag, location), key_labels in labels.items():
+            for time, cost, stops, load, dual_sum in key_labels:
+                if served and not bag:
+                    reduced_cost = (0 if farkas else cost) - courier_dual - dual_sum
+                    if reduced_cost < -EPS and required <= served and all(
+                            together_partners.get(delivery_id, set()) <= served for delivery_id in served):
+                        if served not in best_routes or (reduced_cost, cost) < best_routes[served][:2]:
+                            best_routes[served] = (reduced_cost, cost, list(stops))
+
+                lower_bound = (0 if farkas else cost + len(bag) * time) - courier_dual - dual_sum \
+                    - best_gain[MAX_ROUTE_DELIVERIES - len(served)]
+                if lower_bound >= -EPS:
+                    continue
+
+                for delivery_id in bag:
+                    delivery = instance.get_delivery(delivery_id)
+                    dropoff_time = time + instance.get_travel_time(location, delivery.dropoff_loc)
+                    if dropoff_time > MAX_ROUTE_DURATION:
+                        continue
+                    add_label(extended_labels, (served, bag - {delivery_id}, delivery.dropoff_loc),
+                              (dropoff_time, cost + dropoff_time, stops + (delivery_id,),
+                               load - delivery.capacity, dual_sum))
+
+                if len(served) == MAX_ROUTE_DELIVERIES:
+                    continue
+                for delivery in candidates:
+                    delivery_id = delivery.delivery_id
+                    if delivery_id in served or load + delivery.capacity > courier.capacity:
+                        continue
+                    if not apart_partners.get(delivery_id, set()).isdisjoint(served):
+                        continue
+                    pickup_time = max(delivery.time_window_start,
+                                      time + instance.get_travel_time(location, delivery.pickup_loc))
+                    if pickup_time > MAX_ROUTE_DURATION:
+                        continue
+                    add_label(extended_labels, (served | {delivery_id}, bag | {delivery_id}, delivery.pickup_loc),
+                              (pickup_time, cost, stops + (delivery_id,), load + delivery.capacity,
+                               dual_sum + delivery_duals[delivery_id]))
+        labels = extended_labels
+        # enough columns for this round, only a courier without any has to be priced exhaustively
+        if len(best_routes) >= max_columns:
+            break
+
+    routes = sorted(best_routes.values(), key=lambda route: route[0])[:max_columns]
+    return [(reduced_cost, cost, rows.route_rows(Route(courier.courier_id, stops)), stops)
+            for reduced_cost, cost, stops in routes]
+
+
+# State of the pricing worker processes, set once per process so that the instance is not sent every round
+worker_instance = None
+worker_rows = None
+
+
+def init_pricing_worker(instance):
+    global worker_instance, worker_rows
+    worker_instance = instance
+    worker_rows = MasterRows(instance)
+
+
+def price_couriers_worker(courier_ids, duals, together, apart, farkas, max_columns):
+    return [column for courier_id in courier_ids
+            for column in price_courier(worker_instance, worker_rows, worker_instance.get_courier(courier_id), duals,
+                                        together, apart, farkas, max_columns)]
+
+
+class RoutePricer(Pricer):
+    def __init__(self, instance, rows, constraints, columns, column_registry, branching_decisions,
+                 max_columns_per_courier=5, max_columns_per_round=200, executor=None, chunk_size=4, *args, **kwargs):
+        """
+        Every courier is a pricing subproblem. Without an executor the couriers are priced one after the other.
+        With an executor (a ProcessPoolExecutor initialized with init_pricing_worker) they are priced in chunks
+        of chunk_size couriers on the worker processes, each chunk getting the duals of the round, and the
+        chunks that have not started yet are cancelled once the finished ones have max_columns_per_round new
+        columns. Either way the next round starts with the first courier that was not priced.
+        """
+        super().__init__(*args, **kwargs)
+        self.instance = instance
+        self.rows = rows
+        self.constraints = constraints
+        self.columns = columns
+        self.column_registry = column_registry
+        self.branching_decisions = branching_decisions
+        self.max_columns_per_courier = max_columns_per_courier
+        self.max_columns_per_round = max_columns_per_round
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.first_courier = 0
+
+    def price(self, farkas):
+        branching_decisions = self.branching_decisions[self.model.getCurrentNode().getNumber()]
+
+        duals = {}
+        for row, cons in self.constraints.items():
+            cons = self.model.getTransformedCons(cons)
+            if farkas:
+                duals[row] = self.model.getDualfarkasLinear(cons)
+            else:
+                duals[row] = self.model.getDualsolLinear(cons)
+
+        # pricing stops once a round has enough columns, the next round starts with the following couriers;
+        # only a round without any new column has to go over all couriers
+        couriers = self.instance.couriers[self.first_courier:] + self.instance.couriers[:self.first_courier]
+        if self.executor is None:
+            new_columns = []
+            for courier in couriers:
+                new_columns += [column for column in price_courier(
+                    self.instance, self.rows, courier, duals, branching_decisions["together"],
+                    branching_decisions["apart"], farkas, self.max_columns_per_courier)
+                    if self.is_new_column(column)]
+                self.first_courier = (self.first_courier + 1) % len(couriers)
+                if len(new_columns) >= self.max_columns_per_round:
+                    break
+        else:
+            new_columns = self.price_parallel(couriers, duals, branching_decisions["together"],
+                                              branching_decisions["apart"], farkas)
+
+        new_columns.sort(key=lambda column: column[0])
+        for reduced_cost, cost, rows, stops in new_columns[:self.max_columns_per_round]:
+            route = Route(self.rows.courier_ids[rows[0]], stops)
+            add_route_column(self.model, self.constraints, self.columns, self.column_registry, rows, route, cost,
+                             priced=True)
+
+        return {
+            'result': SCIP_RESULT.SUCCESS,
+        }
+
+    def price_parallel(self, couriers, duals, together, apart, farkas):
+        """
+        Price the couriers, in the given order, in chunks on the worker processes
+
+        Returns:
+        List[tuple[float, int, tuple[int], List[int]]] - the new columns of the finished chunks, in courier
+        order
+        """
+
+        chunks = [couriers[i:i + self.chunk_size] for i in range(0, len(couriers), self.chunk_size)]
+        futures = {self.executor.submit(price_couriers_worker, [courier.courier_id for courier in chunk], duals,
+                                        together, apart, farkas, self.max_columns_per_courier): index
+                   for index, chunk in enumerate(chunks)}
+
+        chunk_columns = {}
+        n_columns = 0
+        for future in as_completed(futures):
+            columns = [column for column in future.result() if self.is_new_column(column)]
+            chunk_columns[futures[future]] = columns
+            n_columns += len(columns)
+            if n_columns >= self.max_columns_per_round:
+                # chunks already running cannot be cancelled, they finish in the background and are dropped
+                for other in futures:
+                    other.cancel()
+                break
+
+        # chunks finish in any order, the columns are collected in courier order to keep the rounds deterministic
+        # up to which chunks were cancelled
+        unpriced = [index for index in range(len(chunks)) if index not in chunk_columns]
+        if unpriced:
+            self.first_courier = (self.first_courier + unpriced[0] * self.chunk_size) % len(couriers)
+        return [column for index in sorted(chunk_columns) for column in chunk_columns[index]]
+
+    def is_new_column(self, column):
+        """
+        Whether a priced column is worth adding: its rows have no column yet, or only a more expensive one,
+        which a route with a better stop order replaces
+        """
+
+        return column[2] not in self.columns or column[1] < self.columns[column[2]][2]
+
+    def pricerredcost(self):
+        return self.price(farkas=False)
+
+    def pricerfarkas(self):
+        return self.price(farkas=True)
+
+
+def add_route_column(model, constraints, columns, column_registry, rows, route, cost, priced):
+    """
+    Add the variable of a route to the master problem and record it in columns and the column registry.
+    A route covering the same rows as an existing column replaces it in columns: the old variable stays in
+    the master, but costs more than the new one for the same coefficients, so the LP no longer uses it.
+    """
+
+    var = model.addVar(vtype="B", name=f"{list(rows)}", obj=cost, pricedVar=priced)
+    if priced:
+        for row in rows:
+            model.addConsCoeff(model.getTransformedCons(constraints[row]), var, 1)
+    columns[rows] = (var, route, cost)
+    column_registry.add(var, rows)
+    return var
+
+
+def extended_courier_routing(instance, initial_routes=None, executor=None):
+    """
+    Build the set-partitioning master problem of the courier routing challenge: every courier row and
+    every delivery row is covered by exactly one route, routes are priced per courier and branched on
+    with Ryan-Foster
+
+    Parameters:
+    instance: Instance - the instance to solve
+    initial_routes: List[Route] - feasible routes to seed the master with, by default the greedy insertion
+    routes and one single-delivery route per delivery
+    executor: ProcessPoolExecutor - the pricing worker processes (see RoutePricer), None to price serially
+
+    Returns:
+    tuple[Model, dict, dict, ColumnRegistry] - the model, the cheapest column of every set of rows (rows ->
+    (variable, route, cost)), the constraints and the registry of all variables with their rows
+    """
+
+    model = Model("Extended Courier Routing")
+
+    model.setPresolve(SCIP_PARAMSETTING.OFF)
+    model.setSeparating(SCIP_PARAMSETTING.OFF)
+
+    rows = MasterRows(instance)
+
+    if initial_routes is None:
+        initial_routes = greedy_routes(instance) + singleton_routes(instance)
+    # the empty route of every courier keeps the courier rows set-partitioning
+    initial_routes = [Route(courier.courier_id, []) for courier in instance.couriers] + list(initial_routes)
+
+    columns = {}
+    column_registry = ColumnRegistry()
+    # only the cheapest of the initial routes covering the same rows is added
+    cheapest_routes = {}
+    for route in initial_routes:
+        route_rows = rows.route_rows(route)
+        cost = get_route_cost(route, instance)
+        if route_rows not in cheapest_routes or cost < cheapest_routes[route_rows][1]:
+            cheapest_routes[route_rows] = (route, cost)
+    for route_rows, (route, cost) in cheapest_routes.items():
+        add_route_column(model, None, columns, column_registry, route_rows, route, cost, priced=False)
+
+    covering = {row: [] for row in range(len(rows))}
+    for route_rows, (var, _, _) in columns.items():
+        for row in route_rows:
+            covering[row].append(var)
+
+    constraints = {}
+    for row, row_vars in covering.items():
+        if not row_vars:
+            raise ValueError(f"No initial route covers master row {row}")
+        constraints[row] = model.addCons(quicksum(row_vars) == 1, modifiable=True)
+
+    branching_rule = RyanFoster(column_registry)
+    eventhdlr = RyanFosterBranchingEventhdlr(branching_rule.branching_decisions, column_registry)
+    pricer = RoutePricer(instance, rows, constraints, columns, column_registry, branching_rule.branching_decisions,
+                         executor=executor)
+
+    model.includeEventhdlr(eventhdlr, "Ryan Foster Branching Event Handler", "")
+    model.includePricer(pricer, "RoutePricer", "Pricer for courier routes")
+    model.includeBranchrule(branching_rule, "RyanFoster", "Branching rule for Ryan Foster", priority=1000000,
+                            maxdepth=-1,
+                            maxbounddist=1.0)
+
+    return model, columns, constraints, column_registry
+
+
+def solve_instance(instance, time_limit=None, verbose=False, initial_routes=None, jobs=1):
+    """
+    Solve an instance by branch-and-price, optionally seeding the master with initial_routes (see
+    extended_courier_routing). With jobs > 1 the couriers are priced in parallel worker processes, which
+    requires a picklable instance (a travel time oracle given as a closure is not).
+
+    Returns:
+    tuple[List[Route], Model] - one route per courier of the best solution found (None if there is none)
+    and the solved model, whose dual bound is a valid lower bound on the total cost
+    """
+
+    executor = nullcontext() if jobs <= 1 else ProcessPoolExecutor(max_workers=jobs, initializer=init_pricing_worker,
+                                                                   initargs=(instance,))
+    with executor as executor:
+        model, columns, _, column_registry = extended_courier_routing(instance, initial_routes, executor)
+        if not verbose:
+            model.hideOutput()
+        if time_limit is not None:
+            model.setParam("limits/time", time_limit)
+        model.optimize()
+
+    if model.getNSols() == 0:
+        return None, model
+
+    # a solution found before a column was replaced may use the replaced variable, whose rows are then
+    # served by the cheaper route
+    routes = [columns[column.items][1] for column in column_registry.columns.values()
+              if model.getVal(column.var) > 0.5]
+    return routes, model
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(description="Solve courier routing instances by branch-and-price.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('solution_folder', type=str, help='Path to the folder the solution files are written to')
+    parser.add_argument('--time-limit', type=float, default=None, help='Time limit per instance in seconds')
+    parser.add_argument('--verbose', action='store_true', help='Show the SCIP log')
+    parser.add_argument('--pool-neighbours', type=int, default=None,
+                        help='Seed the master with the enumerated route pool of this neighbourhood size (0 for all)')
+    parser.add_argument('--bundles', action='store_true',
+                        help='Seed the master with the routes serving one bundle of co-located pickups each')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes the couriers are priced and enumerated in')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.solution_folder, exist_ok=True)
+    for instance_folder in sorted(os.listdir(args.parent_folder)):
+        instance_folder_path = os.path.join(args.parent_folder, instance_folder)
+        if not os.path.isdir(instance_folder_path):
+            continue
+        try:
+            instance = load_instance(instance_folder_path)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+
+        initial_routes = None
+        if args.pool_neighbours is not None or args.bundles:
+            initial_routes = greedy_routes(instance) + singleton_routes(instance)
+        if args.pool_neighbours is not None:
+            index = load_neighbourhood_index(instance, instance_folder_path, args.pool_neighbours) \
+                if args.pool_neighbours else None
+            pool = enumerate_routes(instance, args.pool_neighbours or None, args.jobs, index=index)
+            initial_routes += [route for route, _ in pool]
+        if args.bundles:
+            index = load_neighbourhood_index(instance, instance_folder_path)
+            pool = bundle_routes(instance, find_bundles(instance), index)
+            initial_routes += [route for route, _ in pool]
+
+        routes, model = solve_instance(instance, args.time_limit, args.verbose, initial_routes, args.jobs)
+        if routes is None:
+            print(f"{instance.name}: no solution found, lower bound {model.getDualbound():.1f}")
+            continue
+        write_routes_to_csv(routes, os.path.join(args.solution_folder, instance.name + ".csv"))
+        print(f"{instance.name}: cost {model.getObjVal():.0f}, lower bound {model.getDualbound():.1f}, "
+              f"status {model.getStatus()}")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
+import io
 import os
 import csv
+import time
 import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from traveltime_provider import LazyTravelTimes, load_oracle_factory
+try:
+  from traveltime_cache import load_travel_time_grid
+except ImportError:  # numpy is not available, parse the CSV on every load
+  load_travel_time_grid = None
+
+# Limits every route has to respect
+MAX_ROUTE_STOPS = 8  # at most four deliveries, each with a pickup and a dropoff
+MAX_ROUTE_DURATION = 180  # minutes
 
 
 # Define the Courier class
 class Courier:
+  __slots__ = ('courier_id', 'location', 'capacity')
+
   def __init__(self, courier_id, location, capacity):
     self.courier_id = courier_id
     self.location = location
@@ -16,6 +32,9 @@ class Courier:
 
 # Define the Delivery class
 class Delivery:
+  __slots__ = ('delivery_id', 'capacity', 'pickup_loc', 'time_window_start',
+               'pickup_stacking_id', 'dropoff_loc')
+
   def __init__(self, delivery_id, capacity, pickup_loc, time_window_start,
       pickup_stacking_id, dropoff_loc):
     self.delivery_id = delivery_id
@@ -31,6 +50,8 @@ class Delivery:
 
 
 class Route:
+  __slots__ = ('rider_id', 'stops')
+
   def __init__(self, rider_id, stops):
     self.rider_id = rider_id
     self.stops = stops
@@ -39,41 +60,91 @@ class Route:
     return f"Rider ID: {self.rider_id} - Stops: {self.stops}"
 
 
+# Define the Instance class, bundling the data of one instance with id-indexed
+# lookups so that checking a route is linear in its number of stops
+class Instance:
+  def __init__(self, couriers, deliveries, travel_time, name=None):
+    self.name = name
+    self.couriers = couriers
+    self.deliveries = deliveries
+    self.travel_time = travel_time
+    self.travel_time_rows = None
+    self.couriers_by_id = {courier.courier_id: courier for courier in couriers}
+    self.deliveries_by_id = {delivery.delivery_id: delivery for delivery in
+                             deliveries}
+
+  def get_courier(self, courier_id):
+    return self.couriers_by_id.get(courier_id)
+
+  def get_delivery(self, delivery_id):
+    return self.deliveries_by_id.get(delivery_id)
+
+  # Scalar lookups go through nested lists, which are much faster to index than the packed array
+  # and give Python ints whether the grid was parsed or memory-mapped from the cache; the lists
+  # are only built on the first lookup
+  def get_travel_time(self, from_location, to_location):
+    if self.travel_time_rows is None:
+      self.travel_time_rows = self.travel_time.tolist() if hasattr(
+        self.travel_time, 'tolist') else self.travel_time
+    return self.travel_time_rows[from_location - 1][to_location - 1]
+
+  def __repr__(self):
+    return f"Instance(Name={self.name}, Couriers={len(self.couriers)}, Deliveries={len(self.deliveries)})"
+
+
+# Function to map the column names of a CSV header to their positions
+def get_column_indices(header, names):
+  return [header.index(name) for name in names]
+
+
+# Function to lazily read couriers from CSV, one record per row without building a dict per row
+def iter_couriers_from_csv(filepath):
+  with open(filepath, 'r') as file:
+    reader = csv.reader(file)
+    id_col, location_col, capacity_col = get_column_indices(
+      next(reader), ['ID', 'Location', 'Capacity'])
+    for row in reader:
+      yield Courier(
+        courier_id=int(row[id_col]),
+        location=int(row[location_col]),
+        capacity=int(row[capacity_col])
+      )
+
+
 # Function to load couriers from CSV using the csv module
 def load_couriers_from_csv(filepath):
-  couriers = []
+  return list(iter_couriers_from_csv(filepath))
+
+
+# Function to lazily read deliveries from CSV, one record per row without building a dict per row
+def iter_deliveries_from_csv(filepath):
   with open(filepath, 'r') as file:
-    reader = csv.DictReader(file)
+    reader = csv.reader(file)
+    columns = get_column_indices(
+      next(reader), ['ID', 'Capacity', 'Pickup Loc', 'Time Window Start',
+                     'Pickup Stacking_Id', 'Dropoff Loc'])
+    id_col, capacity_col, pickup_col, time_window_col, stacking_col, dropoff_col = columns
     for row in reader:
-      courier = Courier(
-        courier_id=int(row['ID']),
-        location=int(row['Location']),
-        capacity=int(row['Capacity'])
+      yield Delivery(
+        delivery_id=int(row[id_col]),
+        capacity=int(row[capacity_col]),
+        pickup_loc=int(row[pickup_col]),
+        time_window_start=int(row[time_window_col]),
+        pickup_stacking_id=int(row[stacking_col]),
+        dropoff_loc=int(row[dropoff_col])
       )
-      couriers.append(courier)
-  return couriers
 
 
 # Function to load deliveries from CSV using the csv module
 def load_deliveries_from_csv(filepath):
-  deliveries = []
-  with open(filepath, 'r') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-      delivery = Delivery(
-        delivery_id=int(row['ID']),
-        capacity=int(row['Capacity']),
-        pickup_loc=int(row['Pickup Loc']),
-        time_window_start=int(row['Time Window Start']),
-        pickup_stacking_id=int(row['Pickup Stacking_Id']),
-        dropoff_loc=int(row['Dropoff Loc'])
-      )
-      deliveries.append(delivery)
-  return deliveries
+  return list(iter_deliveries_from_csv(filepath))
 
 
-# Function to load travel time matrix from CSV
+# Function to load travel time matrix from CSV (memory-mapped from the binary cache if possible)
 def load_travel_time_from_csv(filepath):
+  if load_travel_time_grid is not None:
+    return load_travel_time_grid(filepath)[1:, 1:]
+
   travel_time = []
   with open(filepath, 'r') as file:
     reader = csv.reader(file)
@@ -85,7 +156,9 @@ def load_travel_time_from_csv(filepath):
 
 
 # Function to process each instance folder and look for couriers.csv, deliveries.csv, and traveltime.csv
-def process_instance_folder(instance_folder_path):
+# When the folder has no traveltimes.csv and an oracle factory is given, the travel times are
+# requested on demand from the oracle it returns for the folder
+def process_instance_folder(instance_folder_path, oracle_factory=None):
   couriers_file = None
   deliveries_file = None
   travel_time_file = None
@@ -108,20 +181,31 @@ def process_instance_folder(instance_folder_path):
     raise FileNotFoundError(
       f"Missing deliveries.csv file in folder: {instance_folder_path}")
 
-  if not travel_time_file:
+  if not travel_time_file and oracle_factory is None:
     raise FileNotFoundError(
       f"Missing traveltimes.csv file in folder: {instance_folder_path}")
 
   # Load couriers, deliveries, and travel time matrix from the instance
   couriers = load_couriers_from_csv(couriers_file)
   deliveries = load_deliveries_from_csv(deliveries_file)
-  travel_time = load_travel_time_from_csv(travel_time_file)
+  if travel_time_file:
+    travel_time = load_travel_time_from_csv(travel_time_file)
+  else:
+    travel_time = LazyTravelTimes(oracle_factory(instance_folder_path), first_index=0)
 
   return couriers, deliveries, travel_time
 
 
+# Function to load an instance folder into an indexed Instance object
+def load_instance(instance_folder_path, oracle_factory=None):
+  couriers, deliveries, travel_time = process_instance_folder(
+    instance_folder_path, oracle_factory)
+  return Instance(couriers, deliveries, travel_time,
+                  name=os.path.basename(os.path.normpath(instance_folder_path)))
+
+
 # Main function to loop through all instance folders
-def process_all_instances(parent_folder):
+def process_all_instances(parent_folder, oracle_factory=None):
   all_instances = []
 
   # Loop through each instance folder in the parent directory
@@ -132,15 +216,15 @@ def process_all_instances(parent_folder):
     if os.path.isdir(instance_folder_path):
       print(f"Processing instance: {instance_folder}")
       try:
-        couriers, deliveries, travel_time = process_instance_folder(
-          instance_folder_path)
+        instance = load_instance(instance_folder_path, oracle_factory)
 
         # Add this instance's couriers, deliveries, and travel time matrix to the overall list
         all_instances.append({
           'instance_name': instance_folder,
-          'couriers': couriers,
-          'deliveries': deliveries,
-          'travel_time': travel_time
+          'couriers': instance.couriers,
+          'deliveries': instance.deliveries,
+          'travel_time': instance.travel_time,
+          'instance': instance
         })
       except FileNotFoundError as e:
         print(e)
@@ -162,6 +246,15 @@ def read_routes_from_csv(csv_file):
   return routes
 
 
+# Function to write routes in the format read by read_routes_from_csv
+def write_routes_to_csv(routes, csv_file):
+  with open(csv_file, 'w', newline='') as file:
+    writer = csv.writer(file)
+    writer.writerow(['ID', 'Route'])
+    for route in sorted(routes, key=lambda route: route.rider_id):
+      writer.writerow([route.rider_id] + list(route.stops))
+
+
 def check_all_couriers_covered(routes, couriers):
   n_couriers = len(couriers)
   courier_found = [False] * n_couriers
@@ -199,13 +292,13 @@ def check_all_activities_covered(routes, couriers, deliveries):
   return all_activities_are_covered
 
 
-def is_feasible(route, couriers, deliveries, traveltimes):
-  courier = get_courier(couriers, route.rider_id)
+def is_feasible(route, instance):
+  courier = instance.get_courier(route.rider_id)
   courierCapacity = courier.capacity
   load = 0
   orders_in_bag = set()
   for activity in route.stops:
-    delivery = get_delivery(deliveries, activity)
+    delivery = instance.get_delivery(activity)
     if activity in orders_in_bag:
       orders_in_bag.remove(activity)
       load = load - delivery.capacity
@@ -226,32 +319,31 @@ def is_feasible(route, couriers, deliveries, traveltimes):
       f"Route of courier {route.rider_id} contains more than four deliveries.")
     return False
 
-  if not check_route_duration(route, couriers, deliveries, traveltimes):
+  if not check_route_duration(route, instance):
     return False
 
   return True
 
 
-def check_route_duration(route, couriers, deliveries, travelTimes):
+def check_route_duration(route, instance):
+  travelTime = instance.get_travel_time
   currentTime = 0
   orders_in_bag = set()
-  courier = get_courier(couriers, route.rider_id)
+  courier = instance.get_courier(route.rider_id)
   lastLocation = courier.location
   for activity in route.stops:
-    delivery = get_delivery(deliveries, activity)
+    delivery = instance.get_delivery(activity)
     if activity in orders_in_bag:
       orders_in_bag.remove(activity)
-      currentTime = currentTime + travelTimes[lastLocation - 1][
-        delivery.dropoff_loc - 1]
+      currentTime = currentTime + travelTime(lastLocation, delivery.dropoff_loc)
       lastLocation = delivery.dropoff_loc
     else:
       orders_in_bag.add(activity)
       currentTime = max(delivery.time_window_start,
-                        currentTime + travelTimes[lastLocation - 1][
-                          delivery.pickup_loc - 1])
+                        currentTime + travelTime(lastLocation, delivery.pickup_loc))
       lastLocation = delivery.pickup_loc
 
-  if currentTime > 180:
+  if currentTime > MAX_ROUTE_DURATION:
     print(
       f"Route of courier {route.rider_id} is takes too long with {currentTime} minutes.")
     return False
@@ -259,45 +351,114 @@ def check_route_duration(route, couriers, deliveries, travelTimes):
   return True
 
 def check_route_length(route):
-  return len(route.stops) <= 8
+  return len(route.stops) <= MAX_ROUTE_STOPS
 
 
-def get_route_cost(route, couriers, deliveries, travelTimes):
-  courier = get_courier(couriers, route.rider_id)
+def get_route_cost(route, instance):
+  travelTime = instance.get_travel_time
+  courier = instance.get_courier(route.rider_id)
   currentTime = 0
   cost = 0
   orders_in_bag = set()
   lastLocation = courier.location
   for activity in route.stops:
-    delivery = get_delivery(deliveries, activity)
+    delivery = instance.get_delivery(activity)
     if activity in orders_in_bag:
       orders_in_bag.remove(activity)
-      currentTime = currentTime + travelTimes[lastLocation - 1][
-        delivery.dropoff_loc - 1]
+      currentTime = currentTime + travelTime(lastLocation, delivery.dropoff_loc)
       lastLocation = delivery.dropoff_loc
       cost = cost + currentTime
     else:
       orders_in_bag.add(activity)
       currentTime = max(delivery.time_window_start,
-                        currentTime + travelTimes[lastLocation - 1][
-                          delivery.pickup_loc - 1])
+                        currentTime + travelTime(lastLocation, delivery.pickup_loc))
       lastLocation = delivery.pickup_loc
   return cost
 
 
-def get_courier(couriers, courier_id):
-  for courier in couriers:
-    if courier.courier_id == courier_id:
-      return courier
-  return None
+# Function to check the solution of one instance, printing the violations found
+def check_instance(instance, csv_file):
+  start_time = time.perf_counter()
+  print(f"\nInstance: {instance.name}")
+  routes = read_routes_from_csv(csv_file)
 
+  # Print out the routes for verification
+  for route in routes:
+    print(route)
+
+  all_couriers_covered = check_all_couriers_covered(routes, instance.couriers)
+  if all_couriers_covered:
+    print("All riders have a route!")
 
-# Function to get the delivery by delivery_id
-def get_delivery(deliveries, delivery_id):
-  for delivery in deliveries:
-    if delivery.delivery_id == delivery_id:
-      return delivery
-  return None
+  all_activities_covered = check_all_activities_covered(routes,
+                                                        instance.couriers,
+                                                        instance.deliveries)
+  if all_activities_covered:
+    print("All deliveries are contained in exactly one route!")
+
+  total_cost = 0
+  all_routes_are_feasible = True
+  for route in routes:
+    route_is_feasible = is_feasible(route, instance)
+    if not route_is_feasible:
+      print("Route of courier " + str(route.rider_id) + " is not feasible!")
+      all_routes_are_feasible = False
+
+    route_cost = get_route_cost(route, instance)
+    total_cost = total_cost + route_cost
+
+  feasible = all_activities_covered and all_routes_are_feasible and all_couriers_covered
+  if feasible:
+    print("Total cost of feasible solution: " + str(total_cost))
+
+  return {
+    'instance_name': instance.name,
+    'feasible': feasible,
+    'total_cost': int(total_cost),
+    'time': time.perf_counter() - start_time
+  }
+
+
+# Function to load and check one instance folder, returning None if the instance is incomplete.
+# The optional travel time oracle is given as 'module:function' so that it can be passed to
+# worker processes.
+def check_instance_folder(instance_folder_path, solution_folder, oracle_spec=None):
+  start_time = time.perf_counter()
+  oracle_factory = load_oracle_factory(oracle_spec) if oracle_spec else None
+  try:
+    instance = load_instance(instance_folder_path, oracle_factory)
+  except FileNotFoundError as e:
+    print(e)
+    return None
+  result = check_instance(instance, solution_folder + instance.name + ".csv")
+  result['time'] = time.perf_counter() - start_time
+  return result
+
+
+# Function to check one instance folder in a worker process, capturing its output
+def check_instance_folder_captured(instance_folder_path, solution_folder,
+    oracle_spec=None):
+  output = io.StringIO()
+  with contextlib.redirect_stdout(output):
+    result = check_instance_folder(instance_folder_path, solution_folder,
+                                   oracle_spec)
+  return result, output.getvalue()
+
+
+# Function to print the aggregated results of all checked instances
+def print_summary(results):
+  print("\nSummary:")
+  for result in sorted(results, key=lambda result: result['instance_name']):
+    status = "feasible" if result['feasible'] else "infeasible"
+    print(f"{result['instance_name']}: {status}, cost {result['total_cost']}, "
+          f"{result['time']:.2f}s")
+
+  n_feasible = sum(1 for result in results if result['feasible'])
+  total_cost = sum(result['total_cost'] for result in results if result['feasible'])
+  total_time = sum(result['time'] for result in results)
+  print(f"Feasible instances: {n_feasible}/{len(results)}")
+  print(f"Total cost of feasible solutions: {total_cost}")
+  print(f"Total time: {total_time:.2f}s")
 
 
 # Entry point of the script
@@ -309,68 +470,42 @@ def main():
                       help='Path to the parent folder containing all instance folders')
   parser.add_argument('solution_folder', type=str,
                       help='Path to the folder containing the solution files')
+  parser.add_argument('--jobs', type=int, default=1,
+                      help='Number of instances checked in parallel worker processes')
+  parser.add_argument('--travel-time-oracle', type=str, default=None,
+                      help="Factory 'module:function' returning the travel time oracle of an instance folder without traveltimes.csv")
 
   args = parser.parse_args()
 
-  # Process all instances
-  all_instance_data = process_all_instances(args.parent_folder)
-
-  # Output the results
-  for instance_data in all_instance_data:
-    print(f"\nInstance: {instance_data['instance_name']}")
-
-    # print("Couriers:")
-    # for courier in instance_data['couriers']:
-    #  print(courier)
-
-    # print("\nDeliveries:")
-    # for delivery in instance_data['deliveries']:
-    #  print(delivery)
-
-    # print("\nTravel Time Matrix:")
-    # for row in instance_data['travel_time']:
-    #     print(row)
-
-    instance_name = instance_data['instance_name']
-    print(instance_name)
-    csv_file = args.solution_folder + instance_name + ".csv"  # Update with the actual path to your CSV
-    routes = read_routes_from_csv(csv_file)
-
-    # Print out the routes for verification
-    for route in routes:
-      print(route)
-
-    all_couriers_covered = check_all_couriers_covered(routes,
-                                                      instance_data['couriers'])
-    if all_couriers_covered:
-      print("All riders have a route!")
-
-    all_activities_covered = check_all_activities_covered(routes, instance_data[
-      'couriers'], instance_data['deliveries'])
-    if all_activities_covered:
-      print("All deliveries are contained in exactly one route!")
-
-    total_cost = 0
-    all_routes_are_feasible = True
-    for route in routes:
-      route_is_feasible = is_feasible(route, instance_data['couriers'],
-                                      instance_data['deliveries'],
-                                      instance_data['travel_time'])
-      if not route_is_feasible:
-        print("Route of courier " + str(route.rider_id) + " is not feasible!")
-        all_routes_are_feasible = False
-
-      route_cost = get_route_cost(route, instance_data['couriers'],
-                                  instance_data['deliveries'],
-                                  instance_data['travel_time'])
-      # print("Cost of courier " + str(route.rider_id) + " route is " + str(
-      #  route_cost))
-      total_cost = total_cost + route_cost
-
-    if all_activities_covered and all_routes_are_feasible and all_couriers_covered:
-      print("Total cost of feasible solution: " + str(total_cost))
+  instance_folder_paths = [os.path.join(args.parent_folder, instance_folder)
+                           for instance_folder in os.listdir(args.parent_folder)]
+  instance_folder_paths = [path for path in instance_folder_paths if
+                           os.path.isdir(path)]
+
+  results = []
+  if args.jobs <= 1:
+    for instance_folder_path in instance_folder_paths:
+      print(f"Processing instance: {os.path.basename(instance_folder_path)}")
+      result = check_instance_folder(instance_folder_path, args.solution_folder,
+                                     args.travel_time_oracle)
+      if result is not None:
+        results.append(result)
+  else:
+    # Stream the output of each instance as soon as its worker is done
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+      futures = [executor.submit(check_instance_folder_captured,
+                                 instance_folder_path, args.solution_folder,
+                                 args.travel_time_oracle)
+                 for instance_folder_path in instance_folder_paths]
+      for future in as_completed(futures):
+        result, output = future.result()
+        print(output, end="", flush=True)
+        if result is not None:
+          results.append(result)
+
+  print_summary(results)
 
 
 # Main execution
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
@@ -0,0 +1,290 @@
+import os
+import heapq
+import hashlib
+import argparse
+
+import numpy as np
+
+from feasibility_checker import load_instance
+from traveltime_cache import hash_file, is_cache_valid
+from traveltime_provider import LazyTravelTimes
+
+# The index of an instance folder is cached in the folder next to the travel time cache, as a .npz file
+# holding the neighbour rows and the signature of the files they were built from
+INDEX_FILE = 'neighbours.npz'
+DEFAULT_INDEX_NEIGHBOURS = 20
+
+# Score of the pairs that are never neighbours (a delivery and itself, a courier too small for a delivery),
+# small enough that score * number of columns fits into an int64
+EXCLUDED = 1 << 40
+
+
+# Function to slice the travel times from every location in from_locations to every location in
+# to_locations out of the dense matrix of an instance
+def travel_time_block(instance, from_locations, to_locations):
+    return instance.travel_time[np.ix_(np.asarray(from_locations) - 1,
+                                       np.asarray(to_locations) - 1)].astype(np.int64)
+
+
+# Function to find, for every row of a score matrix, the columns of its k smallest scores ordered by score.
+# Ties are broken by column, like heapq.nsmallest on (score, id) pairs with the columns in id order, by
+# making the keys unique as score * number of columns + column. Columns with the EXCLUDED score are -1.
+def smallest_columns(scores, k):
+    n_rows, n_columns = scores.shape
+    k = min(k, n_columns)
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.int64)
+    keys = scores * n_columns + np.arange(n_columns)
+    columns = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    columns = np.take_along_axis(columns, np.argsort(np.take_along_axis(keys, columns, axis=1), axis=1), axis=1)
+    return np.where(np.take_along_axis(scores, columns, axis=1) >= EXCLUDED, -1, columns)
+
+
+# Function to find the same columns as smallest_columns when the scores are expensive, like travel times
+# asked from an oracle. lower_bounds holds a lower bound of every score (EXCLUDED for the pairs that are
+# never neighbours), score(row, column) computes one score. Every row scans its columns by increasing
+# lower bound key and stops once no further column can beat its k-th best key, so only the columns that
+# can still be among the k best are scored.
+def smallest_columns_bounded(lower_bounds, score, k):
+    n_rows, n_columns = lower_bounds.shape
+    k = min(k, n_columns)
+    columns = np.full((n_rows, k), -1, dtype=np.int64)
+    if k == 0:
+        return columns
+    bound_keys = lower_bounds * n_columns + np.arange(n_columns)
+    for row, (row_keys, order) in enumerate(zip(bound_keys.tolist(), np.argsort(bound_keys, axis=1).tolist())):
+        best = []  # the negated keys of the k best columns so far
+        for column in order:
+            if row_keys[column] >= EXCLUDED * n_columns or (len(best) == k and row_keys[column] > -best[0]):
+                break
+            key = score(row, column) * n_columns + column
+            if len(best) < k:
+                heapq.heappush(best, -key)
+            elif key < -best[0]:
+                heapq.heapreplace(best, -key)
+        row_columns = [-key % n_columns for key in sorted(best, reverse=True)]
+        columns[row, :len(row_columns)] = row_columns
+    return columns
+
+
+# Function to hash the couriers, deliveries and travel times an index is built from. Without traveltimes.csv
+# the travel times are identified by the spec of the oracle factory ('module:function') they come from.
+def instance_signature(instance_folder_path, oracle_spec=None):
+    sha1 = hashlib.sha1()
+    travel_time_file = None
+    for filename in sorted(os.listdir(instance_folder_path)):
+        if 'couriers.csv' in filename or 'deliveries.csv' in filename:
+            sha1.update(hash_file(os.path.join(instance_folder_path, filename)).encode())
+        elif 'traveltimes.csv' in filename:
+            travel_time_file = os.path.join(instance_folder_path, filename)
+    if travel_time_file is None:
+        # the travel times come from an oracle, which is assumed to be deterministic
+        sha1.update(f"oracle:{oracle_spec}".encode())
+    else:
+        valid, meta = is_cache_valid(travel_time_file)
+        sha1.update((meta['sha1'] if valid else hash_file(travel_time_file)).encode())
+    return sha1.hexdigest()
+
+
+# Define the NeighbourhoodIndex class, answering which deliveries are close in travel time and compatible
+# in time window start to a courier or a delivery without scanning all deliveries. The scores are those of
+# the route enumeration: a courier scores a delivery by the earliest time it can pick it up from its
+# location, a delivery scores another by the earliest time the other can be picked up after it, directly
+# from its pickup or after its dropoff. Every row keeps the k best ids ordered by score, so any number of
+# neighbours up to k can be looked up. On a dense travel time matrix all scores are computed at once. With
+# travel times from an oracle, every score is bounded from below by the time window starts involved, and
+# only the pairs that can still be among the k best are asked. They are memoised for the build only, so
+# that the travel time cache of the instance keeps just the pairs the solvers use.
+class NeighbourhoodIndex:
+    def __init__(self, k, courier_ids, delivery_ids, courier_neighbours, delivery_neighbours, delivery_couriers,
+                 time_windows):
+        self.k = k
+        self.courier_ids = courier_ids
+        self.delivery_ids = delivery_ids
+        self.courier_neighbour_rows = courier_neighbours
+        self.delivery_neighbour_rows = delivery_neighbours
+        self.delivery_courier_rows = delivery_couriers
+        self.time_windows = time_windows
+
+        self.courier_positions = {courier_id: position for position, courier_id in enumerate(courier_ids.tolist())}
+        self.delivery_positions = {delivery_id: position
+                                   for position, delivery_id in enumerate(delivery_ids.tolist())}
+        self.row_lists = {}
+        self.predecessor_lists = {}
+        self.window_order = np.argsort(time_windows, kind='stable')
+        self.sorted_windows = time_windows[self.window_order]
+
+    @classmethod
+    def build(cls, instance, k=DEFAULT_INDEX_NEIGHBOURS):
+        couriers = sorted(instance.couriers, key=lambda courier: courier.courier_id)
+        deliveries = sorted(instance.deliveries, key=lambda delivery: delivery.delivery_id)
+        courier_ids = np.array([courier.courier_id for courier in couriers], dtype=np.int64)
+        delivery_ids = np.array([delivery.delivery_id for delivery in deliveries], dtype=np.int64)
+        courier_locations = [courier.location for courier in couriers]
+        courier_capacities = np.array([courier.capacity for courier in couriers], dtype=np.int64)
+        pickups = [delivery.pickup_loc for delivery in deliveries]
+        dropoffs = [delivery.dropoff_loc for delivery in deliveries]
+        capacities = np.array([delivery.capacity for delivery in deliveries], dtype=np.int64)
+        windows = np.array([delivery.time_window_start for delivery in deliveries], dtype=np.int64)
+
+        via_dropoff = windows + np.array([instance.get_travel_time(delivery.pickup_loc, delivery.dropoff_loc)
+                                          for delivery in deliveries], dtype=np.int64)
+        too_small = courier_capacities[None, :] < capacities[:, None]
+
+        if isinstance(instance.travel_time, np.ndarray):
+            courier_scores = np.maximum(windows[None, :], travel_time_block(instance, courier_locations, pickups))
+            delivery_scores = np.minimum(
+                np.maximum(windows[None, :], windows[:, None] + travel_time_block(instance, pickups, pickups)),
+                np.maximum(windows[None, :], via_dropoff[:, None] + travel_time_block(instance, dropoffs, pickups)))
+            np.fill_diagonal(delivery_scores, EXCLUDED)
+
+            courier_neighbours = smallest_columns(courier_scores, k)
+            delivery_neighbours = smallest_columns(delivery_scores, k)
+            delivery_couriers = smallest_columns(np.where(too_small, EXCLUDED, courier_scores.T), k)
+        else:
+            travel_times = {}
+            lookup = instance.travel_time.peek if isinstance(instance.travel_time, LazyTravelTimes) \
+                else instance.get_travel_time
+
+            def get_travel_time(from_location, to_location):
+                key = (from_location, to_location)
+                travel_time = travel_times.get(key)
+                if travel_time is None:
+                    travel_time = lookup(from_location, to_location)
+                    travel_times[key] = travel_time
+                return travel_time
+
+            window_list = windows.tolist()
+            via_dropoff_list = via_dropoff.tolist()
+
+            def courier_score(row, column):
+                return max(window_list[column], get_travel_time(courier_locations[row], pickups[column]))
+
+            def delivery_score(row, column):
+                return max(window_list[column],
+                           min(window_list[row] + get_travel_time(pickups[row], pickups[column]),
+                               via_dropoff_list[row] + get_travel_time(dropoffs[row], pickups[column])))
+
+            def delivery_courier_score(row, column):
+                return courier_score(column, row)
+
+            # a delivery is picked up no earlier than its time window start, and a delivery after another
+            # no earlier than the time window start of the other
+            delivery_bounds = np.maximum(windows[None, :], windows[:, None])
+            np.fill_diagonal(delivery_bounds, EXCLUDED)
+
+            courier_neighbours = smallest_columns_bounded(
+                np.broadcast_to(windows, (len(couriers), len(deliveries))), courier_score, k)
+            delivery_neighbours = smallest_columns_bounded(delivery_bounds, delivery_score, k)
+            delivery_couriers = smallest_columns_bounded(np.where(too_small, EXCLUDED, windows[:, None]),
+                                                         delivery_courier_score, k)
+
+        return cls(k, courier_ids, delivery_ids,
+                   np.where(courier_neighbours >= 0, delivery_ids[courier_neighbours], -1),
+                   np.where(delivery_neighbours >= 0, delivery_ids[delivery_neighbours], -1),
+                   np.where(delivery_couriers >= 0, courier_ids[delivery_couriers], -1),
+                   windows)
+
+    def save(self, index_path, signature):
+        temporary_path = index_path + '.tmp.npz'
+        np.savez(temporary_path, signature=np.array(signature), k=np.array(self.k), courier_ids=self.courier_ids,
+                 delivery_ids=self.delivery_ids, courier_neighbours=self.courier_neighbour_rows,
+                 delivery_neighbours=self.delivery_neighbour_rows, delivery_couriers=self.delivery_courier_rows,
+                 time_windows=self.time_windows)
+        os.replace(temporary_path, index_path)
+
+    # Function to load a saved index, None if it is missing, was built from other files or keeps fewer
+    # than k neighbours
+    @classmethod
+    def load(cls, index_path, signature, k=DEFAULT_INDEX_NEIGHBOURS):
+        try:
+            with np.load(index_path) as data:
+                if str(data['signature']) != signature or int(data['k']) < k:
+                    return None
+                return cls(int(data['k']), data['courier_ids'], data['delivery_ids'], data['courier_neighbours'],
+                           data['delivery_neighbours'], data['delivery_couriers'], data['time_windows'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    # Function to get the first n entries of the rows of a neighbour matrix as lists of ids, converted once
+    def rows(self, name, n):
+        key = (name, n)
+        if key not in self.row_lists:
+            if n > self.k:
+                raise ValueError(f"The index keeps {self.k} neighbours, {n} were requested")
+            self.row_lists[key] = [[entry for entry in row if entry >= 0]
+                                   for row in getattr(self, name)[:, :n].tolist()]
+        return self.row_lists[key]
+
+    # Function to get the n deliveries a courier can pick up earliest
+    def courier_neighbours(self, courier_id, n):
+        return self.rows('courier_neighbour_rows', n)[self.courier_positions[courier_id]]
+
+    # Function to get the n deliveries that can be picked up earliest after a delivery
+    def delivery_neighbours(self, delivery_id, n):
+        return self.rows('delivery_neighbour_rows', n)[self.delivery_positions[delivery_id]]
+
+    # Function to get the deliveries that have a delivery among their n neighbours, the reverse lookup of
+    # delivery_neighbours
+    def delivery_predecessors(self, delivery_id, n):
+        if n not in self.predecessor_lists:
+            predecessors = [[] for _ in range(len(self.delivery_ids))]
+            for other_id, neighbours in zip(self.delivery_ids.tolist(), self.rows('delivery_neighbour_rows', n)):
+                for neighbour_id in neighbours:
+                    predecessors[self.delivery_positions[neighbour_id]].append(other_id)
+            self.predecessor_lists[n] = predecessors
+        return self.predecessor_lists[n][self.delivery_positions[delivery_id]]
+
+    # Function to get the n couriers with room for a delivery that can pick it up earliest
+    def delivery_couriers(self, delivery_id, n):
+        return self.rows('delivery_courier_rows', n)[self.delivery_positions[delivery_id]]
+
+    # Function to get the deliveries whose time window starts within [start, end], ordered by time window start
+    def deliveries_in_window(self, start, end):
+        first, last = np.searchsorted(self.sorted_windows, [start, end + 1])
+        return self.delivery_ids[self.window_order[first:last]].tolist()
+
+
+# Function to load the index of an instance folder from its cache, building and caching it when the cache
+# is missing or stale. A read-only folder gets an index that is not cached. oracle_spec is the spec of the
+# travel time oracle factory of a folder without traveltimes.csv.
+def load_neighbourhood_index(instance, instance_folder_path, k=DEFAULT_INDEX_NEIGHBOURS, oracle_spec=None):
+    index_path = os.path.join(instance_folder_path, INDEX_FILE)
+    signature = instance_signature(instance_folder_path, oracle_spec)
+    index = NeighbourhoodIndex.load(index_path, signature, k)
+    if index is None:
+        index = NeighbourhoodIndex.build(instance, k)
+        try:
+            index.save(index_path, signature)
+        except OSError:
+            pass
+    return index
+
+
+# Main function to build the neighbourhood index of all instance folders with travel times
+def index_all_instances(parent_folder, k=DEFAULT_INDEX_NEIGHBOURS):
+    for instance_folder in sorted(os.listdir(parent_folder)):
+        instance_folder_path = os.path.join(parent_folder, instance_folder)
+        if not os.path.isfile(os.path.join(instance_folder_path, 'traveltimes.csv')):
+            continue
+        instance = load_instance(instance_folder_path)
+        index = load_neighbourhood_index(instance, instance_folder_path, k)
+        print(f"Indexed: {instance_folder} ({len(index.courier_ids)} couriers, {len(index.delivery_ids)} deliveries)")
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the delivery neighbourhood index of all instance folders with travel times.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('--neighbours', type=int, default=DEFAULT_INDEX_NEIGHBOURS,
+                        help='Number of neighbours kept per courier and delivery')
+
+    args = parser.parse_args()
+
+    index_all_instances(args.parent_folder, args.neighbours)
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,17 @@ import os
 import csv
 import argparse
 
+from traveltime_provider import LazyTravelTimes, load_oracle_factory
+
+try:
+    from traveltime_cache import load_travel_time_grid
+except ImportError:  # numpy is not available, parse the CSV on every load
+    load_travel_time_grid = None
+
 # Define the Courier class
 class Courier:
+    __slots__ = ('courier_id', 'location', 'capacity')
+
     def __init__(self, courier_id, location, capacity):
         self.courier_id = courier_id
         self.location = location
@@ -15,6 +24,9 @@ class Courier:
 
 # Define the Delivery class
 class Delivery:
+    __slots__ = ('delivery_id', 'capacity', 'pickup_loc', 'time_window_start',
+                 'pickup_stacking_id', 'dropoff_loc')
+
     def __init__(self, delivery_id, capacity, pickup_loc, time_window_start, pickup_stacking_id, dropoff_loc):
         self.delivery_id = delivery_id
         self.capacity = capacity
@@ -28,41 +40,60 @@ class Delivery:
                f"Time Window Start={self.time_window_start}, Pickup Stacking Id={self.pickup_stacking_id}, Dropoff Loc={self.dropoff_loc})"
 
 
+# Function to map the column names of a CSV header to their positions
+def get_column_indices(header, names):
+    return [header.index(name) for name in names]
+
+
+# Function to lazily read couriers from CSV, one record per row without building a dict per row
+def iter_couriers_from_csv(filepath):
+    with open(filepath, 'r') as file:
+        reader = csv.reader(file)
+        id_col, location_col, capacity_col = get_column_indices(
+            next(reader), ['ID', 'Location', 'Capacity'])
+        for row in reader:
+            yield Courier(
+                courier_id=int(row[id_col]),
+                location=int(row[location_col]),
+                capacity=int(row[capacity_col])
+            )
+
+
 # Function to load couriers from CSV using the csv module
 def load_couriers_from_csv(filepath):
-    couriers = []
+    return list(iter_couriers_from_csv(filepath))
+
+
+# Function to lazily read deliveries from CSV, one record per row without building a dict per row
+def iter_deliveries_from_csv(filepath):
     with open(filepath, 'r') as file:
-        reader = csv.DictReader(file)
+        reader = csv.reader(file)
+        columns = get_column_indices(
+            next(reader), ['ID', 'Capacity', 'Pickup Loc', 'Time Window Start',
+                           'Pickup Stacking_Id', 'Dropoff Loc'])
+        id_col, capacity_col, pickup_col, time_window_col, stacking_col, dropoff_col = columns
         for row in reader:
-            courier = Courier(
-                courier_id=int(row['ID']),
-                location=int(row['Location']),
-                capacity=int(row['Capacity'])
+            yield Delivery(
+                delivery_id=int(row[id_col]),
+                capacity=int(row[capacity_col]),
+                pickup_loc=int(row[pickup_col]),
+                time_window_start=int(row[time_window_col]),
+                pickup_stacking_id=int(row[stacking_col]),
+                dropoff_loc=int(row[dropoff_col])
             )
-            couriers.append(courier)
-    return couriers
 
 
 # Function to load deliveries from CSV using the csv module
 def load_deliveries_from_csv(filepath):
-    deliveries = []
-    with open(filepath, 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            delivery = Delivery(
-                delivery_id=int(row['ID']),
-                capacity=int(row['Capacity']),
-                pickup_loc=int(row['Pickup Loc']),
-                time_window_start=int(row['Time Window Start']),
-                pickup_stacking_id=int(row['Pickup Stacking_Id']),
-                dropoff_loc=int(row['Dropoff Loc'])
-            )
-            deliveries.append(delivery)
-    return deliveries
+    return list(iter_deliveries_from_csv(filepath))
 
 
-# Function to load travel time matrix from CSV
+# Function to load travel time matrix from CSV (memory-mapped from the binary cache if possible,
+# in which case the 'Locations' header cell reads as 0)
 def load_travel_time_from_csv(filepath):
+    if load_travel_time_grid is not None:
+        return load_travel_time_grid(filepath)
+
     travel_time = []
     with open(filepath, 'r') as file:
         reader = csv.reader(file)
@@ -75,7 +106,9 @@ def load_travel_time_from_csv(filepath):
 
 
 # Function to process each instance folder and look for couriers.csv, deliveries.csv, and traveltime.csv
-def process_instance_folder(instance_folder_path):
+# When the folder has no traveltimes.csv and an oracle factory is given, the travel times are
+# requested on demand from the oracle it returns for the folder
+def process_instance_folder(instance_folder_path, oracle_factory=None):
     couriers_file = None
     deliveries_file = None
     travel_time_file = None
@@ -96,20 +129,23 @@ def process_instance_folder(instance_folder_path):
     if not deliveries_file:
         raise FileNotFoundError(f"Missing deliveries.csv file in folder: {instance_folder_path}")
 
-    if not travel_time_file:
+    if not travel_time_file and oracle_factory is None:
         raise FileNotFoundError(f"Missing traveltimes.csv file in folder: {instance_folder_path}")
 
 
     # Load couriers, deliveries, and travel time matrix from the instance
     couriers = load_couriers_from_csv(couriers_file)
     deliveries = load_deliveries_from_csv(deliveries_file)
-    travel_time = load_travel_time_from_csv(travel_time_file)
+    if travel_time_file:
+        travel_time = load_travel_time_from_csv(travel_time_file)
+    else:
+        travel_time = LazyTravelTimes(oracle_factory(instance_folder_path), first_index=1)
 
     return couriers, deliveries, travel_time
 
 
 # Main function to loop through all instance folders
-def process_all_instances(parent_folder):
+def process_all_instances(parent_folder, oracle_factory=None):
     all_instances = []
 
     # Loop through each instance folder in the parent directory
@@ -120,7 +156,7 @@ def process_all_instances(parent_folder):
         if os.path.isdir(instance_folder_path):
             print(f"Processing instance: {instance_folder}")
             try:
-                couriers, deliveries, travel_time = process_instance_folder(instance_folder_path)
+                couriers, deliveries, travel_time = process_instance_folder(instance_folder_path, oracle_factory)
 
                 # Add this instance's couriers, deliveries, and travel time matrix to the overall list
                 all_instances.append({
@@ -140,11 +176,15 @@ def main():
     # Parse the command-line arguments
     parser = argparse.ArgumentParser(description="Process couriers, deliveries, and travel time matrices from multiple instances.")
     parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('--travel-time-oracle', type=str, default=None,
+                        help="Factory 'module:function' returning the travel time oracle of an instance folder without traveltimes.csv")
 
     args = parser.parse_args()
 
+    oracle_factory = load_oracle_factory(args.travel_time_oracle) if args.travel_time_oracle else None
+
     # Process all instances
-    all_instance_data = process_all_instances(args.parent_folder)
+    all_instance_data = process_all_instances(args.parent_folder, oracle_factory)
 
 
 # Main execution
@@ -0,0 +1,181 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from feasibility_checker import Route, load_instance, MAX_ROUTE_STOPS, MAX_ROUTE_DURATION
+from neighbourhood_index import NeighbourhoodIndex, load_neighbourhood_index
+
+MAX_ROUTE_DELIVERIES = MAX_ROUTE_STOPS // 2
+DEFAULT_NEIGHBOURS = 5
+
+
+# Function to add a (time, cost, ...) label under its key unless an earlier and cheaper label dominates it,
+# dropping the labels it dominates itself
+def add_label(labels, key, label):
+    time, cost = label[0], label[1]
+    key_labels = labels.setdefault(key, [])
+    for other in key_labels:
+        if other[0] <= time and other[1] <= cost:
+            return
+    key_labels[:] = [other for other in key_labels if not (time <= other[0] and cost <= other[1])]
+    key_labels.append(label)
+
+
+# Define the DeliveryNeighbourhood class, restricting which delivery may be picked up next. A courier
+# starts with one of the deliveries it can pick up earliest, and a route continues with one of the
+# deliveries that can be picked up earliest after the delivery it picked up last (directly from its
+# pickup or after its dropoff). The neighbours are looked up in a NeighbourhoodIndex, which is built
+# unless one keeping at least n_neighbours is given. With n_neighbours=None every delivery is a
+# neighbour and the enumeration is exact.
+class DeliveryNeighbourhood:
+    def __init__(self, instance, n_neighbours=DEFAULT_NEIGHBOURS, index=None):
+        self.n_neighbours = n_neighbours
+
+        if n_neighbours is None:
+            all_deliveries = frozenset(delivery.delivery_id for delivery in instance.deliveries)
+            self.courier_neighbours = {courier.courier_id: all_deliveries for courier in instance.couriers}
+            self.delivery_neighbours = {delivery.delivery_id: all_deliveries - {delivery.delivery_id}
+                                        for delivery in instance.deliveries}
+            return
+
+        if index is None:
+            index = NeighbourhoodIndex.build(instance, n_neighbours)
+        self.courier_neighbours = {courier.courier_id: frozenset(index.courier_neighbours(courier.courier_id,
+                                                                                           n_neighbours))
+                                   for courier in instance.couriers}
+        self.delivery_neighbours = {delivery.delivery_id: frozenset(index.delivery_neighbours(delivery.delivery_id,
+                                                                                              n_neighbours))
+                                    for delivery in instance.deliveries}
+
+    # Function to get the deliveries a partial route may pick up next, given the delivery it picked up
+    # last (None for an empty route)
+    def next_deliveries(self, courier_id, last_pickup):
+        if last_pickup is None:
+            return self.courier_neighbours[courier_id]
+        return self.delivery_neighbours[last_pickup]
+
+    # Function to get the part of the state of a partial route its completions depend on beyond the
+    # deliveries served, in the bag and the last location: the last pickup, unless every delivery is a
+    # neighbour
+    def label_key(self, last_pickup):
+        return None if self.n_neighbours is None else last_pickup
+
+
+# Function to enumerate the routes of one courier with at most max_deliveries deliveries. Partial routes
+# with the same deliveries served, the same deliveries in the bag, the same last location and, within a
+# neighbourhood, the same last pickup have the same completions, so among them only the non-dominated
+# (time, cost) labels are extended. Returns the cheapest (cost, stops) per set of served deliveries.
+def enumerate_courier_routes(instance, courier, neighbourhood, max_deliveries=MAX_ROUTE_DELIVERIES):
+    best_routes = {}
+    labels = {(frozenset(), frozenset(), courier.location, None): [(0, 0, (), 0, None)]}
+    while labels:
+        extended_labels = {}
+        for (served, bag, location, _), key_labels in labels.items():
+            for current_time, cost, stops, load, last_pickup in key_labels:
+                if served and not bag:
+                    if served not in best_routes or cost < best_routes[served][0]:
+                        best_routes[served] = (cost, list(stops))
+
+                for delivery_id in bag:
+                    delivery = instance.get_delivery(delivery_id)
+                    dropoff_time = current_time + instance.get_travel_time(location, delivery.dropoff_loc)
+                    if dropoff_time > MAX_ROUTE_DURATION:
+                        continue
+                    add_label(extended_labels, (served, bag - {delivery_id}, delivery.dropoff_loc,
+                                                neighbourhood.label_key(last_pickup)),
+                              (dropoff_time, cost + dropoff_time, stops + (delivery_id,), load - delivery.capacity,
+                               last_pickup))
+
+                if len(served) == max_deliveries:
+                    continue
+                for delivery_id in neighbourhood.next_deliveries(courier.courier_id, last_pickup):
+                    delivery = instance.get_delivery(delivery_id)
+                    if delivery_id in served or load + delivery.capacity > courier.capacity:
+                        continue
+                    pickup_time = max(delivery.time_window_start,
+                                      current_time + instance.get_travel_time(location, delivery.pickup_loc))
+                    if pickup_time > MAX_ROUTE_DURATION:
+                        continue
+                    add_label(extended_labels, (served | {delivery_id}, bag | {delivery_id}, delivery.pickup_loc,
+                                                neighbourhood.label_key(delivery_id)),
+                              (pickup_time, cost, stops + (delivery_id,), load + delivery.capacity, delivery_id))
+        labels = extended_labels
+    return list(best_routes.values())
+
+
+# State of the worker processes, set once per process so that the instance is not sent with every courier
+worker_instance = None
+worker_neighbourhood = None
+worker_max_deliveries = MAX_ROUTE_DELIVERIES
+
+
+def init_worker(instance, neighbourhood, max_deliveries):
+    global worker_instance, worker_neighbourhood, worker_max_deliveries
+    worker_instance = instance
+    worker_neighbourhood = neighbourhood
+    worker_max_deliveries = max_deliveries
+
+
+def enumerate_courier_routes_worker(courier_id):
+    courier = worker_instance.get_courier(courier_id)
+    return courier_id, enumerate_courier_routes(worker_instance, courier, worker_neighbourhood,
+                                                worker_max_deliveries)
+
+
+# Function to enumerate the column pool of an instance: the cheapest route of every courier for every set
+# of deliveries it can serve within the neighbourhood. With jobs > 1 the couriers are enumerated in
+# parallel worker processes, which requires a picklable instance (a travel time oracle given as a
+# closure is not). The neighbours are taken from index if given (see DeliveryNeighbourhood). Returns a
+# list of (Route, cost) pairs ordered by courier.
+def enumerate_routes(instance, n_neighbours=DEFAULT_NEIGHBOURS, jobs=1, max_deliveries=MAX_ROUTE_DELIVERIES,
+                     index=None):
+    neighbourhood = DeliveryNeighbourhood(instance, n_neighbours, index)
+
+    if jobs <= 1:
+        courier_routes = [(courier.courier_id, enumerate_courier_routes(instance, courier, neighbourhood,
+                                                                         max_deliveries))
+                          for courier in instance.couriers]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(instance, neighbourhood, max_deliveries)) as executor:
+            courier_routes = list(executor.map(enumerate_courier_routes_worker,
+                                               [courier.courier_id for courier in instance.couriers]))
+
+    pool = []
+    for courier_id, routes in courier_routes:
+        for cost, stops in routes:
+            pool.append((Route(courier_id, stops), cost))
+    return pool
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(description="Enumerate the route column pool of courier routing instances.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('--neighbours', type=int, default=DEFAULT_NEIGHBOURS,
+                        help='Number of deliveries a route may continue with after each delivery (0 for all)')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of couriers enumerated in parallel worker processes')
+
+    args = parser.parse_args()
+
+    for instance_folder in sorted(os.listdir(args.parent_folder)):
+        instance_folder_path = os.path.join(args.parent_folder, instance_folder)
+        if not os.path.isdir(instance_folder_path):
+            continue
+        try:
+            instance = load_instance(instance_folder_path)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+
+        start_time = time.perf_counter()
+        index = load_neighbourhood_index(instance, instance_folder_path, args.neighbours) if args.neighbours else None
+        pool = enumerate_routes(instance, args.neighbours or None, args.jobs, index=index)
+        print(f"{instance.name}: {len(pool)} routes for {len(instance.couriers)} couriers and "
+              f"{len(instance.deliveries)} deliveries, {time.perf_counter() - start_time:.2f}s")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
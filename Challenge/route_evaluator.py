@@ -0,0 +1,178 @@
+from feasibility_checker import Route, MAX_ROUTE_STOPS, MAX_ROUTE_DURATION
+
+# A delay of the service time at one stop is carried to the later stops by maps of the form
+# s -> max(a, s + b): dropoffs pass it on unchanged, pickups absorb it with their waiting time
+# (or turn an earlier arrival into waiting). Such maps are closed under composition, so the
+# effect of a delay between any two stops of a route can be tabulated once per route.
+IDENTITY_SHIFT = (float('-inf'), 0)
+
+
+def apply_shift(shift_map, shift):
+    return max(shift_map[0], shift + shift_map[1])
+
+
+def compose_shift(first, second):
+    return max(first[0] + second[1], second[0]), first[1] + second[1]
+
+
+# Define the RouteInsertionEvaluator class, caching the forward times, loads and costs and the
+# backward shift maps of one route so that inserting a delivery can be scored without
+# replaying the route. The cost and feasibility of the route come from the forward pass alone,
+# the O(n^2) tables of the shift maps are only built for the first insertion evaluated.
+class RouteInsertionEvaluator:
+    def __init__(self, instance, route):
+        self.instance = instance
+        self.route = route
+        self.courier = instance.get_courier(route.rider_id)
+
+        n = len(route.stops)
+        self.locations = []
+        self.is_pickup = []
+        self.times = []  # service time at each stop, including waiting
+        self.loads = []  # load after each stop
+        self.stop_maps = []  # shift map carrying a delay at the previous stop over each stop
+        self.cost = 0
+        self.best_insertions = {}
+
+        orders_in_bag = set()
+        current_time = 0
+        load = 0
+        capacity_ok = True
+        last_location = self.courier.location
+        for activity in route.stops:
+            delivery = instance.get_delivery(activity)
+            if activity in orders_in_bag:
+                orders_in_bag.remove(activity)
+                location = delivery.dropoff_loc
+                current_time = current_time + instance.get_travel_time(last_location, location)
+                load = load - delivery.capacity
+                self.cost = self.cost + current_time
+                self.stop_maps.append(IDENTITY_SHIFT)
+                self.is_pickup.append(False)
+            else:
+                orders_in_bag.add(activity)
+                location = delivery.pickup_loc
+                arrival = current_time + instance.get_travel_time(last_location, location)
+                current_time = max(delivery.time_window_start, arrival)
+                load = load + delivery.capacity
+                capacity_ok = capacity_ok and load <= self.courier.capacity
+                self.stop_maps.append((delivery.time_window_start - current_time, arrival - current_time))
+                self.is_pickup.append(True)
+            self.locations.append(location)
+            self.times.append(current_time)
+            self.loads.append(load)
+            last_location = location
+
+        self.end_time = current_time
+        self.capacity_ok = capacity_ok
+        self.all_dropped = not orders_in_bag
+        self.feasible = (capacity_ok and self.all_dropped and n <= MAX_ROUTE_STOPS and
+                         current_time <= MAX_ROUTE_DURATION)
+        self.shift_maps = None
+        self.max_loads = None
+        self.dropoff_maps = None
+
+    # Function to build the tables of the backward pass: shift_maps[k][m] carries a delay of stop k
+    # to stop m, max_loads[k][m] is the peak load after stops k..m, dropoff_maps[k] lists the maps
+    # of all dropoffs from stop k on
+    def _build_tables(self):
+        n = len(self.route.stops)
+        self.shift_maps = [[None] * n for _ in range(n)]
+        self.max_loads = [[None] * n for _ in range(n)]
+        self.dropoff_maps = [[] for _ in range(n)]
+        for k in range(n):
+            shift_map = IDENTITY_SHIFT
+            max_load = self.loads[k]
+            for m in range(k, n):
+                if m > k:
+                    shift_map = compose_shift(shift_map, self.stop_maps[m])
+                    max_load = max(max_load, self.loads[m])
+                self.shift_maps[k][m] = shift_map
+                self.max_loads[k][m] = max_load
+                if not self.is_pickup[m]:
+                    self.dropoff_maps[k].append((m, shift_map))
+
+    # Function to compute the shift of the service time at stop k when the stop is reached at arrival
+    def _shift_at(self, k, arrival):
+        if self.is_pickup[k]:
+            delivery = self.instance.get_delivery(self.route.stops[k])
+            arrival = max(delivery.time_window_start, arrival)
+        return arrival - self.times[k]
+
+    # Function to sum the cost increase of the dropoffs among stops start..end-1 for a delay at start
+    def _dropoff_shift_cost(self, start, end, shift):
+        cost = 0
+        for m, shift_map in self.dropoff_maps[start]:
+            if m >= end:
+                break
+            cost = cost + apply_shift(shift_map, shift)
+        return cost
+
+    # Function to evaluate inserting the pickup of a delivery before stop i and its dropoff
+    # before stop j of the current route (0 <= i <= j <= number of stops), returning the cost
+    # delta and whether the resulting route is feasible
+    def insertion_delta(self, delivery_id, i, j):
+        if self.shift_maps is None:
+            self._build_tables()
+        instance = self.instance
+        delivery = instance.get_delivery(delivery_id)
+        n = len(self.route.stops)
+
+        # an insertion can shorten a route on a travel time matrix without the triangle inequality,
+        # so the duration is rechecked rather than taken from the current route
+        feasible = self.capacity_ok and self.all_dropped and n + 2 <= MAX_ROUTE_STOPS
+        load_before = self.loads[i - 1] if i > 0 else 0
+        peak_load = load_before if i == j else max(load_before, self.max_loads[i][j - 1])
+        feasible = feasible and peak_load + delivery.capacity <= self.courier.capacity
+
+        previous_time = self.times[i - 1] if i > 0 else 0
+        previous_location = self.locations[i - 1] if i > 0 else self.courier.location
+        pickup_time = max(delivery.time_window_start,
+                          previous_time + instance.get_travel_time(previous_location, delivery.pickup_loc))
+
+        cost_delta = 0
+        if i == j:
+            dropoff_time = pickup_time + instance.get_travel_time(delivery.pickup_loc, delivery.dropoff_loc)
+        else:
+            shift = self._shift_at(i, pickup_time + instance.get_travel_time(delivery.pickup_loc,
+                                                                             self.locations[i]))
+            cost_delta = cost_delta + self._dropoff_shift_cost(i, j, shift)
+            time_before_dropoff = self.times[j - 1] + apply_shift(self.shift_maps[i][j - 1], shift)
+            dropoff_time = time_before_dropoff + instance.get_travel_time(self.locations[j - 1],
+                                                                          delivery.dropoff_loc)
+        cost_delta = cost_delta + dropoff_time
+
+        if j < n:
+            shift = self._shift_at(j, dropoff_time + instance.get_travel_time(delivery.dropoff_loc,
+                                                                              self.locations[j]))
+            cost_delta = cost_delta + self._dropoff_shift_cost(j, n, shift)
+            end_time = self.end_time + apply_shift(self.shift_maps[j][n - 1], shift)
+        else:
+            end_time = dropoff_time
+
+        feasible = feasible and end_time <= MAX_ROUTE_DURATION
+        return cost_delta, feasible
+
+    # Function to find the cheapest feasible insertion of a delivery, returning (cost delta, i, j)
+    # or None if the delivery cannot be inserted. The route never changes, so the result is memoised.
+    def best_insertion(self, delivery_id):
+        if delivery_id in self.best_insertions:
+            return self.best_insertions[delivery_id]
+
+        best = None
+        n = len(self.route.stops)
+        # a full route or an oversized delivery rules out every position at once
+        if self.capacity_ok and self.all_dropped and n + 2 <= MAX_ROUTE_STOPS and \
+                self.instance.get_delivery(delivery_id).capacity <= self.courier.capacity:
+            for i in range(n + 1):
+                for j in range(i, n + 1):
+                    cost_delta, feasible = self.insertion_delta(delivery_id, i, j)
+                    if feasible and (best is None or cost_delta < best[0]):
+                        best = (cost_delta, i, j)
+        self.best_insertions[delivery_id] = best
+        return best
+
+    # Function to build the route resulting from an insertion
+    def insert(self, delivery_id, i, j):
+        stops = self.route.stops
+        return Route(self.route.rider_id, stops[:i] + [delivery_id] + stops[i:j] + [delivery_id] + stops[j:])
@@ -0,0 +1,232 @@
+import os
+import time
+import random
+import argparse
+
+from feasibility_checker import Route, load_instance, read_routes_from_csv, write_routes_to_csv
+from route_evaluator import RouteInsertionEvaluator
+
+
+# Define the SolutionState class, a solution under local search: the stops of every courier with the cached
+# cost and feasibility of its route, how often every delivery appears over all routes, and the totals the
+# checker reports. A move replaces the stops of some couriers; applying it reevaluates only these routes
+# (by the forward pass of RouteInsertionEvaluator) and updates the counters, so it costs O(length of the
+# touched routes), and undo restores the previous routes from the saved values without any evaluation.
+# The undo records are kept until commit drops them. Couriers without a route in the given routes start
+# with an empty one but keep the solution infeasible, as for the checker, until they get one. Further routes
+# of a courier are kept as they are, counted in the cost and the deliveries, and make the solution infeasible.
+class SolutionState:
+    def __init__(self, instance, routes=()):
+        self.instance = instance
+        self.stops = {courier.courier_id: [] for courier in instance.couriers}
+        self.route_cost = {courier.courier_id: 0 for courier in instance.couriers}
+        self.route_feasible = {courier.courier_id: True for courier in instance.couriers}
+        self.delivery_count = {delivery.delivery_id: 0 for delivery in instance.deliveries}
+        self.courier_of = {}  # courier serving each delivery, the last one set if it is in several routes
+        self.total_cost = 0
+        self.n_infeasible_routes = 0
+        self.n_uncovered = len(self.delivery_count)  # deliveries not appearing exactly twice
+        self.history = []
+
+        extra_routes = {}
+        self.duplicate_routes = []  # further routes of couriers that already have one, kept as they are
+        for route in routes:
+            if route.rider_id in extra_routes:
+                self.duplicate_routes.append(Route(route.rider_id, list(route.stops)))
+            else:
+                extra_routes[route.rider_id] = list(route.stops)
+        self.missing_couriers = set(self.stops) - set(extra_routes)
+        self.apply(extra_routes)
+        self.commit()
+        for route in self.duplicate_routes:
+            self.count_stops(route.stops, 1)
+            self.total_cost += RouteInsertionEvaluator(instance, route).cost
+
+    # Function to check whether the solution passes the checker: one route per courier, every route feasible
+    # and every delivery picked up and dropped off exactly once
+    def is_feasible(self):
+        return self.n_infeasible_routes == 0 and self.n_uncovered == 0 and not self.missing_couriers and \
+            not self.duplicate_routes
+
+    # Function to get the routes of all couriers, in the form written by write_routes_to_csv
+    def routes(self):
+        return [Route(courier_id, list(stops)) for courier_id, stops in self.stops.items()] + \
+            [Route(route.rider_id, list(route.stops)) for route in self.duplicate_routes]
+
+    # Function to add count to the appearances of the stops of a route, tracking the deliveries that are
+    # no longer or again covered exactly twice
+    def count_stops(self, stops, count):
+        delivery_count = self.delivery_count
+        for activity in stops:
+            before = delivery_count[activity]
+            delivery_count[activity] = before + count
+            self.n_uncovered += (before == 2) - (before + count == 2)
+
+    # Function to set the stops of a courier with a known cost and feasibility
+    def set_stops(self, courier_id, stops, cost, feasible):
+        for activity in self.stops[courier_id]:
+            if self.courier_of.get(activity) == courier_id:
+                del self.courier_of[activity]
+        for activity in stops:
+            self.courier_of[activity] = courier_id
+        self.count_stops(self.stops[courier_id], -1)
+        self.count_stops(stops, 1)
+        self.total_cost += cost - self.route_cost[courier_id]
+        self.n_infeasible_routes += self.route_feasible[courier_id] - feasible
+        self.stops[courier_id] = stops
+        self.route_cost[courier_id] = cost
+        self.route_feasible[courier_id] = feasible
+
+    # Function to apply a move, given as the new stops of the couriers it changes, returning the change of
+    # the total cost. The previous routes are saved for undo.
+    def apply(self, move):
+        saved = []
+        cost_before = self.total_cost
+        found_couriers = self.missing_couriers.intersection(move)
+        self.missing_couriers.difference_update(found_couriers)
+        for courier_id, stops in move.items():
+            saved.append((courier_id, self.stops[courier_id], self.route_cost[courier_id],
+                          self.route_feasible[courier_id]))
+            evaluator = RouteInsertionEvaluator(self.instance, Route(courier_id, stops))
+            self.set_stops(courier_id, stops, evaluator.cost, evaluator.feasible)
+        self.history.append((saved, found_couriers))
+        return self.total_cost - cost_before
+
+    # Function to undo the last applied move
+    def undo(self):
+        saved, found_couriers = self.history.pop()
+        for courier_id, stops, cost, feasible in reversed(saved):
+            self.set_stops(courier_id, stops, cost, feasible)
+        self.missing_couriers.update(found_couriers)
+
+    # Function to keep the moves applied so far, dropping their undo records
+    def commit(self):
+        self.history.clear()
+
+
+# Function to move a delivery from the route of one courier to the route of another (or the same), with
+# its pickup before stop i and its dropoff before stop j of the target route without the delivery
+def relocate_move(state, delivery_id, from_courier, to_courier, i, j):
+    source = [stop for stop in state.stops[from_courier] if stop != delivery_id]
+    target = source if to_courier == from_courier else state.stops[to_courier]
+    target = target[:i] + [delivery_id] + target[i:j] + [delivery_id] + target[j:]
+    if to_courier == from_courier:
+        return {to_courier: target}
+    return {from_courier: source, to_courier: target}
+
+
+# Function to exchange two deliveries, each taking the pickup and dropoff positions of the other
+def swap_move(state, first_id, first_courier, second_id, second_courier):
+    exchange = {first_id: second_id, second_id: first_id}
+    move = {}
+    for courier_id in {first_courier, second_courier}:
+        move[courier_id] = [exchange.get(stop, stop) for stop in state.stops[courier_id]]
+    return move
+
+
+# Function to exchange the tails of two routes (2-opt*): the first courier keeps its stops before i and
+# takes the stops of the second from j on, and the other way round. Only cuts between whole deliveries
+# give feasible routes.
+def two_opt_star_move(state, first_courier, i, second_courier, j):
+    first = state.stops[first_courier]
+    second = state.stops[second_courier]
+    return {first_courier: first[:i] + second[j:], second_courier: second[:j] + first[i:]}
+
+
+# Function to exchange the routes of two couriers
+def route_exchange_move(state, first_courier, second_courier):
+    return {first_courier: list(state.stops[second_courier]), second_courier: list(state.stops[first_courier])}
+
+
+# Function to get the insertion evaluator of the route of a courier without a delivery (None keeps the whole
+# route), cached in evaluators until the route changes
+def cached_evaluator(state, evaluators, courier_id, removed=None):
+    courier_evaluators = evaluators.setdefault(courier_id, {})
+    if removed not in courier_evaluators:
+        stops = [stop for stop in state.stops[courier_id] if stop != removed]
+        courier_evaluators[removed] = RouteInsertionEvaluator(state.instance, Route(courier_id, stops))
+    return courier_evaluators[removed]
+
+
+# Function to improve a feasible solution by relocating random deliveries to random positions of random
+# routes, until max_moves moves were tried or the time is up. A move is screened without applying it: the
+# shortened source route is evaluated once per delivery and the insertion is scored by insertion_delta on
+# the target route, both cached until a route changes. Only a feasible move lowering the cost is applied
+# and kept. Returns the number of improving moves.
+def relocate_descent(state, rng, max_moves, time_limit=None):
+    start_time = time.perf_counter()
+    deliveries = sorted(state.delivery_count)
+    couriers = sorted(state.stops)
+    evaluators = {}
+    improvements = 0
+    for _ in range(max_moves):
+        if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+            break
+        delivery_id = rng.choice(deliveries)
+        from_courier = state.courier_of[delivery_id]
+        to_courier = rng.choice(couriers)
+        n = len(state.stops[to_courier]) - (2 if to_courier == from_courier else 0)
+        i = rng.randint(0, n)
+        j = rng.randint(i, n)
+
+        # the travel times need not satisfy the triangle inequality, so the shortened route is checked too
+        source = cached_evaluator(state, evaluators, from_courier, delivery_id)
+        if not source.feasible:
+            continue
+        target = source if to_courier == from_courier else cached_evaluator(state, evaluators, to_courier)
+        insertion_delta, feasible = target.insertion_delta(delivery_id, i, j)
+        if not feasible or source.cost - state.route_cost[from_courier] + insertion_delta >= 0:
+            continue
+
+        state.apply(relocate_move(state, delivery_id, from_courier, to_courier, i, j))
+        if state.is_feasible():
+            state.commit()
+            improvements += 1
+            evaluators.pop(from_courier, None)
+            evaluators.pop(to_courier, None)
+        else:
+            state.undo()
+    return improvements
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check solutions incrementally and improve them by random relocate moves.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+    parser.add_argument('solution_folder', type=str, help='Path to the folder containing the solution files')
+    parser.add_argument('--moves', type=int, default=0,
+                        help='Number of relocate moves tried per instance; improved solutions are written back')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the moves')
+
+    args = parser.parse_args()
+
+    for instance_folder in sorted(os.listdir(args.parent_folder)):
+        instance_folder_path = os.path.join(args.parent_folder, instance_folder)
+        if not os.path.isdir(instance_folder_path):
+            continue
+        try:
+            instance = load_instance(instance_folder_path)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+        solution_file = os.path.join(args.solution_folder, instance.name + ".csv")
+        routes = read_routes_from_csv(solution_file)
+        if not routes:
+            continue
+
+        start_time = time.perf_counter()
+        state = SolutionState(instance, routes)
+        cost = state.total_cost
+        improvements = 0
+        if args.moves and state.is_feasible():
+            improvements = relocate_descent(state, random.Random(args.seed), args.moves)
+            if improvements:
+                write_routes_to_csv(state.routes(), solution_file)
+        print(f"{instance.name}: feasible {state.is_feasible()}, cost {cost} -> {state.total_cost} "
+              f"({improvements} improving moves), {time.perf_counter() - start_time:.2f}s")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from feasibility_checker import Route, load_instance, read_routes_from_csv
+from alns import Alns, check_routes
+from colgen import solve_instance
+from testing import INSTANCE, checker_result
+
+
+def test_solve(tmp_path):
+    instance = load_instance(INSTANCE)
+    solution_file = str(tmp_path / 'solution.csv')
+    alns = Alns(instance, seed=0)
+    best = alns.solve(600, max_iterations=200, solution_file=solution_file)
+    assert alns.stats['iterations'] == 200
+
+    routes = best.routes()
+    assert not best.unassigned
+    assert checker_result(instance, routes) == (best.cost, True)
+    assert check_routes(instance, routes) == (best.cost, True)
+    assert checker_result(instance, read_routes_from_csv(solution_file)) == (best.cost, True)
+
+    # a delivery that is picked up but not dropped off makes the routes infeasible for both
+    k = next(k for k, route in enumerate(routes) if route.stops)
+    routes[k] = Route(routes[k].rider_id, routes[k].stops[:-1])
+    assert check_routes(instance, routes) == checker_result(instance, routes)
+    assert not check_routes(instance, routes)[1]
+
+
+def test_optimal_initial_routes():
+    # an optimal solution cannot be improved, the search keeps it
+    instance = load_instance(INSTANCE)
+    routes, model = solve_instance(instance)
+    best = Alns(instance, seed=0).solve(600, max_iterations=100, initial_routes=routes)
+    assert abs(best.cost - model.getObjVal()) < 1e-6
+    assert checker_result(instance, best.routes()) == (best.cost, True)
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from feasibility_checker import Instance, Route, load_instance, get_route_cost, is_feasible
+from batch_evaluator import BatchRouteEvaluator
+from traveltime_provider import LazyTravelTimes
+from testing import INSTANCE, random_route
+
+
+def test_matches_checker():
+    instance = load_instance(INSTANCE)
+    rng = random.Random(1)
+    routes = [random_route(instance, rng) for _ in range(300)]
+    result = BatchRouteEvaluator(instance).evaluate(routes)
+    for route, cost, feasible in zip(routes, result['cost'], result['feasible']):
+        assert cost == get_route_cost(route, instance)
+        assert feasible == is_feasible(route, instance)
+    assert 0 < result['feasible'].sum() < len(routes)
+
+
+def test_lazy_travel_times():
+    instance = load_instance(INSTANCE)
+    requested = []
+
+    def oracle(from_location, to_location):
+        requested.append((from_location, to_location))
+        return instance.travel_time[from_location - 1, to_location - 1]
+
+    lazy_instance = Instance(instance.couriers, instance.deliveries, LazyTravelTimes(oracle), name=instance.name)
+    rng = random.Random(0)
+    routes = [random_route(instance, rng) for _ in range(200)]
+
+    expected = BatchRouteEvaluator(instance).evaluate(routes)
+    result = BatchRouteEvaluator(lazy_instance).evaluate(routes)
+    for key in expected:
+        assert np.array_equal(expected[key], result[key])
+
+    # only the legs of the routes are requested, each once
+    legs = set()
+    for route in routes:
+        location = instance.get_courier(route.rider_id).location
+        bag = set()
+        for stop in route.stops:
+            delivery = instance.get_delivery(stop)
+            next_location = delivery.dropoff_loc if stop in bag else delivery.pickup_loc
+            bag ^= {stop}
+            legs.add((location, next_location))
+            location = next_location
+    assert sorted(requested) == sorted(legs)
+
+
+def test_empty_batch():
+    instance = load_instance(INSTANCE)
+    lazy_instance = Instance(instance.couriers, instance.deliveries,
+                             LazyTravelTimes(lambda from_location, to_location: 0), name=instance.name)
+    for evaluator in (BatchRouteEvaluator(instance), BatchRouteEvaluator(lazy_instance)):
+        result = evaluator.evaluate([])
+        assert result['cost'].shape == (0,) and result['feasible'].shape == (0,)
+        # routes without stops pack into a batch without columns
+        result = evaluator.evaluate([Route(instance.couriers[0].courier_id, [])])
+        assert result['cost'].tolist() == [0] and result['feasible'].tolist() == [True]
+
@@ -0,0 +1,33 @@
+from feasibility_checker import load_instance, get_route_cost
+from bundles import bundle_routes, find_bundles
+from colgen import greedy_routes, singleton_routes, solve_instance
+from neighbourhood_index import NeighbourhoodIndex
+from route_enumeration import enumerate_routes
+from testing import instance_path
+
+INSTANCE = instance_path('389f96b3-a8b9-4715-9260-6842e4509073')
+
+
+def test_bundle_routes():
+    instance = load_instance(INSTANCE)
+    routes = bundle_routes(instance, find_bundles(instance), NeighbourhoodIndex.build(instance))
+    assert routes
+    for route, cost in routes:
+        assert get_route_cost(route, instance) == cost
+
+    # a bundle picks up all its deliveries before dropping any off, which is not always the cheapest order
+    cheapest = {(route.rider_id, frozenset(route.stops)): cost for route, cost in enumerate_routes(instance, None)}
+    assert any(cheapest[(route.rider_id, frozenset(route.stops))] < cost for route, cost in routes)
+
+
+def test_bundle_seeded_master():
+    # the master starts from bundle routes with worse stop orders, the cheaper orders must still be priced
+    instance = load_instance(INSTANCE)
+    routes = bundle_routes(instance, find_bundles(instance), NeighbourhoodIndex.build(instance))
+    initial_routes = greedy_routes(instance) + singleton_routes(instance) + [route for route, _ in routes]
+
+    _, model = solve_instance(instance)
+    _, seeded_model = solve_instance(instance, initial_routes=initial_routes)
+    assert seeded_model.getStatus() == "optimal"
+    assert abs(seeded_model.getObjVal() - model.getObjVal()) < 1e-6
+    assert abs(seeded_model.getDualbound() - model.getObjVal()) < 1e-6
@@ -0,0 +1,29 @@
+from feasibility_checker import Route, load_instance, get_route_cost
+from colgen import solve_instance, singleton_routes
+from testing import INSTANCE, checker_result
+
+
+def check_solution(instance, routes, model):
+    assert checker_result(instance, routes) == (round(model.getObjVal()), True)
+
+
+def test_solve_instance():
+    instance = load_instance(INSTANCE)
+    routes, model = solve_instance(instance)
+    assert model.getStatus() == "optimal"
+    assert abs(model.getObjVal() - 233) < 1e-6
+    check_solution(instance, routes, model)
+
+
+def test_cheaper_route_replaces_seeded_column():
+    # the optimal solution serves deliveries 14 and 16 with courier 3 as [14, 16, 16, 14] at cost 68; seeded
+    # with a worse order of the same deliveries, the priced better order must still enter the master
+    instance = load_instance(INSTANCE)
+    seed = Route(3, [16, 16, 14, 14])
+    assert get_route_cost(seed, instance) == 95
+
+    routes, model = solve_instance(instance, initial_routes=singleton_routes(instance) + [seed])
+    assert model.getStatus() == "optimal"
+    assert abs(model.getObjVal() - 233) < 1e-6
+    assert abs(model.getDualbound() - 233) < 1e-6
+    check_solution(instance, routes, model)
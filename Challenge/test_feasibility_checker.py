@@ -0,0 +1,32 @@
+import os
+import random
+import shutil
+
+import numpy as np
+
+import feasibility_checker
+from feasibility_checker import load_instance, get_route_cost
+from testing import INSTANCE, random_route
+
+
+def test_cached_travel_times(tmp_path, monkeypatch):
+    # the instance is copied, so that the binary cache is built next to the copy
+    for filename in ('couriers.csv', 'deliveries.csv', 'traveltimes.csv'):
+        shutil.copy(os.path.join(INSTANCE, filename), tmp_path)
+    load_instance(str(tmp_path))
+    assert (tmp_path / 'traveltimes.npy').exists()
+    cached = load_instance(str(tmp_path))
+    assert isinstance(cached.travel_time, np.ndarray)
+
+    monkeypatch.setattr(feasibility_checker, 'load_travel_time_grid', None)
+    parsed = load_instance(str(tmp_path))
+    assert isinstance(parsed.travel_time, list)
+
+    # both loaders give Python ints, the memory-mapped grid must not leak numpy scalars
+    rng = random.Random(0)
+    for _ in range(100):
+        route = random_route(parsed, rng)
+        cost = get_route_cost(route, cached)
+        assert cost == get_route_cost(route, parsed)
+        assert type(cost) is type(get_route_cost(route, parsed)) is int
+    assert type(cached.get_travel_time(1, 2)) is int
@@ -0,0 +1,43 @@
+import os
+import shutil
+
+import numpy as np
+
+from feasibility_checker import Instance, load_instance
+from neighbourhood_index import NeighbourhoodIndex, instance_signature
+from traveltime_provider import LazyTravelTimes
+from testing import instance_path
+
+INSTANCE = instance_path('6d75e3a3-94b6-4672-8d1e-9ac93e98cd82')
+
+
+def test_oracle_index_matches_dense_index():
+    instance = load_instance(INSTANCE)
+    requested = []
+
+    def oracle(from_location, to_location):
+        requested.append((from_location, to_location))
+        return instance.travel_time[from_location - 1, to_location - 1]
+
+    lazy_instance = Instance(instance.couriers, instance.deliveries, LazyTravelTimes(oracle), name=instance.name)
+    n_pairs = len(instance.couriers) * len(instance.deliveries) + 2 * len(instance.deliveries) ** 2
+    for k in (1, 3, 20):
+        requested.clear()
+        dense = NeighbourhoodIndex.build(instance, k)
+        lazy = NeighbourhoodIndex.build(lazy_instance, k)
+        for name in ('courier_neighbour_rows', 'delivery_neighbour_rows', 'delivery_courier_rows'):
+            assert np.array_equal(getattr(dense, name), getattr(lazy, name))
+        # every pair is asked at most once, and only the pickup to dropoff pairs stay cached
+        assert len(requested) == len(set(requested))
+        assert set(lazy_instance.travel_time.cache) == {(delivery.pickup_loc, delivery.dropoff_loc)
+                                                        for delivery in instance.deliveries}
+        # the time window starts rule out pairs unless every delivery is a neighbour
+        if k < len(instance.deliveries):
+            assert len(requested) < n_pairs / 2
+
+
+def test_oracle_signature(tmp_path):
+    for filename in ('couriers.csv', 'deliveries.csv'):
+        shutil.copy(os.path.join(INSTANCE, filename), tmp_path)
+    assert instance_signature(str(tmp_path), 'oracles:first') != instance_signature(str(tmp_path), 'oracles:second')
+    assert instance_signature(str(tmp_path), 'oracles:first') == instance_signature(str(tmp_path), 'oracles:first')
@@ -0,0 +1,60 @@
+from feasibility_checker import load_instance, get_route_cost, MAX_ROUTE_DURATION
+from route_enumeration import DeliveryNeighbourhood, enumerate_routes, MAX_ROUTE_DELIVERIES
+from testing import instance_path
+
+INSTANCE = instance_path('028da981-b8d6-4e72-ba8d-7dd471e751e9')
+
+
+def exhaustive_routes(instance, neighbourhood):
+    """
+    The cheapest cost per (courier, set of deliveries) over all stop sequences allowed by the neighbourhood,
+    found by depth-first search without any dominance
+    """
+
+    best = {}
+
+    def extend(courier, time, cost, load, served, bag, location, last_pickup):
+        if served and not bag:
+            key = (courier.courier_id, served)
+            best[key] = min(best.get(key, cost), cost)
+        for delivery_id in bag:
+            delivery = instance.get_delivery(delivery_id)
+            dropoff_time = time + instance.get_travel_time(location, delivery.dropoff_loc)
+            if dropoff_time <= MAX_ROUTE_DURATION:
+                extend(courier, dropoff_time, cost + dropoff_time, load - delivery.capacity, served,
+                       bag - {delivery_id}, delivery.dropoff_loc, last_pickup)
+        if len(served) == MAX_ROUTE_DELIVERIES:
+            return
+        for delivery_id in neighbourhood.next_deliveries(courier.courier_id, last_pickup):
+            delivery = instance.get_delivery(delivery_id)
+            if delivery_id in served or load + delivery.capacity > courier.capacity:
+                continue
+            pickup_time = max(delivery.time_window_start,
+                              time + instance.get_travel_time(location, delivery.pickup_loc))
+            if pickup_time <= MAX_ROUTE_DURATION:
+                extend(courier, pickup_time, cost, load + delivery.capacity, served | {delivery_id},
+                       bag | {delivery_id}, delivery.pickup_loc, delivery_id)
+
+    for courier in instance.couriers:
+        extend(courier, 0, 0, 0, frozenset(), frozenset(), courier.location, None)
+    return best
+
+
+def check_pool(instance, n_neighbours):
+    pool = enumerate_routes(instance, n_neighbours)
+    for route, cost in pool:
+        assert get_route_cost(route, instance) == cost
+    pool_costs = {(route.rider_id, frozenset(route.stops)): cost for route, cost in pool}
+    assert pool_costs == exhaustive_routes(instance, DeliveryNeighbourhood(instance, n_neighbours))
+
+
+def test_enumerate_routes_exact():
+    check_pool(load_instance(INSTANCE), None)
+
+
+def test_enumerate_routes_neighbourhood():
+    # with two neighbours, partial routes at the same location may continue with different deliveries
+    # depending on their last pickup
+    instance = load_instance(INSTANCE)
+    for n_neighbours in (1, 2, 3):
+        check_pool(instance, n_neighbours)
@@ -0,0 +1,36 @@
+import random
+
+from feasibility_checker import load_instance, get_route_cost, is_feasible
+from route_evaluator import RouteInsertionEvaluator
+from testing import INSTANCE, random_route
+
+
+def test_route_cost_and_feasibility():
+    instance = load_instance(INSTANCE)
+    rng = random.Random(0)
+    for _ in range(300):
+        route = random_route(instance, rng, all_dropped=True)
+        evaluator = RouteInsertionEvaluator(instance, route)
+        assert evaluator.cost == get_route_cost(route, instance)
+        assert evaluator.feasible == is_feasible(route, instance)
+
+
+def test_insertions():
+    instance = load_instance(INSTANCE)
+    rng = random.Random(1)
+    for _ in range(100):
+        route = random_route(instance, rng, all_dropped=True)
+        evaluator = RouteInsertionEvaluator(instance, route)
+        delivery_id = rng.choice([delivery.delivery_id for delivery in instance.deliveries
+                                  if delivery.delivery_id not in route.stops])
+        best = None
+        n = len(route.stops)
+        for i in range(n + 1):
+            for j in range(i, n + 1):
+                cost_delta, feasible = evaluator.insertion_delta(delivery_id, i, j)
+                inserted = evaluator.insert(delivery_id, i, j)
+                assert cost_delta == get_route_cost(inserted, instance) - evaluator.cost
+                assert feasible == is_feasible(inserted, instance)
+                if feasible and (best is None or cost_delta < best[0]):
+                    best = (cost_delta, i, j)
+        assert evaluator.best_insertion(delivery_id) == best
@@ -0,0 +1,115 @@
+import random
+
+from feasibility_checker import Route, load_instance
+from alns import Alns
+from solution_state import SolutionState, relocate_descent, relocate_move, route_exchange_move, swap_move, \
+    two_opt_star_move
+from testing import checker_result, instance_path
+
+INSTANCE = instance_path('6d75e3a3-94b6-4672-8d1e-9ac93e98cd82')
+
+
+def check_state(state):
+    assert (state.total_cost, state.is_feasible()) == checker_result(state.instance, state.routes())
+
+
+def random_move(state, rng):
+    couriers = sorted(state.stops)
+    first, second = rng.sample(couriers, 2)
+    kind = rng.randrange(4)
+    if kind == 0:
+        delivery_id = rng.choice(sorted(state.courier_of))
+        from_courier = state.courier_of[delivery_id]
+        n = len(state.stops[second]) - (2 if second == from_courier else 0)
+        i = rng.randint(0, n)
+        return relocate_move(state, delivery_id, from_courier, second, i, rng.randint(i, n))
+    if kind == 1:
+        first_id, second_id = rng.sample(sorted(state.courier_of), 2)
+        return swap_move(state, first_id, state.courier_of[first_id], second_id, state.courier_of[second_id])
+    if kind == 2:
+        return two_opt_star_move(state, first, rng.randint(0, len(state.stops[first])), second,
+                                 rng.randint(0, len(state.stops[second])))
+    return route_exchange_move(state, first, second)
+
+
+def test_moves_and_undo():
+    instance = load_instance(INSTANCE)
+    routes = Alns(instance, seed=0).solve(60, max_iterations=100).routes()
+    state = SolutionState(instance, routes)
+    check_state(state)
+    assert state.is_feasible()
+
+    rng = random.Random(0)
+    for _ in range(500):
+        before = ({courier_id: list(stops) for courier_id, stops in state.stops.items()}, state.total_cost,
+                  state.is_feasible())
+        delta = state.apply(random_move(state, rng))
+        assert delta == state.total_cost - before[1]
+        check_state(state)
+        if rng.random() < 0.5:
+            state.undo()
+            assert (state.stops, state.total_cost, state.is_feasible()) == before
+        else:
+            state.commit()
+        assert not state.history
+
+
+def test_missing_courier():
+    instance = load_instance(INSTANCE)
+    routes = Alns(instance, seed=0).solve(60, max_iterations=10).routes()
+    state = SolutionState(instance, routes[1:])
+    check_state(state)
+    assert not state.is_feasible()
+
+    state.apply({routes[0].rider_id: list(routes[0].stops)})
+    check_state(state)
+    assert state.is_feasible()
+    state.undo()
+    assert not state.is_feasible()
+
+
+def test_duplicate_courier():
+    # a second route of a courier is reported as infeasible, like the checker does
+    instance = load_instance(INSTANCE)
+    routes = Alns(instance, seed=0).solve(60, max_iterations=10).routes()
+    for duplicate in (Route(routes[0].rider_id, []), Route(routes[0].rider_id, routes[1].stops)):
+        state = SolutionState(instance, routes + [duplicate])
+        check_state(state)
+        assert not state.is_feasible()
+        assert len(state.routes()) == len(routes) + 1
+
+
+def test_relocate_descent():
+    instance = load_instance(INSTANCE)
+    state = SolutionState(instance, Alns(instance, seed=0).solve(60, max_iterations=10).routes())
+    cost = state.total_cost
+    relocate_descent(state, random.Random(0), 2000)
+    check_state(state)
+    assert state.is_feasible() and state.total_cost <= cost
+    assert not state.history
+
+
+def test_relocate_descent_screening():
+    # screening the moves keeps exactly the moves that applying every move and undoing the bad ones keeps
+    instance = load_instance(INSTANCE)
+    routes = Alns(instance, seed=0).solve(60, max_iterations=10).routes()
+    state = SolutionState(instance, routes)
+    relocate_descent(state, random.Random(1), 2000)
+
+    reference = SolutionState(instance, routes)
+    rng = random.Random(1)
+    deliveries = sorted(reference.delivery_count)
+    couriers = sorted(reference.stops)
+    for _ in range(2000):
+        delivery_id = rng.choice(deliveries)
+        from_courier = reference.courier_of[delivery_id]
+        to_courier = rng.choice(couriers)
+        n = len(reference.stops[to_courier]) - (2 if to_courier == from_courier else 0)
+        i = rng.randint(0, n)
+        delta = reference.apply(relocate_move(reference, delivery_id, from_courier, to_courier, i,
+                                              rng.randint(i, n)))
+        if delta >= 0 or not reference.is_feasible():
+            reference.undo()
+        reference.commit()
+    assert state.stops == reference.stops and state.total_cost == reference.total_cost
+
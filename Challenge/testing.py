@@ -0,0 +1,36 @@
+import os
+
+from feasibility_checker import Route, check_all_activities_covered, check_all_couriers_covered, get_route_cost, \
+    is_feasible
+
+# Shared helpers of the test modules
+TRAINING_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_data')
+
+
+# Function to get the folder of a bundled training instance
+def instance_path(name):
+    return os.path.join(TRAINING_DATA, name)
+
+
+# The small instance most tests run on, 9 couriers and 8 deliveries
+INSTANCE = instance_path('13346e71-0380-4feb-945a-2688f3dbd41b')
+
+
+# Function to draw a route of a random courier visiting up to five random deliveries in random order, so that
+# routes with broken capacities or durations are drawn too. Unless all_dropped is set, a delivery is visited
+# once or twice, so that some deliveries are never dropped off. At least one delivery stays out of the route.
+def random_route(instance, rng, all_dropped=False):
+    deliveries = rng.sample(instance.deliveries, rng.randint(0, min(5, len(instance.deliveries) - 1)))
+    stops = [delivery.delivery_id for delivery in deliveries
+             for _ in range(2 if all_dropped else rng.choice((1, 2, 2, 2)))]
+    rng.shuffle(stops)
+    return Route(rng.choice(instance.couriers).courier_id, stops)
+
+
+# Function to score routes with the feasibility checker: the total cost, and whether every route is feasible
+# and the routes cover every courier and every delivery
+def checker_result(instance, routes):
+    feasible = all([is_feasible(route, instance) for route in routes]) and \
+        check_all_couriers_covered(routes, instance.couriers) and \
+        check_all_activities_covered(routes, instance.couriers, instance.deliveries)
+    return sum(get_route_cost(route, instance) for route in routes), feasible
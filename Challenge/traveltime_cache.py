@@ -0,0 +1,151 @@
+import os
+import csv
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+# The travel time grid is cached next to the CSV as a .npy file holding the
+# full CSV grid: row 0 contains the location labels, column 0 the row labels
+# and the 'Locations' header cell is stored as 0. A small JSON sidecar records
+# the signature of the CSV the cache was built from.
+CACHE_SUFFIX = '.npy'
+META_SUFFIX = '.npy.json'
+
+
+def get_cache_paths(csv_path):
+    base = os.path.splitext(csv_path)[0]
+    return base + CACHE_SUFFIX, base + META_SUFFIX
+
+
+# Function to hash the CSV contents, used when the mtime changed but the file may not have
+def hash_file(filepath):
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(meta_path, meta):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, meta_path)
+
+
+# Function to parse traveltimes.csv into a packed int32 grid (header row and column included)
+def parse_travel_time_csv(csv_path):
+    with open(csv_path, 'r') as file:
+        header = next(csv.reader(file))
+        body = np.loadtxt(file, delimiter=',', dtype=np.int32, ndmin=2)
+    grid = np.empty((body.shape[0] + 1, len(header)), dtype=np.int32)
+    grid[0, 0] = 0
+    grid[0, 1:] = [int(val) for val in header[1:]]
+    grid[1:, :] = body
+    return grid
+
+
+# Function to (re)build the binary cache of a traveltimes.csv file
+def convert_travel_time_csv(csv_path, meta=None):
+    cache_path, meta_path = get_cache_paths(csv_path)
+    stat = os.stat(csv_path)
+    grid = parse_travel_time_csv(csv_path)
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        np.save(file, grid)
+    os.replace(tmp_path, cache_path)
+
+    if meta is None or meta.get('sha1') is None:
+        meta = {'sha1': hash_file(csv_path)}
+    write_meta(meta_path, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                           'sha1': meta['sha1']})
+    return grid
+
+
+# Function to check whether the cache still matches the CSV, refreshing the recorded mtime
+# when only the timestamp changed
+def is_cache_valid(csv_path):
+    cache_path, meta_path = get_cache_paths(csv_path)
+    meta = read_meta(meta_path)
+    if meta is None or not os.path.exists(cache_path):
+        return False, None
+
+    stat = os.stat(csv_path)
+    if meta.get('size') != stat.st_size:
+        return False, None
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True, meta
+
+    sha1 = hash_file(csv_path)
+    if meta.get('sha1') != sha1:
+        return False, {'sha1': sha1}
+
+    meta['mtime_ns'] = stat.st_mtime_ns
+    try:
+        write_meta(meta_path, meta)
+    except OSError:
+        pass
+    return True, meta
+
+
+# Function to memory-map a cache file. The mapping is returned as a plain ndarray view, since
+# indexing an np.memmap goes through its Python-level __getitem__ on every lookup.
+def map_cache(cache_path):
+    return np.asarray(np.load(cache_path, mmap_mode='r'))
+
+
+# Function to load the full travel time grid of a traveltimes.csv file, memory-mapping the
+# binary cache when it is up to date and rebuilding it otherwise
+def load_travel_time_grid(csv_path):
+    cache_path, _ = get_cache_paths(csv_path)
+    valid, meta = is_cache_valid(csv_path)
+    if valid:
+        return map_cache(cache_path)
+
+    try:
+        convert_travel_time_csv(csv_path, meta)
+    except OSError:
+        # read-only instance folder: fall back to an in-memory grid
+        return parse_travel_time_csv(csv_path)
+    return map_cache(cache_path)
+
+
+# Main function to convert the traveltimes.csv files of all instance folders
+def convert_all_instances(parent_folder):
+    for instance_folder in sorted(os.listdir(parent_folder)):
+        csv_path = os.path.join(parent_folder, instance_folder, 'traveltimes.csv')
+        if not os.path.isfile(csv_path):
+            continue
+        valid, meta = is_cache_valid(csv_path)
+        if valid:
+            print(f"Up to date: {instance_folder}")
+        else:
+            grid = convert_travel_time_csv(csv_path, meta)
+            print(f"Converted: {instance_folder} ({grid.shape[0] - 1} locations)")
+
+
+# Entry point of the script
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the traveltimes.csv files of all instance folders into memory-mappable .npy caches.")
+    parser.add_argument('parent_folder', type=str, help='Path to the parent folder containing all instance folders')
+
+    args = parser.parse_args()
+
+    convert_all_instances(args.parent_folder)
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import importlib
+
+
+# Define the LazyTravelTimeRow class, one row of a LazyTravelTimes matrix
+class LazyTravelTimeRow:
+    __slots__ = ('travel_times', 'from_location')
+
+    def __init__(self, travel_times, from_location):
+        self.travel_times = travel_times
+        self.from_location = from_location
+
+    def __getitem__(self, index):
+        return self.travel_times.get(self.from_location, self.travel_times.index_to_location(index))
+
+
+# Define the LazyTravelTimes class, standing in for the dense travel time matrix of an instance
+# without traveltimes.csv. Entries are requested from an oracle the first time they are used and
+# memoised afterwards, so only the pairs of locations a solver actually touches are ever stored.
+# Indexing works like the list-of-lists matrix: with first_index=0 (feasibility_checker) entry
+# [i][j] is the time from location i + 1 to location j + 1, with first_index=1 (read_data) it is
+# the time from location i to location j.
+class LazyTravelTimes:
+    def __init__(self, oracle, first_index=0):
+        self.oracle = oracle  # callable (from_location, to_location) -> minutes, 1-based locations
+        self.first_index = first_index
+        self.cache = {}
+        self.rows = {}
+
+    def index_to_location(self, index):
+        return index - self.first_index + 1
+
+    def get(self, from_location, to_location):
+        key = (from_location, to_location)
+        travel_time = self.cache.get(key)
+        if travel_time is None:
+            travel_time = int(self.oracle(from_location, to_location))
+            self.cache[key] = travel_time
+        return travel_time
+
+    # Function to get a travel time without memoising it, for scans over many pairs that are mostly
+    # not needed again
+    def peek(self, from_location, to_location):
+        travel_time = self.cache.get((from_location, to_location))
+        if travel_time is None:
+            travel_time = int(self.oracle(from_location, to_location))
+        return travel_time
+
+    def __getitem__(self, index):
+        row = self.rows.get(index)
+        if row is None:
+            row = LazyTravelTimeRow(self, self.index_to_location(index))
+            self.rows[index] = row
+        return row
+
+    def __repr__(self):
+        return f"LazyTravelTimes(Cached Pairs={len(self.cache)})"
+
+
+# Function to resolve an oracle factory given as 'module:function'. The factory is called with
+# the instance folder path and returns the oracle for that instance.
+def load_oracle_factory(spec):
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise ValueError(f"Travel time oracle must be given as 'module:function', got: {spec}")
+    return getattr(importlib.import_module(module_name), function_name)
@@ -1,32 +1,75 @@
-from typing import List
+from typing import List, Optional, Union
 from pyscipopt import Model, SCIP_PARAMSETTING
 
 from branching_eventhdlr import RyanFosterBranchingEventhdlr
+from column_registry import ColumnRegistry
+from pair_selection import PairSelection, make_pair_selection
 from pricer import KnapsackPricer
 from ryan_foster import RyanFoster
+from stabilization import WentgesSmoothing
+from warm_start import warm_start_packings
 
 
-def extended_binpacking(sizes: List[int], capacity: int):
+def extended_binpacking(sizes: List[int], capacity: int, pricing_method: str = "dp", max_columns_per_round: int = 5,
+                        column_age_limit: Optional[int] = None,
+                        smoothing_alpha: Union[float, WentgesSmoothing, None] = None,
+                        adaptive_smoothing: bool = True, early_termination: bool = False,
+                        heuristic_pricing: bool = True, warm_start_restarts: Optional[int] = 5,
+                        pair_selection: Union[str, PairSelection] = "first"):
     model = Model("Extended Binpacking")
 
     model.setPresolve(SCIP_PARAMSETTING.OFF)
     model.setSeparating(SCIP_PARAMSETTING.OFF)
     model.setParam("display/freq", 1) # show the output log after each node
+    # every bin costs 1, also in the priced columns, so SCIP may round the node bounds up
+    model.setObjIntegral()
+
+    column_registry = ColumnRegistry()
 
     x = {}
     # create one item per bin variables
     for i in range(len(sizes)):
         x[i] = model.addVar(vtype="B", name=f"{[i]}", obj=1)
+        column_registry.add(x[i], [i])
 
     # add constraints that ensure that each item is packed into exactly one bin
     constraints = {}
     for i in range(len(sizes)):
         constraints[i] = model.addCons(x[i] >= 1, modifiable=True)
 
-    branching_rule = RyanFoster()
-    eventhdlr = RyanFosterBranchingEventhdlr(branching_rule.branching_decisions)
+    # the bins of first-fit and best-fit decreasing packings and of randomized best-fit restarts as initial
+    # columns, the packing with the fewest bins as the incumbent (None keeps the singleton columns only)
+    if warm_start_restarts is not None:
+        columns, incumbent = warm_start_packings(sizes, capacity, warm_start_restarts)
+        column_vars = {(i,): x[i] for i in range(len(sizes))}
+        for items in columns:
+            if tuple(items) in column_vars:
+                continue
+            var = model.addVar(vtype="B", name=f"{items}", obj=1)
+            column_registry.add(var, items)
+            for i in items:
+                model.addConsCoeff(constraints[i], var, 1)
+            column_vars[tuple(items)] = var
+
+        solution = model.createSol()
+        for items in incumbent:
+            model.setSolVal(solution, column_vars[tuple(items)], 1)
+        model.addSol(solution)
+
+    # dual stabilization of the pricing problem, None prices with the LP duals. A WentgesSmoothing is used as it is,
+    # so that its stats can be read after solving
+    stabilization = None
+    if isinstance(smoothing_alpha, WentgesSmoothing):
+        stabilization = smoothing_alpha
+    elif smoothing_alpha is not None:
+        stabilization = WentgesSmoothing(smoothing_alpha, adaptive_smoothing)
+
+    branching_rule = RyanFoster(column_registry, make_pair_selection(pair_selection, sizes, column_registry))
+    eventhdlr = RyanFosterBranchingEventhdlr(branching_rule.branching_decisions, column_registry)
     pricer = KnapsackPricer(sizes, capacity, constraints,
-                            branching_rule.branching_decisions)
+                            branching_rule.branching_decisions, column_registry, pricing_method,
+                            max_columns_per_round, column_age_limit, stabilization, early_termination,
+                            heuristic_pricing)
 
     model.includeEventhdlr(eventhdlr, "Ryan Foster Branching Event Handler", "")
     model.includePricer(pricer, "KnapsackPricer",
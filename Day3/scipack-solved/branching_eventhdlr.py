@@ -1,27 +1,70 @@
 import pyscipopt as scip
 
 class RyanFosterBranchingEventhdlr(scip.Eventhdlr):
-    def __init__(self, branching_decisions):
+    def __init__(self, branching_decisions, column_registry, incremental=True):
+        """
+        With incremental=False every branching decision of the focused node is applied to every column.
+        With incremental=True the node relies on the fixings it inherits from its parent: only the decisions
+        added at the node are applied to every column (through the item index of the column registry), and
+        all decisions of the node to the columns priced since its parent was focused, which may have been
+        priced elsewhere in the tree.
+        The decisions and watermarks of the nodes SCIP deletes are evicted.
+        """
         self.branching_decisions = branching_decisions
+        self.column_registry = column_registry
+        self.incremental = incremental
+        self.watermarks = {}  # node number -> column watermark at the time the node was focused
 
     def eventinit(self):
+        # the columns created before solving are registered with their original variables
+        self.column_registry.transform(self.model)
         self.model.catchEvent(scip.SCIP_EVENTTYPE.NODEFOCUSED, self)
+        self.model.catchEvent(scip.SCIP_EVENTTYPE.NODEDELETE, self)
 
     def eventexec(self, event):
-        apart = self.branching_decisions[self.model.getCurrentNode().getNumber()]["apart"]
-        together = self.branching_decisions[self.model.getCurrentNode().getNumber()]["together"]
-        
-        
-        for var in self.model.getVars(transformed=True):
-            pattern = set(eval(var.name.replace("t_", "")))
-            
-            for pair in apart:
-                intersection = pattern.intersection(set(pair))
-                if len(intersection) == 2:
-                    self.model.chgVarUb(var, 0)
-            
-            for pair in together:
-                intersection = pattern.intersection(set(pair))
-                if len(intersection) == 1:
-                    self.model.chgVarUb(var, 0)
-                    
+        if event.getType() == scip.SCIP_EVENTTYPE.NODEDELETE:
+            # the root is kept, SCIP deletes a presolving root under the same number before solving starts
+            if event.getNode().getDepth() > 0:
+                number = event.getNode().getNumber()
+                self.branching_decisions.evict(number)
+                self.watermarks.pop(number, None)
+            return
+
+        node = self.model.getCurrentNode()
+        decisions = self.branching_decisions[node.getNumber()]
+        apart = decisions["apart"]
+        together = decisions["together"]
+
+        parent = node.getParent()
+        if not self.incremental or parent is None or parent.getNumber() not in self.watermarks:
+            self.fix_columns(apart, together)
+        else:
+            self.fix_columns(decisions.own("apart"), decisions.own("together"))
+            self.fix_new_columns(apart, together, self.watermarks[parent.getNumber()])
+
+        self.watermarks[node.getNumber()] = self.column_registry.watermark()
+
+    def fix_columns(self, apart, together):
+        """
+        Fix every column violating one of the decisions to zero
+        """
+
+        for i, j in apart:
+            for column in self.column_registry.columns_with_both(i, j):
+                self.model.chgVarUb(column.var, 0)
+
+        for i, j in together:
+            for column in self.column_registry.columns_with_one(i, j):
+                self.model.chgVarUb(column.var, 0)
+
+    def fix_new_columns(self, apart, together, watermark):
+        """
+        Fix the columns added after the watermark that violate one of the decisions to zero
+        """
+
+        apart_masks = [1 << i | 1 << j for i, j in apart]
+        together_masks = [1 << i | 1 << j for i, j in together]
+        for column in self.column_registry.columns_since(watermark):
+            if any(column.mask & pair_mask == pair_mask for pair_mask in apart_masks) or \
+                    any(column.mask & pair_mask not in (0, pair_mask) for pair_mask in together_masks):
+                self.model.chgVarUb(column.var, 0)
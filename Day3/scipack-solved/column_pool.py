@@ -0,0 +1,59 @@
+from typing import Iterable, List
+
+
+class ColumnPool:
+    def __init__(self, max_size: int = 10000):
+        """
+        Columns that are not in the master problem: the surplus of pricing rounds and the columns aged out of
+        the LP. They are checked against the duals before the pricing problem is solved, which only needs a
+        sum of duals per column.
+        """
+        self.max_size = max_size
+        self.patterns: dict[tuple[int, ...], None] = {}  # insertion ordered, the oldest columns are dropped first
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __contains__(self, pattern: Iterable[int]) -> bool:
+        return tuple(pattern) in self.patterns
+
+    def add(self, pattern: Iterable[int]):
+        pattern = tuple(pattern)
+        self.patterns.pop(pattern, None)
+        self.patterns[pattern] = None
+        if len(self.patterns) > self.max_size:
+            del self.patterns[next(iter(self.patterns))]
+
+    def discard(self, pattern: Iterable[int]):
+        self.patterns.pop(tuple(pattern), None)
+
+    def negative_columns(self, dual_solution: dict[float], together: set[tuple[int, int]],
+                         apart: set[tuple[int, int]], cost: float, max_columns: int,
+                         eps: float = 1e-6) -> List[tuple[float, List[int]]]:
+        """
+        Find the pooled columns with a negative reduced cost that respect the branching decisions
+
+        Parameters:
+        dual_solution: dict[float] - the dual solution of the linear relaxation
+        together: set[tuple[int]] - the pairs of items that must be together
+        apart: set[tuple[int]] - the pairs of items that must be apart
+        cost: float - the objective coefficient of a column (0 in Farkas pricing)
+        max_columns: int - the maximum number of columns returned
+        eps: float - the tolerance below zero a reduced cost has to reach
+
+        Returns:
+        List[tuple[float, List[int]]] - the (reduced cost, packing) pairs with the most negative reduced cost
+        """
+
+        columns = []
+        for pattern in self.patterns:
+            red_cost = cost - sum(dual_solution[item] for item in pattern)
+            if red_cost >= -eps:
+                continue
+            items = set(pattern)
+            if any(i in items and j in items for i, j in apart) or \
+                    any((i in items) != (j in items) for i, j in together):
+                continue
+            columns.append((red_cost, list(pattern)))
+        columns.sort(key=lambda column: column[0])
+        return columns[:max_columns]
@@ -0,0 +1,115 @@
+from typing import Iterable, List, NamedTuple
+
+from pyscipopt import Model, Variable
+
+
+class Column(NamedTuple):
+    """
+    A column of the master problem: its variable, the sorted items it covers and the same items as a bitset
+    """
+    var: Variable
+    items: tuple[int, ...]
+    mask: int
+
+
+class ColumnRegistry:
+    def __init__(self):
+        """
+        Columns are stored by the pointer of their variable, and an inverted index maps every item to the
+        pointers of the columns covering it, so that the branching rule and the event handler find the
+        columns affected by a pair of items with set operations instead of decoding variable names.
+        """
+        self.columns: dict[int, Column] = {}
+        self.item_columns: dict[int, set[int]] = {}
+        # the pointers in the order the columns were added, so that the columns added since a given point
+        # can be found without scanning the whole registry
+        self.order: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def add(self, var: Variable, items: Iterable[int]) -> Column:
+        """
+        Register the variable of a column with the items it covers
+
+        Parameters:
+        var: Variable - the variable of the column
+        items: Iterable[int] - the items covered by the column
+
+        Returns:
+        Column - the registered column
+        """
+
+        items = tuple(sorted(set(items)))
+        mask = 0
+        for item in items:
+            mask |= 1 << item
+        column = Column(var, items, mask)
+
+        ptr = var.ptr()
+        self.columns[ptr] = column
+        self.order.append(ptr)
+        for item in items:
+            self.item_columns.setdefault(item, set()).add(ptr)
+        return column
+
+    def remove(self, var: Variable):
+        """
+        Remove the column of a variable, if it is registered
+        """
+
+        column = self.columns.pop(var.ptr(), None)
+        if column is not None:
+            for item in column.items:
+                self.item_columns[item].discard(var.ptr())
+
+    def transform(self, model: Model):
+        """
+        Re-register the columns created before the problem was transformed under their transformed variables,
+        which are the ones SCIP hands out while solving
+        """
+
+        for column in list(self.columns.values()):
+            if column.var.isOriginal():
+                self.remove(column.var)
+                self.add(model.getTransformedVar(column.var), column.items)
+
+    def watermark(self) -> int:
+        """
+        The current position in the order of the columns, for columns_since
+        """
+
+        return len(self.order)
+
+    def columns_since(self, watermark: int) -> List[Column]:
+        """
+        The registered columns added after the given watermark
+        """
+
+        return [self.columns[ptr] for ptr in self.order[watermark:] if ptr in self.columns]
+
+    def get(self, var: Variable) -> Column:
+        return self.columns[var.ptr()]
+
+    def items(self, var: Variable) -> List[int]:
+        """
+        The items covered by the column of a variable
+        """
+
+        return list(self.columns[var.ptr()].items)
+
+    def columns_with_both(self, i: int, j: int) -> List[Column]:
+        """
+        The columns covering both items, which a decision to keep them apart forbids
+        """
+
+        ptrs = self.item_columns.get(i, set()) & self.item_columns.get(j, set())
+        return [self.columns[ptr] for ptr in ptrs]
+
+    def columns_with_one(self, i: int, j: int) -> List[Column]:
+        """
+        The columns covering exactly one of the items, which a decision to keep them together forbids
+        """
+
+        ptrs = self.item_columns.get(i, set()) ^ self.item_columns.get(j, set())
+        return [self.columns[ptr] for ptr in ptrs]
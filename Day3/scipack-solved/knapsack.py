@@ -4,7 +4,7 @@ from pyscipopt import Model
 
 
 def pricing_solver(sizes: List[int], capacity: int, dual_solution: dict[float], together: set[tuple[int, int]],
-                   apart: set[tuple[int, int]]) -> tuple[float, List[int]]:
+                   apart: set[tuple[int, int]], method: str = "dp") -> tuple[float, List[int]]:
     """
     Solve the pricing problem for the knapsack problem (with branching constraints)
 
@@ -14,22 +14,70 @@ def pricing_solver(sizes: List[int], capacity: int, dual_solution: dict[float],
     dual_solution: dict[float] - the dual solution of the linear relaxation
     together: set[tuple[int]] - the pairs of items that must be together
     apart: set[tuple[int]] - the pairs of items that must be apart
+    method: str - "dp" to solve in process (dynamic programming, branch-and-bound with branching constraints),
+    "scip" to solve a SCIP model
 
     Returns:
     tuple[float, List[int]] - the minimum reduced cost and the packing of the items
     """
 
     profits = [dual_solution[i] for i in range(len(sizes))]
-    if len(together) > 0 or len(apart) > 0:
-        result = solve_knapsack_with_constraints(sizes, profits, capacity, together, apart)
+    if method == "dp":
+        if len(together) > 0 or len(apart) > 0:
+            result = solve_knapsack_bnb(sizes, profits, capacity, together, apart)
+        else:
+            result = solve_knapsack_dp(sizes, profits, capacity)
+    elif method == "scip":
+        if len(together) > 0 or len(apart) > 0:
+            result = solve_knapsack_with_constraints(sizes, profits, capacity, together, apart)
+        else:
+            result = solve_knapsack(sizes, profits, capacity)
     else:
-        result = solve_knapsack(sizes, profits, capacity)
+        raise ValueError(f"Unknown pricing method: {method}")
 
     min_red_cost = 1 - result[0]
 
     return min_red_cost, result[1]
 
 
+def pricing_solver_multiple(sizes: List[int], capacity: int, dual_solution: dict[float], together: set[tuple[int, int]],
+                            apart: set[tuple[int, int]], max_columns: int, method: str = "dp"
+                            ) -> List[tuple[float, List[int]]]:
+    """
+    Solve the pricing problem for several columns: the optimal packing and, for each of its items in turn, the
+    optimal packing without that item
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    capacity: int - the capacity of the knapsack
+    dual_solution: dict[float] - the dual solution of the linear relaxation
+    together: set[tuple[int]] - the pairs of items that must be together
+    apart: set[tuple[int]] - the pairs of items that must be apart
+    max_columns: int - the maximum number of packings returned
+    method: str - the pricing method, see pricing_solver
+
+    Returns:
+    List[tuple[float, List[int]]] - distinct (reduced cost, packing) pairs sorted by reduced cost, the first being
+    the minimum reduced cost packing
+    """
+
+    min_red_cost, packing = pricing_solver(sizes, capacity, dual_solution, together, apart, method)
+    columns = {tuple(packing): min_red_cost}
+
+    # a value below minus the total positive value keeps an item out of every packing
+    excluded_value = -1 - sum(value for value in dual_solution.values() if value > 0)
+    for item in packing:
+        if len(columns) >= max_columns:
+            break
+        values = dict(dual_solution)
+        values[item] = excluded_value
+        red_cost, other_packing = pricing_solver(sizes, capacity, values, together, apart, method)
+        if other_packing and tuple(other_packing) not in columns:
+            columns[tuple(other_packing)] = red_cost
+
+    return sorted(((red_cost, list(packing)) for packing, red_cost in columns.items()), key=lambda column: column[0])
+
+
 def solve_knapsack(sizes: List[int], values: List[float], capacity: int) -> tuple[float, List[int]]:
     """
     Solve the knapsack problem
@@ -96,4 +144,198 @@ def solve_knapsack_with_constraints(
     m.optimize()
 
     packing = [i for i in range(len(sizes)) if m.getVal(x[i]) > 0.5]
-    return m.getObjVal(), packing
\ No newline at end of file
+    return m.getObjVal(), packing
+
+
+def solve_knapsack_dp(sizes: List[int], values: List[float], capacity: int) -> tuple[float, List[int]]:
+    """
+    Solve the knapsack problem by dynamic programming over the integer capacity
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    values: List[float] - the values of the items
+    capacity: int - the capacity of the knapsack
+
+    Returns:
+    tuple[float, List[int]] - the optimal value and the packing of the items
+    """
+
+    # best[c] is the best value of the items seen so far within capacity c, taken[i][c] records whether
+    # item i is packed in it
+    best = [0.0] * (capacity + 1)
+    taken = []
+    for size, value in zip(sizes, values):
+        item_taken = bytearray(capacity + 1)
+        if value > 0:
+            for c in range(capacity, size - 1, -1):
+                if best[c - size] + value > best[c]:
+                    best[c] = best[c - size] + value
+                    item_taken[c] = 1
+        taken.append(item_taken)
+
+    packing = []
+    c = capacity
+    for i in range(len(sizes) - 1, -1, -1):
+        if taken[i][c]:
+            packing.append(i)
+            c -= sizes[i]
+    packing.reverse()
+    return best[capacity], packing
+
+
+def merge_items(
+        sizes: List[int], values: List[float], capacity: int, together: set[tuple[int, int]],
+        apart: set[tuple[int, int]]
+) -> tuple[List[tuple[int, List[int], int, float]], List[int]]:
+    """
+    Merge the items that must be together into one item and find the merged items in conflict because two of
+    their items must be apart. Only merged items that can be packed and are worth packing are kept.
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    values: List[float] - the values of the items
+    capacity: int - the capacity of the knapsack
+    together: set[tuple[int]] - the pairs of items that must be together
+    apart: set[tuple[int]] - the pairs of items that must be apart
+
+    Returns:
+    tuple[List[tuple[int, List[int], int, float]], List[int]] - the merged items as (root, items, size, value)
+    sorted by decreasing value per size, and for each of them the bitmask of the merged items it conflicts with
+    """
+
+    # merge the items that must be together (union-find)
+    parent = list(range(len(sizes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in together:
+        parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(sizes)):
+        groups.setdefault(find(i), []).append(i)
+
+    conflicting_roots = {}
+    for i, j in apart:
+        conflicting_roots.setdefault(find(i), set()).add(find(j))
+        conflicting_roots.setdefault(find(j), set()).add(find(i))
+
+    # only merged items that can be packed and are worth packing are kept
+    merged = []
+    for root, items in groups.items():
+        size = sum(sizes[i] for i in items)
+        value = sum(values[i] for i in items)
+        if value > 0 and size <= capacity and root not in conflicting_roots.get(root, ()):
+            merged.append((root, items, size, value))
+    merged.sort(key=lambda item: item[3] / item[2] if item[2] > 0 else float("inf"), reverse=True)
+
+    position = {root: k for k, (root, *_) in enumerate(merged)}
+    conflicts = []
+    for root, *_ in merged:
+        mask = 0
+        for other in conflicting_roots.get(root, ()):
+            if other in position:
+                mask |= 1 << position[other]
+        conflicts.append(mask)
+
+    return merged, conflicts
+
+
+def solve_knapsack_bnb(
+        sizes: List[int], values: List[float], capacity: int, together: set[tuple[int, int]],
+        apart: set[tuple[int, int]]
+) -> tuple[float, List[int]]:
+    """
+    Solve the knapsack problem with branching constraints by branch-and-bound. Items that must be together
+    are merged into one item, items that must be apart are in conflict, and the search is bounded by the
+    fractional knapsack relaxation that ignores the conflicts.
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    values: List[float] - the values of the items
+    capacity: int - the capacity of the knapsack
+    together: set[tuple[int]] - the pairs of items that must be together
+    apart: set[tuple[int]] - the pairs of items that must be apart
+
+    Returns:
+    tuple[float, List[int]] - the optimal value and the packing of the items
+    """
+
+    merged, conflicts = merge_items(sizes, values, capacity, together, apart)
+
+    merged_sizes = [item[2] for item in merged]
+    merged_values = [item[3] for item in merged]
+    n = len(merged)
+
+    def upper_bound(k, remaining, value):
+        for m in range(k, n):
+            if merged_sizes[m] <= remaining:
+                remaining -= merged_sizes[m]
+                value += merged_values[m]
+            else:
+                return value + merged_values[m] * remaining / merged_sizes[m]
+        return value
+
+    best_value = 0.0
+    best_packed = 0
+
+    def search(k, remaining, value, packed, forbidden):
+        nonlocal best_value, best_packed
+        if value > best_value:
+            best_value = value
+            best_packed = packed
+        if k == n or upper_bound(k, remaining, value) <= best_value:
+            return
+        if merged_sizes[k] <= remaining and not forbidden >> k & 1:
+            search(k + 1, remaining - merged_sizes[k], value + merged_values[k], packed | 1 << k,
+                   forbidden | conflicts[k])
+        search(k + 1, remaining, value, packed, forbidden)
+
+    search(0, capacity, 0.0, 0, 0)
+
+    packing = sorted(i for k in range(n) if best_packed >> k & 1 for i in merged[k][1])
+    return best_value, packing
+
+
+def solve_knapsack_greedy(
+        sizes: List[int], values: List[float], capacity: int, together: set[tuple[int, int]],
+        apart: set[tuple[int, int]], max_packings: int = 1
+) -> List[tuple[float, List[int]]]:
+    """
+    Pack the items greedily by decreasing value per size, respecting the branching constraints. Further packings
+    start with one of the next best items before filling up greedily.
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    values: List[float] - the values of the items
+    capacity: int - the capacity of the knapsack
+    together: set[tuple[int]] - the pairs of items that must be together
+    apart: set[tuple[int]] - the pairs of items that must be apart
+    max_packings: int - the maximum number of packings returned
+
+    Returns:
+    List[tuple[float, List[int]]] - distinct (value, packing) pairs sorted by decreasing value
+    """
+
+    merged, conflicts = merge_items(sizes, values, capacity, together, apart)
+
+    packings = {}
+    for first in range(min(max_packings, len(merged))):
+        remaining = capacity - merged[first][2]
+        value = merged[first][3]
+        packed = 1 << first
+        forbidden = conflicts[first]
+        for k in range(len(merged)):
+            if k != first and merged[k][2] <= remaining and not forbidden >> k & 1:
+                remaining -= merged[k][2]
+                value += merged[k][3]
+                packed |= 1 << k
+                forbidden |= conflicts[k]
+        packings.setdefault(packed, value)
+
+    return sorted(((value, sorted(i for k in range(len(merged)) if packed >> k & 1 for i in merged[k][1]))
+                   for packed, value in packings.items()), key=lambda packing: packing[0], reverse=True)
@@ -0,0 +1,125 @@
+import time
+from typing import List, Union
+
+from pyscipopt import Model
+
+from column_registry import Column, ColumnRegistry
+
+
+class PairSelection:
+    name = "first"
+
+    def __init__(self):
+        """
+        A strategy choosing the pair of items Ryan-Foster branches on among the fractional pairs, given with
+        the sum of the LP values of the columns covering both items. The base strategy takes the first pair.
+        stats counts the branchings and the time spent choosing, and records the number of nodes SCIP had solved
+        at the latest branching (model.getNNodes()), which follows the tree size of the strategy.
+        """
+        self.stats = {"branchings": 0, "nodes": 0, "time": 0.0}
+
+    def choose(self, model: Model, pair_values: dict[tuple[int, int], float]) -> tuple[int, int]:
+        """
+        Choose the pair to branch on, recording the statistics
+        """
+
+        start = time.perf_counter()
+        pair = self.select(model, pair_values)
+        self.stats["branchings"] += 1
+        if model is not None:
+            self.stats["nodes"] = model.getNNodes()
+        self.stats["time"] += time.perf_counter() - start
+        return pair
+
+    def select(self, model: Model, pair_values: dict[tuple[int, int], float]) -> tuple[int, int]:
+        return next(iter(pair_values))
+
+
+class MostFractional(PairSelection):
+    name = "most_fractional"
+
+    def select(self, model: Model, pair_values: dict[tuple[int, int], float]) -> tuple[int, int]:
+        return min(pair_values, key=lambda pair: abs(pair_values[pair] - 0.5))
+
+
+class LargestSizeSum(PairSelection):
+    name = "size_sum"
+
+    def __init__(self, sizes: List[int]):
+        """
+        Branch on the fractional pair with the largest total size, the pairs that are hardest to pack together,
+        preferring the more fractional pair on ties
+        """
+        super().__init__()
+        self.sizes = sizes
+
+    def select(self, model: Model, pair_values: dict[tuple[int, int], float]) -> tuple[int, int]:
+        return max(pair_values, key=lambda pair: (self.sizes[pair[0]] + self.sizes[pair[1]],
+                                                  -abs(pair_values[pair] - 0.5)))
+
+
+class StrongBranching(PairSelection):
+    name = "strong"
+
+    def __init__(self, column_registry: ColumnRegistry, candidates: int = 5, min_gain: float = 1e-6):
+        """
+        Evaluate the candidates most fractional pairs by solving the LP of both children in probing mode,
+        without pricing, and branch on the pair with the largest product of the objective gains. A child whose
+        LP is infeasible without pricing counts as a gain of a full bin.
+        """
+        super().__init__()
+        self.column_registry = column_registry
+        self.candidates = candidates
+        self.min_gain = min_gain
+        self.stats["probes"] = 0
+
+    def select(self, model: Model, pair_values: dict[tuple[int, int], float]) -> tuple[int, int]:
+        pairs = sorted(pair_values, key=lambda pair: abs(pair_values[pair] - 0.5))[:self.candidates]
+        if len(pairs) == 1:
+            return pairs[0]
+
+        lp_obj = model.getLPObjVal()
+        best_pair, best_score = pairs[0], -1.0
+        for i, j in pairs:
+            together_gain = self.probe(model, self.column_registry.columns_with_one(i, j), lp_obj)
+            apart_gain = self.probe(model, self.column_registry.columns_with_both(i, j), lp_obj)
+            score = max(together_gain, self.min_gain) * max(apart_gain, self.min_gain)
+            if score > best_score:
+                best_pair, best_score = (i, j), score
+        return best_pair
+
+    def probe(self, model: Model, columns: List[Column], lp_obj: float) -> float:
+        """
+        The objective gain of a child, in which the given columns are fixed to zero
+        """
+
+        self.stats["probes"] += 1
+        model.startProbing()
+        for column in columns:
+            if column.var.getUbLocal() > 0.5:
+                model.chgVarUbProbing(column.var, 0)
+        lperror, cutoff = model.solveProbingLP()
+        gain = 1.0 if lperror or cutoff else model.getLPObjVal() - lp_obj
+        model.endProbing()
+        return gain
+
+
+def make_pair_selection(name: Union[str, PairSelection], sizes: List[int],
+                        column_registry: ColumnRegistry) -> PairSelection:
+    """
+    Create a pair selection strategy by name: "first", "most_fractional", "size_sum" or "strong". A strategy
+    is used as it is, so that its stats can be read after solving.
+    """
+
+    if isinstance(name, PairSelection):
+        return name
+    elif name == PairSelection.name:
+        return PairSelection()
+    elif name == MostFractional.name:
+        return MostFractional()
+    elif name == LargestSizeSum.name:
+        return LargestSizeSum(sizes)
+    elif name == StrongBranching.name:
+        return StrongBranching(column_registry)
+    else:
+        raise ValueError(f"Unknown pair selection: {name}")
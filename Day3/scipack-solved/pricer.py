@@ -1,48 +1,167 @@
 import math
+
 from pyscipopt import Pricer, SCIP_RESULT
-from knapsack import pricing_solver
+from column_pool import ColumnPool
+from pricing_pipeline import EPS, PricingPipeline
+from stabilization import farley_bound
+
 
 class KnapsackPricer(Pricer):
-    def __init__(self, sizes, capacity, constraints, branching_decisions, *args, **kwargs):
+    def __init__(self, sizes, capacity, constraints, branching_decisions, column_registry, pricing_method="dp",
+                 max_columns_per_round=5, column_age_limit=None, stabilization=None, early_termination=False,
+                 heuristic_pricing=True, *args, **kwargs):
+        """
+        Every pricing round adds up to max_columns_per_round columns, found by the tiers of a PricingPipeline:
+        the pool of columns outside of the LP, a greedy heuristic (with heuristic_pricing) and the exact pricing
+        solver. Priced columns that are nonbasic with a SCIP column age (LP solves at value zero) above
+        column_age_limit are retired to the pool (None keeps every column). SCIP only deletes removable columns,
+        which cannot be created from Python, so a retired column is fixed to zero globally and comes back as a new
+        variable if the pool finds it again.
+
+        With a stabilization (see stabilization.WentgesSmoothing), the pricing problem is solved at smoothed duals
+        in Lagrangian pricing, and only the columns that are negative for the LP duals are added. The rounds in which
+        the pool or the heuristic finds columns update the smoothing as well, as rounds without a mispricing.
+
+        Every solved pricing problem gives a Farley bound on the node, which is reported to SCIP. Bins have unit
+        cost, so with early_termination pricing stops at a node once the rounded up bound reaches the rounded up
+        LP value, the remaining rounds could not change the integer bound.
+        """
         super().__init__(*args, **kwargs)
         self.sizes = sizes
         self.capacity = capacity
         self.constraints = constraints
         self.branching_decisions = branching_decisions
+        self.column_registry = column_registry
+        self.pricing_method = pricing_method
+        self.max_columns_per_round = max_columns_per_round
+        self.column_age_limit = column_age_limit
+        self.stabilization = stabilization
+        self.early_termination = early_termination
+        self.node = None
+        self.lower_bound = float("-inf")  # the best Farley bound of the current node
+        self.stopped_early = False
+        self.column_pool = ColumnPool()
+        self.pipeline = PricingPipeline(sizes, capacity, self.column_pool, pricing_method, max_columns_per_round,
+                                        heuristic_pricing)
+        self.priced_columns = set()  # pointers of the variables of the priced columns that are not retired
         self.i = 0
-    
+        self.early_stops = 0
+
     def price(self, farkas):
-        branching_decisions = self.branching_decisions[self.model.getCurrentNode().getNumber()]
-        
+        node = self.model.getCurrentNode().getNumber()
+        branching_decisions = self.branching_decisions[node]
+        if node != self.node:
+            self.node = node
+            self.lower_bound = float("-inf")
+            self.stopped_early = False
+        elif self.stopped_early and not farkas:
+            # SCIP calls the pricer again in the following separation rounds of the node, adding no columns ends
+            # them once the LP value stalls
+            return {
+                'result': SCIP_RESULT.SUCCESS,
+                'lowerbound': self.lower_bound,
+                'stopearly': True,
+            }
+
         if self.i % 10 == 0:
             print("--lp obj:", self.model.getLPObjVal())
-        
+
         dual_sol = {}
         for (cons_id, cons) in self.constraints.items():
             cons = self.model.getTransformedCons(cons)
             if farkas:
                 dual_sol[cons_id] = self.model.getDualfarkasLinear(cons)
             else:
-                dual_sol[cons_id] = self.model.getDualsolLinear(cons)   
-                
-        
-        min_red_cost, pattern = pricing_solver(self.sizes, self.capacity, dual_sol, branching_decisions["together"], branching_decisions["apart"])
+                dual_sol[cons_id] = self.model.getDualsolLinear(cons)
+
+        if not farkas and self.column_age_limit is not None:
+            self.age_columns()
 
-        if farkas:
-            min_red_cost -= 1 # in farkas' pricing the objective fn. coefficient is 0
+        # in farkas' pricing the objective fn. coefficient is 0
+        cost = 0 if farkas else 1
+        while True:
+            if farkas or self.stabilization is None:
+                pricing_sol = dual_sol
+            else:
+                pricing_sol = self.stabilization.separation_point(node, dual_sol)
+
+            # mispricings and the stability center are decided on the exact minimum reduced cost
+            smoothed = pricing_sol is not dual_sol
+            columns, exact = self.pipeline.price(pricing_sol, dual_sol, branching_decisions["together"],
+                                                 branching_decisions["apart"], cost, require_exact=smoothed)
+            if exact is None:
+                # a cheaper tier found columns at the LP duals, the smoothing goes on from there
+                if not farkas and self.stabilization is not None:
+                    self.stabilization.update_without_bound(dual_sol)
+                break
+
+            if not farkas:
+                # the pricing problem was solved exactly at nonnegative duals, smoothed or not
+                self.lower_bound = max(self.lower_bound, farley_bound(pricing_sol, exact[0]))
 
-        if min_red_cost < 0:
-            new_var = self.model.addVar(vtype="B", name=f"{pattern}", obj=1, pricedVar=True)
+            if farkas or self.stabilization is None:
+                break
+            # no negative column for the LP duals at smoothed duals is a mispricing, pricing is then repeated
+            # closer to the LP duals
+            mispriced = not columns and smoothed
+            self.stabilization.update(dual_sol, pricing_sol, exact[0], exact[1], self.model.getLPObjVal(), mispriced)
+            if not mispriced:
+                break
+
+        # the objective is integral, so the node is done once the bound reaches the LP value rounded up. The columns
+        # are kept in the pool instead of the LP, whose solution is then branched on. An integral LP solution cannot
+        # be branched on, pricing then goes on until the LP is optimal
+        if not farkas and self.early_termination and columns and self.lower_bound > float("-inf") and \
+                math.ceil(self.lower_bound - EPS) >= math.ceil(self.model.getLPObjVal() - EPS) and \
+                self.model.getNLPBranchCands() > 0:
+            for min_red_cost, pattern in columns:
+                self.column_pool.add(pattern)
+            self.stopped_early = True
+            self.early_stops += 1
+            return {
+                'result': SCIP_RESULT.SUCCESS,
+                'lowerbound': self.lower_bound,
+                'stopearly': True,
+            }
+
+        for min_red_cost, pattern in columns:
+            self.column_pool.discard(pattern)
+            new_var = self.model.addVar(vtype="B", name=f"{pattern}", obj=1, pricedVar=True, deletable=True)
+            self.column_registry.add(new_var, pattern)
+            self.priced_columns.add(new_var.ptr())
             for item in pattern:
                 item_constraint = self.constraints[item]
                 item_constraint = self.model.getTransformedCons(item_constraint)
                 self.model.addConsCoeff(item_constraint, new_var, 1)
-        
-        
-        return {
+
+        result = {
             'result': SCIP_RESULT.SUCCESS,
         }
-        
+        if not farkas and self.lower_bound > float("-inf"):
+            result['lowerbound'] = self.lower_bound
+        return result
+
+    def age_columns(self):
+        """
+        Age the priced columns with LP value zero and retire the ones above the age limit to the pool
+        """
+
+        best_sol = self.model.getBestSol() if self.model.getNSols() > 0 else None
+        for col in self.model.getLPColsData():
+            var = col.getVar()
+            ptr = var.ptr()
+            if ptr not in self.priced_columns:
+                continue
+            if col.getBasisStatus() == "basic" or col.getAge() <= self.column_age_limit:
+                continue
+            # the columns of the incumbent are kept
+            if best_sol is not None and self.model.getSolVal(best_sol, var) > 0.5:
+                continue
+            self.priced_columns.discard(ptr)
+            self.column_pool.add(self.column_registry.items(var))
+            self.column_registry.remove(var)
+            self.model.chgVarUbGlobal(var, 0)
+
     def pricerredcost(self):
         self.i += 1
         return self.price(farkas=False)
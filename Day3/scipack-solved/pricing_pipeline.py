@@ -0,0 +1,105 @@
+import time
+from typing import List, Optional
+
+from column_pool import ColumnPool
+from knapsack import pricing_solver_multiple, solve_knapsack_greedy
+
+# reduced costs above -EPS are treated as zero, the in-process pricers can return e.g. -2e-16 for a column the LP
+# already has, which would otherwise be added over and over
+EPS = 1e-6
+
+TIERS = ("pool", "heuristic", "exact")
+
+
+class PricingPipeline:
+    def __init__(self, sizes: List[int], capacity: int, column_pool: ColumnPool, pricing_method: str = "dp",
+                 max_columns: int = 5, heuristic: bool = True):
+        """
+        The pricing problem is solved in tiers of increasing cost: the pool of columns outside of the LP, a greedy
+        packing by decreasing dual value per size, and the exact pricing solver. The exact solver only runs when
+        the cheaper tiers find no column with a negative reduced cost, or when the minimum reduced cost is
+        required. For every tier, stats counts the calls, the calls that found columns (hits), the columns found
+        and the time spent.
+        """
+        self.sizes = sizes
+        self.capacity = capacity
+        self.column_pool = column_pool
+        self.pricing_method = pricing_method
+        self.max_columns = max_columns
+        self.heuristic = heuristic
+
+        self.stats = {tier: {"calls": 0, "hits": 0, "columns": 0, "time": 0.0} for tier in TIERS}
+
+    def hit_rates(self) -> dict[str, float]:
+        """
+        The fraction of the calls of each tier that found columns
+        """
+
+        return {tier: stats["hits"] / stats["calls"] if stats["calls"] else 0.0 for tier, stats in self.stats.items()}
+
+    def price(self, pricing_sol: dict[float], dual_sol: dict[float], together: set[tuple[int, int]],
+              apart: set[tuple[int, int]], cost: float, require_exact: bool = False
+              ) -> tuple[List[tuple[float, List[int]]], Optional[tuple[float, List[int]]]]:
+        """
+        Find columns with a negative reduced cost for the LP duals
+
+        Parameters:
+        pricing_sol: dict[float] - the duals the pricing problem is solved with, smoothed or the LP duals
+        dual_sol: dict[float] - the duals of the LP
+        together: set[tuple[int]] - the pairs of items that must be together
+        apart: set[tuple[int]] - the pairs of items that must be apart
+        cost: float - the objective coefficient of a column (0 in Farkas pricing)
+        require_exact: bool - whether the exact solver runs in any case
+
+        Returns:
+        tuple[List[tuple[float, List[int]]], Optional[tuple[float, List[int]]]] - up to max_columns (reduced cost,
+        packing) pairs sorted by reduced cost, and the minimum reduced cost packing at pricing_sol if the exact
+        solver ran
+        """
+
+        if not require_exact:
+            # the pool is only checked at the LP duals, pooled columns at smoothed duals would undo the smoothing
+            start = time.perf_counter()
+            columns = []
+            if pricing_sol is dual_sol:
+                columns = self.column_pool.negative_columns(dual_sol, together, apart, cost, self.max_columns, EPS)
+            if self.record("pool", columns, start):
+                return columns, None
+
+            if self.heuristic:
+                start = time.perf_counter()
+                packings = solve_knapsack_greedy(self.sizes, [pricing_sol[i] for i in range(len(self.sizes))],
+                                                 self.capacity, together, apart, 2 * self.max_columns)
+                columns = self.negative_columns(packings, dual_sol, cost)
+                if self.record("heuristic", columns, start):
+                    return columns, None
+
+        # without smoothing twice as many columns are priced as added, the surplus goes to the pool
+        start = time.perf_counter()
+        priced = pricing_solver_multiple(self.sizes, self.capacity, pricing_sol, together, apart,
+                                         (1 if pricing_sol is not dual_sol else 2) * self.max_columns,
+                                         self.pricing_method)
+        columns = self.negative_columns(priced, dual_sol, cost)
+        self.record("exact", columns, start)
+        return columns, priced[0]
+
+    def negative_columns(self, packings: List[tuple[float, List[int]]], dual_sol: dict[float],
+                         cost: float) -> List[tuple[float, List[int]]]:
+        """
+        Keep the packings with a negative reduced cost for the LP duals, which differ from the duals they were
+        priced with if these were smoothed. The best max_columns are returned, the others go to the pool.
+        """
+
+        columns = [(cost - sum(dual_sol[item] for item in packing), packing) for _, packing in packings]
+        columns = sorted((column for column in columns if column[0] < -EPS), key=lambda column: column[0])
+        for red_cost, packing in columns[self.max_columns:]:
+            self.column_pool.add(packing)
+        return columns[:self.max_columns]
+
+    def record(self, tier: str, columns: List[tuple[float, List[int]]], start: float) -> bool:
+        stats = self.stats[tier]
+        stats["calls"] += 1
+        stats["hits"] += len(columns) > 0
+        stats["columns"] += len(columns)
+        stats["time"] += time.perf_counter() - start
+        return len(columns) > 0
@@ -1,97 +1,198 @@
-from typing import List
+from collections.abc import Mapping
+from itertools import chain
+from typing import Iterator, List, Optional
+
+import numpy as np
 from pyscipopt import Branchrule, SCIP_RESULT
 
+from column_registry import ColumnRegistry
+from pair_selection import PairSelection
+
+
+class NodeDecisions:
+    def __init__(self, parent: Optional["NodeDecisions"] = None, kind: Optional[str] = None,
+                 pair: Optional[tuple[int, int]] = None):
+        """
+        The branching decisions of a node: a pointer to the decisions of its parent and the decision taken
+        at the node itself, kind "together" or "apart" for the pair of items (none at the root). The full
+        sets of pairs are built on first access and cached until the node is evicted.
+        """
+        self.parent = parent
+        self.kind = kind
+        self.pair = pair
+        self.cache: Optional[dict[str, frozenset[tuple[int, int]]]] = None
+
+    def own(self, kind: str) -> frozenset[tuple[int, int]]:
+        """
+        The pairs of the given kind decided at this node itself
+        """
+
+        return frozenset([self.pair]) if self.kind == kind else frozenset()
+
+    def __getitem__(self, kind: str) -> frozenset[tuple[int, int]]:
+        if self.cache is None:
+            # collect the own decisions up to the closest ancestor with cached sets
+            decisions = {"together": set(), "apart": set()}
+            node = self
+            while node is not None and node.cache is None:
+                if node.kind is not None:
+                    decisions[node.kind].add(node.pair)
+                node = node.parent
+            if node is not None:
+                for key in decisions:
+                    decisions[key] |= node.cache[key]
+            self.cache = {key: frozenset(pairs) for key, pairs in decisions.items()}
+        return self.cache[kind]
+
+
+class BranchingDecisions(Mapping):
+    def __init__(self):
+        """
+        The branching decisions of the open and focused nodes by node number. Every node stores only its own
+        decision and refers to its parent, so the memory grows with the number of nodes rather than with the
+        number of nodes times the depth; the nodes SCIP has deleted are evicted.
+        """
+        self.nodes: dict[int, NodeDecisions] = {1: NodeDecisions()}  # root node
+
+    def __getitem__(self, number: int) -> NodeDecisions:
+        return self.nodes[number]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add_child(self, number: int, parent_number: int, kind: str, pair: tuple[int, int]) -> NodeDecisions:
+        """
+        Record the decisions of a child node created by branching on pair at the node parent_number
+        """
+
+        decisions = NodeDecisions(self.nodes[parent_number], kind, pair)
+        self.nodes[number] = decisions
+        return decisions
+
+    def evict(self, number: int):
+        """
+        Forget a deleted node. Its children still refer to it, so only its cached sets are dropped.
+        """
+
+        decisions = self.nodes.pop(number, None)
+        if decisions is not None:
+            decisions.cache = None
+
 
 class RyanFoster(Branchrule):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, column_registry: ColumnRegistry, pair_selection: Optional[PairSelection] = None, *args,
+                 **kwargs):
         """
-        Branching decisions are stored in a dictionary, where the key is the node number
-        and the value is a dictionary with the keys "together" and "apart"
+        Branching decisions are stored in a BranchingDecisions mapping, where the key is the node number
+        and the value maps the keys "together" and "apart" to sets of pairs:
         the value of "together" is a set of pairs of items that must be in the same bin
         the value of "apart" is a set of pairs of items that must be in different bins.
+        The items of the fractional columns are looked up in the column registry, and the pair to branch on is
+        chosen by the pair selection strategy (the first fractional pair by default).
         """
         super().__init__(*args, **kwargs)
-        self.branching_decisions = {
-            1: {  # root node
-                "together": set(),
-                "apart": set(),
-            }
-        }
+        self.column_registry = column_registry
+        self.pair_selection = pair_selection if pair_selection is not None else PairSelection()
+        self.branching_decisions = BranchingDecisions()
 
     def branchexeclp(self, allowaddcons):
         # get the fractional variables from the LP solution
         lpcands, lpcandssol, *_ = self.model.getLPBranchCands()
 
         patterns_with_vals = [
-            (eval(var.name.replace("t_", "")), val) for var, val in zip(lpcands, lpcandssol)
+            (self.column_registry.items(var), val) for var, val in zip(lpcands, lpcandssol)
         ]
 
-        # TODO (Exercise 2: choose a fractional pair to branch on)
-        chosen_pair = choose_fractional_pair(patterns_with_vals)
-
-        parent_together = set()
-        parent_apart = set()
+        chosen_pair = self.pair_selection.choose(self.model, fractional_pair_values(patterns_with_vals))
 
-        # get the branching decisions of the parent node
+        # the children refer to the branching decisions of the parent node
         parent = self.model.getCurrentNode()
-        if parent:
-            parent_together = set(self.branching_decisions[parent.getNumber()]["together"])
-            parent_apart = set(self.branching_decisions[parent.getNumber()]["apart"])
 
         # Left subproblem: enforce that pair is in the same bin
         left_node = self.model.createChild(0, 0)
-
-        self.branching_decisions[left_node.getNumber()] = {
-            "together": parent_together.union({chosen_pair}),
-            "apart": parent_apart
-        }
+        self.branching_decisions.add_child(left_node.getNumber(), parent.getNumber(), "together", chosen_pair)
 
         # Right subproblem: enforce that pair is in different bins
         right_node = self.model.createChild(0, 0)
-
-        self.branching_decisions[right_node.getNumber()] = {
-            "together": parent_together,
-            "apart": parent_apart.union({chosen_pair})
-        }
+        self.branching_decisions.add_child(right_node.getNumber(), parent.getNumber(), "apart", chosen_pair)
 
         return {"result": SCIP_RESULT.BRANCHED}
 
 
-def all_fractional_pairs(patterns_with_vals: List[tuple[List[int], float]]) -> List[tuple[int, int]]:
+def fractional_pair_arrays(
+        patterns_with_vals: List[tuple[List[int], float]]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Find all pairs of items that are fractional in the LP solution
+    Find all pairs of items that are fractional in the LP solution, with the sum of the values of the columns
+    covering both items, as arrays
 
     Parameters:
     patterns_with_vals: List[tuple[List[int], float]] - a list of packings and the value of the variable in the LP solution
 
     Returns:
-    List[tuple[int, int]] - a list of pairs of items that are fractional in the LP solution
+    tuple[np.ndarray, np.ndarray, np.ndarray] - the first items, the second items and the values of the fractional
+    pairs, ordered by the items
     """
 
-    pairs = {}
-    for pattern, val in patterns_with_vals:
-        for i in range(len(pattern)):
-            for j in range(i + 1, len(pattern)):
-                if pattern[i] < pattern[j]:
-                    tuple = (pattern[i], pattern[j])
-                    if tuple not in pairs:
-                        pairs[tuple] = val
-                    else:
-                        pairs[tuple] += val
+    # the pair values are accumulated in one batched pass: the patterns are padded with -1 into an (m, k) array,
+    # whose upper triangle gives all pairs of all patterns at once, and the pairs are keyed by i * n + j
+    lengths = np.fromiter((len(pattern) for pattern, _ in patterns_with_vals), dtype=np.int64,
+                          count=len(patterns_with_vals))
+    if len(lengths) == 0 or lengths.max() < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    flat = np.fromiter(chain.from_iterable(pattern for pattern, _ in patterns_with_vals), dtype=np.int64,
+                       count=int(lengths.sum()))
+    vals = np.fromiter((val for _, val in patterns_with_vals), dtype=float, count=len(patterns_with_vals))
+
+    padded = np.full((len(lengths), int(lengths.max())), -1, dtype=np.int64)
+    padded[np.arange(padded.shape[1]) < lengths[:, None]] = flat
+    # sorted in each row, the padding comes first and every pair (i, j) has i < j
+    padded.sort(axis=1)
+    first, second = np.triu_indices(padded.shape[1], 1)
+    first, second = padded[:, first], padded[:, second]
+    covered = first >= 0
+    n = int(flat.max()) + 1
+    keys, inverse = np.unique((first * n + second)[covered], return_inverse=True)
+    values = np.bincount(inverse, weights=np.broadcast_to(vals[:, None], covered.shape)[covered])
+
+    fractional = (values > 1e-6) & (values < 1 - 1e-6)
+    keys = keys[fractional]
+    return keys // n, keys % n, values[fractional]
+
+
+def fractional_pair_values(patterns_with_vals: List[tuple[List[int], float]]) -> dict[tuple[int, int], float]:
+    """
+    Find all pairs of items that are fractional in the LP solution, with the sum of the values of the columns
+    covering both items
 
-    return [pair for pair, val in pairs.items() if 1e-6 < val < 1 - 1e-6]
+    Parameters:
+    patterns_with_vals: List[tuple[List[int], float]] - a list of packings and the value of the variable in the LP solution
+
+    Returns:
+    dict[tuple[int, int], float] - the pairs of items that are fractional in the LP solution and their values,
+    ordered by the items
+    """
 
+    first, second, values = fractional_pair_arrays(patterns_with_vals)
+    return dict(zip(zip(first.tolist(), second.tolist()), values.tolist()))
 
-def choose_fractional_pair(patterns_with_vals: List[tuple[List[int], float]]) -> tuple[int, int]:
+
+def all_fractional_pairs(patterns_with_vals: List[tuple[List[int], float]]) -> List[tuple[int, int]]:
     """
-    Choose a fractional pair to branch on
+    Find all pairs of items that are fractional in the LP solution, sorted by score: the most fractional pairs,
+    with a value closest to 0.5, first
 
     Parameters:
-    fractional_vars: List[tuple[List[int], float]] - a list of packings and the value of the variable in the LP solution
+    patterns_with_vals: List[tuple[List[int], float]] - a list of packings and the value of the variable in the LP solution
 
     Returns:
-    tuple[int, int] - the pair of items to branch on
+    List[tuple[int, int]] - a list of pairs of items that are fractional in the LP solution
     """
 
-    first_pair = all_fractional_pairs(patterns_with_vals)[0]
-    return first_pair
\ No newline at end of file
+    first, second, values = fractional_pair_arrays(patterns_with_vals)
+    # a stable sort keeps the pairs with the same score ordered by the items
+    order = np.argsort(np.abs(values - 0.5), kind="stable")
+    return list(zip(first[order].tolist(), second[order].tolist()))
@@ -0,0 +1,150 @@
+from typing import Optional
+
+
+def farley_bound(dual_solution: dict[float], min_red_cost: float) -> float:
+    """
+    The Farley lower bound on the master problem given nonnegative duals and the minimum reduced cost of a
+    column with cost 1: scaling the duals down by the largest dual value of a packing makes them feasible
+
+    Parameters:
+    dual_solution: dict[float] - the (nonnegative) duals of the covering constraints
+    min_red_cost: float - the minimum reduced cost 1 - max(sum of the duals of a packing)
+
+    Returns:
+    float - the lower bound
+    """
+
+    return sum(dual_solution.values()) / max(1.0, 1 - min_red_cost)
+
+
+class WentgesSmoothing:
+    def __init__(self, alpha: float = 0.8, adaptive: bool = True, max_alpha: float = 0.99):
+        """
+        Wentges smoothing of the duals given to the pricing problem: the pricing problem is solved at a convex
+        combination alpha * center + (1 - alpha) * duals, where the stability center is the dual solution with
+        the best Farley bound at the current node. A column that is negative for the smoothed duals but not for
+        the LP duals is a mispricing, the next pricing call then moves the separation point towards the LP
+        duals until alpha is 0 and pricing is exact again. With adaptive alpha, alpha is increased when the
+        subgradient at the separation point points away from the LP duals and decreased otherwise.
+
+        A run cannot tell how many rounds it would have priced without smoothing, so the rounds saved are measured
+        against a baseline run with alpha 0, which prices at the LP duals throughout, see compare.
+        """
+        self.initial_alpha = alpha
+        self.adaptive = adaptive
+        self.max_alpha = max_alpha
+        self.alpha = alpha
+
+        self.node = None
+        self.center: Optional[dict[float]] = None
+        self.best_bound = float("-inf")
+        self.n_mispricings = 0  # mispricings in the current pricing call
+
+        self.stats = {
+            "pricing_rounds": 0,  # pricing rounds, smoothed or not, without the repeats after mispricings
+            "rounds": 0,  # pricing rounds with smoothed duals
+            "mispricings": 0,  # pricing problems solved at a separation point without finding an LP column
+            "center_updates": 0,  # rounds in which the smoothed duals gave a better bound than the center
+            "rounds_saved": None,  # pricing rounds fewer than in a baseline run, set by compare
+        }
+
+    def reset(self, node: int):
+        """
+        Start over at a new node, whose duals are unrelated to the stability center of the previous one
+        """
+
+        self.node = node
+        self.center = None
+        self.best_bound = float("-inf")
+        self.alpha = self.initial_alpha
+
+    def separation_point(self, node: int, dual_solution: dict[float]) -> dict[float]:
+        """
+        The duals the pricing problem is solved with
+
+        Parameters:
+        node: int - the number of the current node
+        dual_solution: dict[float] - the duals of the current LP
+
+        Returns:
+        dict[float] - the smoothed duals
+        """
+
+        if node != self.node:
+            self.reset(node)
+        if self.n_mispricings == 0:
+            self.stats["pricing_rounds"] += 1
+        if self.center is None:
+            return dual_solution
+
+        # every mispricing moves the separation point further towards the LP duals, (1 - k (1 - alpha))
+        alpha = max(0.0, 1 - (self.n_mispricings + 1) * (1 - self.alpha))
+        if alpha == 0:
+            return dual_solution
+        if self.n_mispricings == 0:
+            self.stats["rounds"] += 1
+        return {i: alpha * self.center[i] + (1 - alpha) * dual_solution[i] for i in dual_solution}
+
+    def update(self, dual_solution: dict[float], smoothed_solution: dict[float], min_red_cost: float,
+               packing: list[int], lp_obj: float, mispriced: bool):
+        """
+        Update the stability center and alpha after solving the pricing problem at the separation point
+
+        Parameters:
+        dual_solution: dict[float] - the duals of the current LP
+        smoothed_solution: dict[float] - the duals the pricing problem was solved with
+        min_red_cost: float - the minimum reduced cost for the smoothed duals
+        packing: list[int] - the packing with the minimum reduced cost
+        lp_obj: float - the objective value of the current LP, an estimate of the number of bins
+        mispriced: bool - whether no column has a negative reduced cost for the LP duals
+        """
+
+        center = self.center
+        bound = farley_bound(smoothed_solution, min_red_cost)
+        if bound > self.best_bound:
+            if self.best_bound > float("-inf"):
+                self.stats["center_updates"] += 1
+            self.best_bound = bound
+            self.center = smoothed_solution
+
+        if mispriced:
+            self.n_mispricings += 1
+            self.stats["mispricings"] += 1
+            return
+        self.n_mispricings = 0
+
+        if self.adaptive and center is not None:
+            # subgradient of the Lagrangian function at the separation point, with lp_obj copies of the packing
+            items = set(packing)
+            direction = sum(((1 - lp_obj) if i in items else 1) * (dual_solution[i] - center[i])
+                            for i in dual_solution)
+            if direction > 0:
+                self.alpha = max(0.0, self.alpha - 0.1)
+            else:
+                self.alpha = min(self.max_alpha, self.alpha + 0.1 * (1 - self.alpha))
+
+    def compare(self, baseline: "WentgesSmoothing"):
+        """
+        Set the rounds saved against a baseline run of the same model, whose smoothing has alpha 0 and so prices
+        at the LP duals like a run without stabilization
+
+        Parameters:
+        baseline: WentgesSmoothing - the smoothing of the baseline run, after solving
+        """
+
+        self.stats["rounds_saved"] = baseline.stats["pricing_rounds"] - self.stats["pricing_rounds"]
+
+    def update_without_bound(self, dual_solution: dict[float]):
+        """
+        Update the state after a pricing round in which a cheaper tier than the exact solver found columns, which
+        are negative for the LP duals: the round is no mispricing, and the LP duals become the stability center if
+        there is none yet. The minimum reduced cost is unknown, so the center has no bound and the first exact
+        pricing problem replaces it.
+
+        Parameters:
+        dual_solution: dict[float] - the duals of the current LP
+        """
+
+        self.n_mispricings = 0
+        if self.center is None:
+            self.center = dual_solution
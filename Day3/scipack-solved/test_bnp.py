@@ -11,6 +11,17 @@ def test_bnp():
     assert abs(model.getObjVal() - 52) < 1e-6
 
 
+def test_bnp_early_termination():
+    capacity = 300
+    sizes = random_bin_packing_instance(40, 100)
+
+    model, *_ = extended_binpacking(sizes, capacity, early_termination=True)
+    model.optimize()
+
+    assert abs(model.getObjVal() - 7) < 1e-6
+
+
 if __name__ == "__main__":
     test_bnp()
+    test_bnp_early_termination()
     print("bnp test passed!")
\ No newline at end of file
@@ -0,0 +1,33 @@
+from ryan_foster import BranchingDecisions
+
+
+def test_branching_decisions():
+    decisions = BranchingDecisions()
+    assert decisions[1]["together"] == set()
+    assert decisions[1]["apart"] == set()
+
+    decisions.add_child(2, 1, "together", (0, 1))
+    decisions.add_child(3, 1, "apart", (0, 1))
+    decisions.add_child(4, 2, "apart", (2, 3))
+    decisions.add_child(5, 4, "together", (1, 4))
+
+    assert decisions[3]["apart"] == {(0, 1)}
+    assert decisions[3]["together"] == set()
+    assert decisions[5]["together"] == {(0, 1), (1, 4)}
+    assert decisions[5]["apart"] == {(2, 3)}
+    assert decisions[5].own("together") == {(1, 4)}
+    assert decisions[5].own("apart") == set()
+
+    # evicted nodes are forgotten, their descendants still see their decisions
+    decisions.evict(2)
+    decisions.evict(4)
+    assert 2 not in decisions and 4 not in decisions
+    assert len(decisions) == 3
+    decisions.add_child(6, 5, "apart", (5, 6))
+    assert decisions[6]["together"] == {(0, 1), (1, 4)}
+    assert decisions[6]["apart"] == {(2, 3), (5, 6)}
+
+
+if __name__ == "__main__":
+    test_branching_decisions()
+    print("branching decisions test passed!")
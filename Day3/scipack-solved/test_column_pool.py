@@ -0,0 +1,52 @@
+from column_pool import ColumnPool
+from knapsack import pricing_solver, pricing_solver_multiple
+
+
+def test_negative_columns():
+    pool = ColumnPool()
+    pool.add([0, 1])
+    pool.add([1, 2])
+    pool.add([2])
+    pool.add([0, 2])
+    dual_solution = {0: 0.5, 1: 0.7, 2: 0.4}
+
+    columns = pool.negative_columns(dual_solution, set(), set(), 1, 10)
+    assert [pattern for _, pattern in columns] == [[0, 1], [1, 2]]
+    assert abs(columns[0][0] + 0.2) < 1e-6
+
+    # [0, 1] is forbidden by keeping 0 and 1 apart, [1, 2] by keeping 0 and 2 together
+    assert pool.negative_columns(dual_solution, set(), {(0, 1)}, 1, 10) == [(1 - 1.1, [1, 2])]
+    assert pool.negative_columns(dual_solution, {(0, 2)}, set(), 1, 10) == []
+
+    # in farkas' pricing every column with positive duals is negative
+    assert len(pool.negative_columns(dual_solution, set(), set(), 0, 3)) == 3
+
+
+def test_pool_size_limit():
+    pool = ColumnPool(max_size=2)
+    pool.add([0])
+    pool.add([1])
+    pool.add([0])
+    pool.add([2])
+    assert [0] in pool and [2] in pool and [1] not in pool
+    pool.discard([0])
+    assert len(pool) == 1
+
+
+def test_pricing_solver_multiple():
+    sizes = [2, 3, 4, 5, 3]
+    capacity = 8
+    dual_solution = {0: 0.2, 1: 0.3, 2: 0.5, 3: 0.6, 4: 0.35}
+    for method in ("dp", "scip"):
+        columns = pricing_solver_multiple(sizes, capacity, dual_solution, set(), set(), 5, method)
+        best = pricing_solver(sizes, capacity, dual_solution, set(), set(), method)
+        assert abs(columns[0][0] - best[0]) < 1e-6
+        assert len(columns) > 1
+        assert len({tuple(packing) for _, packing in columns}) == len(columns)
+        assert [red_cost for red_cost, _ in columns] == sorted(red_cost for red_cost, _ in columns)
+        for red_cost, packing in columns:
+            assert sum(sizes[item] for item in packing) <= capacity
+            assert abs(red_cost - (1 - sum(dual_solution[item] for item in packing))) < 1e-6
+
+        columns = pricing_solver_multiple(sizes, capacity, dual_solution, set(), {(2, 3)}, 5, method)
+        assert all(not (2 in packing and 3 in packing) for _, packing in columns)
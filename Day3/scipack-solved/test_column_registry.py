@@ -0,0 +1,47 @@
+from pyscipopt import Model
+
+from column_registry import ColumnRegistry
+
+
+def test_column_registry():
+    model = Model()
+    registry = ColumnRegistry()
+    patterns = [[0, 1, 2], [0], [2, 1], [3]]
+    variables = [model.addVar(vtype="B", name=f"{pattern}") for pattern in patterns]
+    for var, pattern in zip(variables, patterns):
+        registry.add(var, pattern)
+
+    assert len(registry) == 4
+    assert registry.items(variables[2]) == [1, 2]
+    assert registry.get(variables[0]).mask == 0b111
+
+    both = {column.items for column in registry.columns_with_both(1, 2)}
+    assert both == {(0, 1, 2), (1, 2)}
+
+    one = {column.items for column in registry.columns_with_one(0, 1)}
+    assert one == {(0,), (1, 2)}
+
+    registry.remove(variables[2])
+    assert {column.items for column in registry.columns_with_both(1, 2)} == {(0, 1, 2)}
+    assert registry.columns_with_both(3, 4) == []
+
+
+def test_column_registry_transform():
+    model = Model()
+    model.hideOutput()
+    registry = ColumnRegistry()
+    var = model.addVar(vtype="B", name="[0, 1]", obj=1)
+    registry.add(var, [0, 1])
+    model.addCons(var >= 1)
+    model.optimize()
+
+    registry.transform(model)
+    transformed_var = model.getTransformedVar(var)
+    assert registry.items(transformed_var) == [0, 1]
+    assert len(registry) == 1
+
+
+if __name__ == "__main__":
+    test_column_registry()
+    test_column_registry_transform()
+    print("column registry test passed!")
@@ -1,4 +1,6 @@
-from ryan_foster import all_fractional_pairs
+import random
+
+from ryan_foster import all_fractional_pairs, fractional_pair_values
 
 def test_fractional_pairs():
     patterns_with_vals = [
@@ -36,7 +38,42 @@ def test_fractional_pairs2():
     assert {1, 3} in pairs
 
 
+def test_fractional_pairs_sorted_by_score():
+    patterns_with_vals = [
+        ([0, 1, 2], 0.3),
+        ([1, 2], 0.5),
+        ([0, 3], 0.45),
+        ([3], 0.55),
+    ]
+
+    # the pairs sum to 0.45, 0.3, 0.3 and 0.8, the most fractional pair comes first and ties keep the item order
+    assert all_fractional_pairs(patterns_with_vals) == [(0, 3), (0, 1), (0, 2), (1, 2)]
+
+
+def test_fractional_pair_values():
+    rng = random.Random(0)
+    patterns_with_vals = [(sorted(rng.sample(range(30), rng.randint(1, 6))), rng.random() * 0.3) for _ in range(200)]
+
+    expected = {}
+    for pattern, val in patterns_with_vals:
+        for i in pattern:
+            for j in pattern:
+                if i < j:
+                    expected[(i, j)] = expected.get((i, j), 0) + val
+    expected = {pair: val for pair, val in expected.items() if 1e-6 < val < 1 - 1e-6}
+
+    pair_values = fractional_pair_values(patterns_with_vals)
+    assert list(pair_values) == sorted(expected)
+    assert all(abs(pair_values[pair] - val) < 1e-9 for pair, val in expected.items())
+    assert set(all_fractional_pairs(patterns_with_vals)) == set(expected)
+
+    assert fractional_pair_values([([0], 0.5), ([1], 0.5)]) == {}
+    assert all_fractional_pairs([]) == []
+
+
 if __name__ == "__main__":
     test_fractional_pairs()
     test_fractional_pairs2()
+    test_fractional_pairs_sorted_by_score()
+    test_fractional_pair_values()
     print("Fractional pairs test passed!")
\ No newline at end of file
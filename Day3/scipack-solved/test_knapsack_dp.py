@@ -0,0 +1,66 @@
+import random
+
+from knapsack import solve_knapsack, solve_knapsack_with_constraints, solve_knapsack_dp, solve_knapsack_bnb
+
+
+def test_knapsack_dp():
+    sizes = [2, 3, 4, 5]
+    values = [1, 2, 5, 6]
+    capacity = 8
+    result = solve_knapsack_dp(sizes, values, capacity)
+    print("Got result:", result)
+
+    assert abs(result[0] - 8) < 1e-6
+    assert set(result[1]) == {1, 3}
+
+    result = solve_knapsack_dp(sizes, values, 0)
+    assert abs(result[0] - 0) < 1e-6
+    assert result[1] == []
+
+
+def test_knapsack_bnb():
+    sizes = [2, 3, 4, 5]
+    values = [1, 2, 5, 6]
+    result = solve_knapsack_bnb(sizes, values, 8, {(0, 1)}, {(1, 3)})
+    assert abs(result[0] - 6) < 1e-6
+    assert set(result[1]) == {3}
+
+    result = solve_knapsack_bnb([1, 2], [1, 2], 1, {(0, 1)}, set())
+    assert abs(result[0] - 0) < 1e-6
+    assert set(result[1]) == set()
+
+    result = solve_knapsack_bnb([1, 2], [1, 2], 3, set(), {(0, 1)})
+    assert abs(result[0] - 2) < 1e-6
+    assert set(result[1]) == {1}
+
+
+def test_knapsack_dp_bnb_match_scip():
+    rng = random.Random(0)
+    for _ in range(20):
+        n = rng.randint(1, 15)
+        capacity = rng.randint(0, 30)
+        sizes = [rng.randint(1, 15) for _ in range(n)]
+        values = [rng.uniform(-0.2, 1) for _ in range(n)]
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        rng.shuffle(pairs)
+        together = set(pairs[:rng.randint(0, 2)])
+        apart = set(pairs[2:2 + rng.randint(0, 4)])
+
+        value, packing = solve_knapsack_dp(sizes, values, capacity)
+        assert abs(value - solve_knapsack(sizes, values, capacity)[0]) < 1e-6
+        assert sum(sizes[i] for i in packing) <= capacity
+        assert abs(value - sum(values[i] for i in packing)) < 1e-6
+
+        value, packing = solve_knapsack_bnb(sizes, values, capacity, together, apart)
+        assert abs(value - solve_knapsack_with_constraints(sizes, values, capacity, together, apart)[0]) < 1e-6
+        assert sum(sizes[i] for i in packing) <= capacity
+        assert abs(value - sum(values[i] for i in packing)) < 1e-6
+        assert all((i in packing) == (j in packing) for i, j in together)
+        assert not any(i in packing and j in packing for i, j in apart)
+
+
+if __name__ == "__main__":
+    test_knapsack_dp()
+    test_knapsack_bnb()
+    test_knapsack_dp_bnb_match_scip()
+    print("knapsack dp test passed!")
@@ -0,0 +1,49 @@
+from bnp import extended_binpacking
+from generator import random_bin_packing_instance
+from pair_selection import LargestSizeSum, MostFractional, PairSelection
+from ryan_foster import fractional_pair_values
+
+
+def test_pair_selection():
+    patterns_with_vals = [
+        ([0, 1, 2], 0.3),
+        ([0], 0.7),
+        ([1, 2], 0.7),
+        ([3, 4], 0.4),
+        ([3], 0.6),
+        ([4], 0.6),
+    ]
+    pair_values = fractional_pair_values(patterns_with_vals)
+    assert set(pair_values) == {(0, 1), (0, 2), (3, 4)}
+
+    assert PairSelection().choose(None, pair_values) == (0, 1)
+    assert MostFractional().choose(None, pair_values) == (3, 4)
+
+    strategy = LargestSizeSum([10, 20, 50, 30, 25])
+    assert strategy.choose(None, pair_values) == (0, 2)
+    assert strategy.stats["branchings"] == 1 and strategy.stats["nodes"] == 0
+
+
+def test_bnp_pair_selection():
+    capacity = 100
+    sizes = random_bin_packing_instance(100, capacity, 5)
+
+    for pair_selection in ["first", "most_fractional", "size_sum", "strong"]:
+        model, *_ = extended_binpacking(sizes, capacity, pair_selection=pair_selection)
+        model.optimize()
+
+        assert model.getNNodes() > 1
+        assert abs(model.getObjVal() - 48) < 1e-6
+
+
+def test_pair_selection_node_count():
+    capacity = 100
+    sizes = random_bin_packing_instance(100, capacity, 5)
+
+    strategy = MostFractional()
+    model, *_ = extended_binpacking(sizes, capacity, pair_selection=strategy)
+    model.optimize()
+
+    # the node count is taken from SCIP when the strategy last branched, not derived from the branchings
+    assert strategy.stats["branchings"] > 0
+    assert 0 < strategy.stats["nodes"] <= model.getNNodes()
@@ -0,0 +1,48 @@
+from column_pool import ColumnPool
+from knapsack import solve_knapsack_greedy
+from pricing_pipeline import PricingPipeline
+
+
+def test_knapsack_greedy():
+    sizes = [2, 3, 4, 5]
+    values = [1, 2, 5, 6]
+    packings = solve_knapsack_greedy(sizes, values, 8, set(), set(), 3)
+    assert packings[0] == (8, [1, 3])
+    assert (7, [1, 2]) in packings
+    assert len({tuple(packing) for _, packing in packings}) == len(packings)
+    for value, packing in packings:
+        assert sum(sizes[i] for i in packing) <= 8
+        assert abs(value - sum(values[i] for i in packing)) < 1e-6
+
+    packings = solve_knapsack_greedy(sizes, values, 8, {(0, 3)}, {(1, 3)}, 3)
+    for value, packing in packings:
+        assert (0 in packing) == (3 in packing)
+        assert not (1 in packing and 3 in packing)
+
+
+def test_pricing_tiers():
+    sizes = [2, 3, 4, 5]
+    dual_sol = {0: 0.2, 1: 0.3, 2: 0.5, 3: 0.6}
+    pool = ColumnPool()
+    pipeline = PricingPipeline(sizes, 8, pool, max_columns=2)
+
+    # the greedy packings are negative in farkas pricing
+    columns, exact = pipeline.price(dual_sol, dual_sol, set(), set(), 0)
+    assert exact is None and columns
+    assert pipeline.stats["heuristic"]["hits"] == 1
+
+    pool.add([2, 3])
+    columns, exact = pipeline.price(dual_sol, dual_sol, set(), set(), 0)
+    assert exact is None and columns[0][1] == [2, 3]
+    assert pipeline.stats["pool"]["hits"] == 1
+
+    # no column is negative for these duals, the exact solver decides
+    dual_sol = {0: 0.1, 1: 0.1, 2: 0.1, 3: 0.1}
+    columns, exact = pipeline.price(dual_sol, dual_sol, set(), set(), 1)
+    assert columns == [] and exact is not None
+    assert abs(exact[0] - 0.8) < 1e-6
+    assert pipeline.stats["exact"]["calls"] == 1
+    assert pipeline.hit_rates()["exact"] == 0
+
+    columns, exact = pipeline.price(dual_sol, dual_sol, set(), set(), 0, require_exact=True)
+    assert exact is not None and pipeline.stats["exact"]["calls"] == 2
@@ -0,0 +1,73 @@
+from bnp import extended_binpacking
+from generator import random_bin_packing_instance
+from stabilization import WentgesSmoothing, farley_bound
+
+
+def test_farley_bound():
+    dual_solution = {0: 0.5, 1: 0.5, 2: 1}
+    # the duals are feasible, the bound is their sum
+    assert abs(farley_bound(dual_solution, 0) - 2) < 1e-6
+    # the packing {0, 1, 2} has dual value 2, scaling by 1/2 makes the duals feasible
+    assert abs(farley_bound(dual_solution, -1) - 1) < 1e-6
+
+
+def test_separation_point():
+    smoothing = WentgesSmoothing(alpha=0.5, adaptive=False)
+    dual_solution = {0: 1, 1: 0}
+    # without a stability center the LP duals are priced
+    assert smoothing.separation_point(1, dual_solution) is dual_solution
+    smoothing.update(dual_solution, dual_solution, -1, [0, 1], 1, False)
+    assert smoothing.center == dual_solution
+
+    dual_solution = {0: 0, 1: 1}
+    assert smoothing.separation_point(1, dual_solution) == {0: 0.5, 1: 0.5}
+    # a mispricing moves the separation point to the LP duals
+    smoothing.update(dual_solution, {0: 0.5, 1: 0.5}, 0, [0, 1], 1, True)
+    assert smoothing.separation_point(1, dual_solution) is dual_solution
+    assert smoothing.stats["mispricings"] == 1
+
+    # the stability center is dropped at a new node
+    assert smoothing.separation_point(2, dual_solution) is dual_solution
+    assert smoothing.center is None
+
+
+def test_smoothing_after_heuristic_rounds():
+    smoothing = WentgesSmoothing(alpha=0.5, adaptive=False)
+    dual_solution = {0: 1, 1: 0}
+    # the heuristic tier found columns at the LP duals, which become the stability center
+    assert smoothing.separation_point(1, dual_solution) is dual_solution
+    smoothing.update_without_bound(dual_solution)
+    assert smoothing.center == dual_solution
+
+    # the next round is smoothed and solved exactly, its bound replaces the center, a mispricing moves the
+    # separation point to the LP duals
+    dual_solution = {0: 0, 1: 1}
+    assert smoothing.separation_point(1, dual_solution) == {0: 0.5, 1: 0.5}
+    smoothing.update(dual_solution, {0: 0.5, 1: 0.5}, 0, [0, 1], 1, True)
+    assert smoothing.center == {0: 0.5, 1: 0.5}
+    assert smoothing.separation_point(1, dual_solution) is dual_solution
+
+    # columns of the heuristic tier at the LP duals end the mispricings, smoothing resumes
+    smoothing.update_without_bound(dual_solution)
+    assert smoothing.center == {0: 0.5, 1: 0.5}
+    assert smoothing.separation_point(1, dual_solution) == {0: 0.25, 1: 0.75}
+    assert smoothing.stats["rounds"] == 2 and smoothing.stats["center_updates"] == 0
+
+
+def test_bnp_smoothing():
+    capacity = 100
+    sizes = random_bin_packing_instance(60, capacity)
+
+    smoothing = WentgesSmoothing(0.8)
+    model, *_ = extended_binpacking(sizes, capacity, smoothing_alpha=smoothing)
+    model.optimize()
+
+    # with alpha 0 the LP duals are priced throughout, the baseline for the rounds saved
+    baseline = WentgesSmoothing(0.0, adaptive=False)
+    reference, *_ = extended_binpacking(sizes, capacity, smoothing_alpha=baseline)
+    reference.optimize()
+
+    assert abs(model.getObjVal() - reference.getObjVal()) < 1e-6
+    assert smoothing.stats["rounds"] > 0 and baseline.stats["rounds"] == 0
+    smoothing.compare(baseline)
+    assert smoothing.stats["rounds_saved"] == baseline.stats["pricing_rounds"] - smoothing.stats["pricing_rounds"]
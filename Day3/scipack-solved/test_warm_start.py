@@ -0,0 +1,40 @@
+from bnp import extended_binpacking
+from generator import random_bin_packing_instance
+from warm_start import best_fit_decreasing, first_fit_decreasing, warm_start_packings
+
+
+def check_packing(sizes, capacity, packing):
+    assert sorted(i for items in packing for i in items) == list(range(len(sizes)))
+    for items in packing:
+        assert sum(sizes[i] for i in items) <= capacity
+
+
+def test_fit_decreasing():
+    sizes = [5, 7, 5, 2, 4, 2, 5, 1, 6]
+    capacity = 10
+    check_packing(sizes, capacity, first_fit_decreasing(sizes, capacity))
+    check_packing(sizes, capacity, best_fit_decreasing(sizes, capacity))
+    # 7 + 2 + 1, 6 + 4, 5 + 5, 5 + 2
+    assert len(first_fit_decreasing(sizes, capacity)) == 4
+    assert len(best_fit_decreasing(sizes, capacity)) == 4
+
+
+def test_warm_start_packings():
+    capacity = 100
+    sizes = random_bin_packing_instance(50, capacity)
+    columns, incumbent = warm_start_packings(sizes, capacity)
+    check_packing(sizes, capacity, incumbent)
+    assert len(incumbent) <= len(first_fit_decreasing(sizes, capacity))
+    assert all(items in columns for items in incumbent)
+    assert len({tuple(items) for items in columns}) == len(columns)
+
+
+def test_bnp_warm_start():
+    capacity = 100
+    sizes = random_bin_packing_instance(100, capacity)
+
+    model, *_ = extended_binpacking(sizes, capacity)
+    assert model.getNSols() == 1
+    model.optimize()
+
+    assert abs(model.getObjVal() - 52) < 1e-6
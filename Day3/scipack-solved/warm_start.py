@@ -0,0 +1,97 @@
+import random
+from typing import List, Sequence
+
+
+def first_fit(sizes: List[int], capacity: int, order: Sequence[int]) -> List[List[int]]:
+    """
+    Pack the items in the given order, each into the first bin it fits in
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    capacity: int - the capacity of the bins
+    order: Sequence[int] - the order the items are packed in
+
+    Returns:
+    List[List[int]] - the items of each bin
+    """
+
+    bins = []
+    loads = []
+    for i in order:
+        for b, load in enumerate(loads):
+            if load + sizes[i] <= capacity:
+                bins[b].append(i)
+                loads[b] += sizes[i]
+                break
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+    return bins
+
+
+def best_fit(sizes: List[int], capacity: int, order: Sequence[int]) -> List[List[int]]:
+    """
+    Pack the items in the given order, each into the fullest bin it fits in
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    capacity: int - the capacity of the bins
+    order: Sequence[int] - the order the items are packed in
+
+    Returns:
+    List[List[int]] - the items of each bin
+    """
+
+    bins = []
+    loads = []
+    for i in order:
+        best = None
+        for b, load in enumerate(loads):
+            if load + sizes[i] <= capacity and (best is None or load > loads[best]):
+                best = b
+        if best is None:
+            bins.append([i])
+            loads.append(sizes[i])
+        else:
+            bins[best].append(i)
+            loads[best] += sizes[i]
+    return bins
+
+
+def first_fit_decreasing(sizes: List[int], capacity: int) -> List[List[int]]:
+    return first_fit(sizes, capacity, sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True))
+
+
+def best_fit_decreasing(sizes: List[int], capacity: int) -> List[List[int]]:
+    return best_fit(sizes, capacity, sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True))
+
+
+def warm_start_packings(sizes: List[int], capacity: int, restarts: int = 5,
+                        seed: int = 0) -> tuple[List[List[int]], List[List[int]]]:
+    """
+    Run first-fit decreasing, best-fit decreasing and best-fit on randomly perturbed decreasing orders
+
+    Parameters:
+    sizes: List[int] - the sizes of the items
+    capacity: int - the capacity of the bins
+    restarts: int - the number of randomized best-fit runs
+    seed: int - the seed of the randomized runs
+
+    Returns:
+    tuple[List[List[int]], List[List[int]]] - the distinct bins of all packings, as initial columns, and the bins
+    of the packing with the fewest bins, as the incumbent
+    """
+
+    rng = random.Random(seed)
+    packings = [first_fit_decreasing(sizes, capacity), best_fit_decreasing(sizes, capacity)]
+    for _ in range(restarts):
+        # sizes scaled by up to 20% keep the order roughly decreasing
+        noisy_sizes = {i: sizes[i] * rng.uniform(0.8, 1.2) for i in range(len(sizes))}
+        packings.append(best_fit(sizes, capacity, sorted(range(len(sizes)), key=noisy_sizes.get, reverse=True)))
+
+    columns = {}
+    for packing in packings:
+        for items in packing:
+            columns.setdefault(tuple(sorted(items)), None)
+    best = min(packings, key=len)
+    return [list(items) for items in columns], [sorted(items) for items in best]